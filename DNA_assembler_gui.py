@@ -0,0 +1,695 @@
+"""
+Tk GUI of the DNA sequence assembler. The assembly itself lives in DNA_sequence_assembler.
+
+File import and assembly run in a worker process (BackgroundTask), so the window stays responsive and the job can be
+cancelled. The worker posts the progress of the pipeline to a queue, which the Tk loop polls with after(). The imported
+reads and the assembled sequence belong to the AssemblySession of the window, not to the module.
+"""
+
+from tkinter import *
+from tkinter import filedialog
+from tkinter import messagebox
+from tkinter import ttk
+import mmap
+import multiprocessing
+import os
+import queue
+from array import array
+from bisect import bisect_right
+
+import DNA_sequence_assembler as assembler
+from DNA_fasta import is_fasta, read_entry, read_fai, write_contigs
+from DNA_profile import Profiler
+from DNA_reads import load_reads
+
+NOFILE = 2
+POLL_INTERVAL = 100
+LINE_WIDTH = 60
+VIEW_LINES = 20
+SEARCH_CHUNK = 1 << 20
+
+
+class AssemblySession:
+    """
+    The state of a GUI session: the imported file and reads, the assembled sequence and the file it was saved to.
+    issequencesaved is NOFILE until a sequence is assembled, then False until it is saved and True afterwards.
+    """
+
+    def __init__(self):
+        self.filename = ''
+        self.reads = dict()
+        self.assembled_reads = ""
+        self.savedfile = ''
+        self.issequencesaved = NOFILE
+
+
+def _run_task(function, args, events):
+    """Runs a task in the worker process, posting its progress and its result or error to the events queue."""
+    def post(event, stage, profiler):
+        events.put(('progress', stage, event, profiler.progress))
+
+    try:
+        result = function(*args, profiler=Profiler([post]))
+    except Exception as error:
+        events.put(('error', str(error)))
+    else:
+        events.put(('done', result))
+
+
+def _load_task(filename, profiler):
+    with profiler.stage('read_load'):
+        return load_reads(filename)
+
+
+def _assembly_task(reads, profiler):
+    return assembler.run_assembly(reads, profiler=profiler)
+
+
+class BackgroundTask:
+    """
+    Runs a function in a worker process and hands its progress and result to callbacks on the Tk loop, by polling a
+    queue with after(). The function is called as function(*args, profiler=profiler) and its progress is the one of
+    the profiler, see DNA_profile.Profiler.
+    """
+
+    def __init__(self, master, function, args, on_progress, on_done, on_error):
+        """
+        Args:
+            master - a Tk widget, used to schedule the polling.
+            function - the function to run, importable by the worker process.
+            args - the positional arguments of the function.
+            on_progress - called as on_progress(stage, event, progress) for every stage event.
+            on_done - called with the result of the function.
+            on_error - called with an error message when the function raises or the worker dies.
+        """
+        self.master = master
+        self.on_progress, self.on_done, self.on_error = on_progress, on_done, on_error
+        # A spawned worker does not inherit the Tk state of this process.
+        context = multiprocessing.get_context('spawn')
+        self.events = context.Queue()
+        self.process = context.Process(target=_run_task, args=(function, args, self.events), daemon=True)
+        self.process.start()
+        self.running = True
+        self.master.after(POLL_INTERVAL, self._poll)
+
+    def _poll(self):
+        if not self.running:
+            return
+        # Checked before draining the queue: the result of a worker that exited by then is already in the queue, while
+        # one posted after the check is read on the next poll.
+        alive = self.process.is_alive()
+        try:
+            while True:
+                event = self.events.get_nowait()
+                if event[0] == 'progress':
+                    self.on_progress(*event[1:])
+                else:
+                    self._finish()
+                    (self.on_done if event[0] == 'done' else self.on_error)(event[1])
+                    return
+        except queue.Empty:
+            pass
+        if not alive:
+            self._finish()
+            self.on_error("The worker process stopped unexpectedly")
+            return
+        self.master.after(POLL_INTERVAL, self._poll)
+
+    def _finish(self):
+        self.running = False
+        self.process.join()
+
+    def cancel(self):
+        """Stops the worker process. None of the callbacks is called afterwards."""
+        if self.running:
+            self.running = False
+            self.process.terminate()
+            self.process.join()
+
+
+def read_data(screen):
+    """
+    Reads DNA fragments into a PackedReads store, in where the sequence number is the key, and the DNA fragment is the
+    value. The file is loaded in the background; the filename and reads of the session are set once it is loaded.
+    
+    Args:
+        screen - the NGSHomeScreen running the import.
+
+    Returns:
+        filename - The name of the input file.
+
+    Raises:
+        KeyError: Raises an exception.
+    """
+    session = screen.session
+
+    def loaded(store):
+        session.filename = selected
+        session.reads = store
+        screen.show_filename()
+
+    def failed(message):
+        session.filename = ''
+        session.issequencesaved = NOFILE
+        screen.show_filename()
+        messagebox.showerror("Error Message", "Incorrect file format or file does not exist ({})".format(message))
+
+    selected = filedialog.askopenfilename(filetypes=[("Reads", "*.txt *.fa *.fasta *.fna *.fq *.fastq *.gz"),
+                                                     ("All files", "*")])
+    try:
+        if not selected:
+            pass
+        elif os.stat(selected).st_size == 0:
+            session.filename = ''
+            session.issequencesaved = NOFILE
+            messagebox.showerror("Error Message", "File is empty")
+        else:
+            # load_reads() recognizes the format and reports the files it cannot read.
+            screen.start_task("Importing", _load_task, (selected,), loaded, failed)
+
+    except Exception:
+        session.filename = ''
+        session.issequencesaved = NOFILE
+        messagebox.showerror("Error Message", "Incorrect file format or file does not exist")
+
+    return session.filename
+
+
+def _iter_contigs(text):
+    """Yields the contigs of the assembled sequence one at a time, without splitting it into a list."""
+    start = 0
+    while text and start <= len(text):
+        end = text.find("\n", start)
+        if end < 0:
+            end = len(text)
+        yield text[start:end]
+        start = end + 1
+
+
+def save_sequence(session):
+    """
+      Saves the assembled sequence to a designated location: as indexed multi-FASTA, bgzip compressed when the name
+      ends with .gz, when the file has a FASTA extension, and one contig per line otherwise.
+      
+      Args:
+          session - the AssemblySession holding the assembled sequence.
+
+      Returns:
+          NONE
+
+      Raises:
+          KeyError: Raises an exception.
+     """
+    if session.filename == '':
+        messagebox.showerror("Error Message", "No import file")
+    elif session.issequencesaved == False:
+        name = filedialog.asksaveasfilename(defaultextension=".fa",
+                                            filetypes=[("FASTA", "*.fa *.fasta *.fna"), ("bgzip FASTA", "*.fa.gz"),
+                                                       ("Text", "*.txt")])
+        if not name:
+            return
+        try:
+            if is_fasta(name):
+                # The viewer reads FASTA back at random through the .fai and .gzi indexes written along.
+                write_contigs(name, _iter_contigs(session.assembled_reads),
+                              compression='bgzip' if name.lower().endswith('.gz') else None)
+            else:
+                with open(name, 'w') as f:
+                    f.write(session.assembled_reads)
+            session.savedfile = name
+        except OSError as error:
+            messagebox.showerror("Error Message", "Could not save the sequence: {}".format(error))
+            return
+        session.issequencesaved = True
+    else:
+        messagebox.showerror("Error Message", "No assembled sequence")
+
+
+
+def run_assembly(screen):
+    """
+      Runs the assembly of the imported reads in the background. The assembled sequence of the session is set once it
+      is done.
+      
+      Args:
+          screen - the NGSHomeScreen running the assembly.
+    
+      Returns:
+          NONE
+    
+      Raises:
+          KeyError: Raises an exception.
+      """
+    session = screen.session
+
+    def assembled(contigs):
+        # Contigs are shown and saved one per line, longest first.
+        session.assembled_reads = "\n".join(contigs)
+        session.issequencesaved = False
+        messagebox.showinfo("Assembly", "Assembled {} contigs, {} nucleotides".format(len(contigs),
+                                                                                     sum(map(len, contigs))))
+
+    def failed(message):
+        messagebox.showerror("Error Message", "Assembly failed: {}".format(message))
+
+    if session.filename != '' and session.reads:
+        screen.start_task("Assembling", _assembly_task, (session.reads,), assembled, failed)
+    else:
+        messagebox.showerror("Error Message", "No input file or incorrect file format")
+
+
+def instructions_page():
+    """
+      Outputs instructions page upon 'Instructions' button being pressed.
+      
+      Args:
+          NONE
+    
+      Returns:
+          NONE
+    
+      Raises:
+          KeyError: Raises an exception.
+      """
+    instructions = Toplevel()
+
+    instructions.title("Instructions")
+    # http://www.python-course.eu/tkinter_text_widget.php <-- to help with text
+    instructions.title = Message(instructions, text="Welcome to the DNA sequence assembler by Kevin Jian. "
+                                              "This program takes shogunned DNA strands in the form of "
+                                              "the nucleotide bases Cytosine(C), Guanine(G), Adenine(A), "
+                                              "and Thymine(T), and assembles them by looking for regions "
+                                              "of overlap. When you are ready, Import your file by "
+                                              "clicking file:Import on the top left of the main screen. "
+                                              "\nThe file can be FASTA, FASTQ or a .txt in the format of: "
+                                              "sequence #, (space), sequence, (newline), optionally gzip "
+                                              "compressed (.gz).\n\n"
+                                              "Example of the .txt format:\n"
+                                              "1 ATCG\n2 ATGG\n3 AGGG\n"
+                                              "\nWhen everything is set, press 'Assemble'. If you wish to display "
+                                              "The sequence, press 'display': you can scroll through the whole "
+                                              "sequence, jump to a position and search for a subsequence. "
+                                              "After the sequence is assembled, "
+                                              "export the assembled sequence by clicking file:export.")
+
+    # Welcome to the DNA sequence assembler by Kevin Jian. This software takes shotgunned DNA strands in the form of the nucleotide bases Cytosine(C), Guanine(G), Adenine(A), and Thymine(T), and assembles them by looking for regions of overlap. When you are ready, Import your file by clicking file:Import on the top left of the main screen. Note: the format of the file is very specific. Each individual DNA sequence must be on its own line. When everything is set, press 'Assemble'.
+    instructions.title.pack()
+
+
+class SequenceSource:
+    """
+    The assembled contigs, held in memory or read from the file they were saved to, so that only the slices being
+    viewed or searched are read. Positions are sequence coordinates: offsets in the contigs put end to end, without
+    the separators or the FASTA headers and line breaks of the text they are read from.
+    """
+
+    def __init__(self, text='', path=None):
+        """
+        Args:
+            text - the contigs, one per line, when they are not read from a file.
+            path - the file holding the contigs, read instead of text when given: FASTA through its .fai index (and
+                   .gzi index when bgzip compressed), or one contig per line, memory-mapped.
+
+        Raises:
+            OSError: the file or its indexes cannot be read.
+            ValueError: the .fai index is malformed.
+        """
+        self.data = text
+        self.path = path
+        self.entries = None
+        self.offsets = array('q')
+        self.starts = array('q', [0])
+        if path is not None and is_fasta(path):
+            self.entries = list(read_fai(path).values())
+            for entry in self.entries:
+                self.starts.append(self.starts[-1] + entry[0])
+            return
+        if path is not None:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size:
+                    self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        separator = '\n' if isinstance(self.data, str) else b'\n'
+        start = 0
+        while self.data and start <= len(self.data):
+            end = self.data.find(separator, start)
+            if end < 0:
+                end = len(self.data)
+            self.offsets.append(start)
+            self.starts.append(self.starts[-1] + end - start)
+            start = end + 1
+
+    def __len__(self):
+        return self.starts[-1]
+
+    @property
+    def count(self):
+        """The amount of contigs."""
+        return len(self.starts) - 1
+
+    def contig(self, position):
+        """Returns the number of the contig holding a position."""
+        return bisect_right(self.starts, position) - 1
+
+    def read(self, number, start, end):
+        """Returns the bases from start to end (excluded) of a contig, start and end being offsets in the contig."""
+        end = min(end, self.starts[number + 1] - self.starts[number])
+        if self.entries is not None:
+            return read_entry(self.path, self.entries[number], start, end)
+        part = self.data[self.offsets[number] + start:self.offsets[number] + max(start, end)]
+        return part if isinstance(part, str) else part.decode('ascii', 'replace')
+
+    def find(self, pattern, start=0):
+        """
+        Returns the position of the first match of pattern at or after position start, in either case, or -1. Matches
+        do not span two contigs. Contigs are read SEARCH_CHUNK bases at a time.
+        """
+        variants = {pattern.lower(), pattern.upper()}
+        start = max(0, start)
+        if start >= len(self):
+            return -1
+        for number in range(self.contig(start), self.count):
+            offset = max(0, start - self.starts[number])
+            length = self.starts[number + 1] - self.starts[number]
+            while offset + len(pattern) <= length:
+                chunk = self.read(number, offset, offset + SEARCH_CHUNK + len(pattern) - 1)
+                hits = [hit for hit in (chunk.find(variant) for variant in variants) if hit >= 0]
+                if hits:
+                    return self.starts[number] + offset + min(hits)
+                offset += SEARCH_CHUNK
+        return -1
+
+
+class SequenceViewer:
+    """
+    A window browsing a SequenceSource VIEW_LINES lines of LINE_WIDTH nucleotides at a time. Only the visible lines are
+    rendered into the Text widget, and the scrollbar is driven by hand, so memory and latency do not depend on the
+    length of the sequence. Every contig starts on a new line, and all but the last end with a '|'. Lines are numbered
+    by the position of their first nucleotide in the sequence.
+    """
+
+    def __init__(self, master, source):
+        """
+        Args:
+            master - the parent widget.
+            source - the SequenceSource to browse.
+        """
+        self.source = source
+        # The first line of every contig, then the amount of lines.
+        self.rows = array('q', [0])
+        for number in range(source.count):
+            self.rows.append(self.rows[-1] - (-(source.starts[number + 1] - source.starts[number]) // LINE_WIDTH))
+        self.lines = max(1, self.rows[-1])
+        self.top = 0
+        self.match = None
+        self.gutter = len(str(len(source))) + 1
+
+        self.window = Toplevel(master)
+        self.window.title("Assembled sequence ({:,} nucleotides, {:,} contigs)".format(len(source), source.count))
+        self.window.resizable(0, 0)
+
+        controls = Frame(self.window)
+        controls.pack(side=TOP, fill=X)
+        Label(controls, text="Position").pack(side=LEFT)
+        self.position = Entry(controls, width=12)
+        self.position.pack(side=LEFT)
+        self.position.bind("<Return>", lambda event: self.jump())
+        Button(controls, text="Go", command=self.jump).pack(side=LEFT)
+        Label(controls, text="Search").pack(side=LEFT)
+        self.pattern = Entry(controls, width=16)
+        self.pattern.pack(side=LEFT)
+        self.pattern.bind("<Return>", lambda event: self.find_next())
+        Button(controls, text="Find next", command=self.find_next).pack(side=LEFT)
+
+        self.scrollbar = Scrollbar(self.window, command=self.scroll)
+        self.text = Text(self.window, font="TkFixedFont", height=VIEW_LINES, width=self.gutter + LINE_WIDTH + 1,
+                         wrap=NONE)
+        self.text.tag_configure('match', background='yellow')
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        self.text.pack(side=LEFT, fill=Y)
+
+        for sequence, lines in (("<MouseWheel>", None), ("<Button-4>", -3), ("<Button-5>", 3), ("<Up>", -1),
+                                ("<Down>", 1), ("<Prior>", -VIEW_LINES), ("<Next>", VIEW_LINES)):
+            self.text.bind(sequence, lambda event, lines=lines: self.move(
+                lines if lines is not None else (-3 if event.delta > 0 else 3)) or "break")
+        self.text.bind("<Home>", lambda event: self.move(-self.lines) or "break")
+        self.text.bind("<End>", lambda event: self.move(self.lines) or "break")
+        self.text.bind("<1>", lambda event: self.text.focus_set())
+        self.render()
+
+    def scroll(self, *args):
+        """Scrollbar command: 'moveto fraction' or 'scroll n units|pages'."""
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * self.lines)
+            self.render()
+        elif args[0] == 'scroll':
+            self.move(int(args[1]) * (VIEW_LINES if args[2] == 'pages' else 1))
+
+    def move(self, lines):
+        self.top += lines
+        self.render()
+
+    def render(self):
+        """Renders the visible lines and places the scrollbar."""
+        self.top = max(0, min(self.top, self.lines - VIEW_LINES))
+        rows = []
+        number = bisect_right(self.rows, self.top) - 1
+        row = self.top
+        while len(rows) < VIEW_LINES and number < self.source.count:
+            # The visible lines of a contig are read at once.
+            last = min(self.rows[number + 1], self.top + VIEW_LINES)
+            offset = (row - self.rows[number]) * LINE_WIDTH
+            bases = self.source.read(number, offset, (last - self.rows[number]) * LINE_WIDTH)
+            for start in range(0, len(bases), LINE_WIDTH):
+                rows.append((self.source.starts[number] + offset + start, bases[start:start + LINE_WIDTH]))
+            if rows and last == self.rows[number + 1] and number + 1 < self.source.count:
+                rows[-1] = (rows[-1][0], rows[-1][1] + '|')
+            row = last
+            number += 1
+
+        self.text.config(state=NORMAL)
+        self.text.delete('1.0', END)
+        self.text.insert(END, "\n".join("{:>{}} {}".format(position + 1, self.gutter - 1, bases)
+                                         for position, bases in rows))
+        if self.match is not None:
+            for line, (position, bases) in enumerate(rows, 1):
+                for column in range(max(self.match[0] - position, 0), min(self.match[1] - position, len(bases))):
+                    self.text.tag_add('match', "{}.{}".format(line, self.gutter + column))
+        self.text.config(state=DISABLED)
+        self.scrollbar.set(self.top / self.lines, min(1.0, (self.top + VIEW_LINES) / self.lines))
+
+    def row(self, position):
+        """Returns the line showing a position."""
+        number = self.source.contig(position)
+        return self.rows[number] + (position - self.source.starts[number]) // LINE_WIDTH
+
+    def jump(self):
+        """Scrolls to the 1-based position typed in the position field."""
+        try:
+            position = int(self.position.get().replace(',', ''))
+        except ValueError:
+            messagebox.showerror("Error Message", "Position must be a number", parent=self.window)
+            return
+        if not 0 < position <= len(self.source):
+            messagebox.showerror("Error Message", "Position must be between 1 and {}".format(len(self.source)),
+                                 parent=self.window)
+            return
+        self.top = self.row(position - 1)
+        self.render()
+
+    def find_next(self):
+        """Scrolls to the next match of the search field after the current one, wrapping around at the end."""
+        pattern = self.pattern.get().strip()
+        if not pattern:
+            return
+        if self.match is not None:
+            start = self.match[0] + 1
+        else:
+            number = bisect_right(self.rows, self.top) - 1
+            start = self.source.starts[number] + (self.top - self.rows[number]) * LINE_WIDTH
+        hit = self.source.find(pattern, start)
+        if hit < 0:
+            hit = self.source.find(pattern, 0)
+        if hit < 0:
+            self.match = None
+            self.render()
+            messagebox.showinfo("Search", "{} not found".format(pattern), parent=self.window)
+            return
+        self.match = (hit, hit + len(pattern))
+        self.top = self.row(hit)
+        self.render()
+
+
+def display_pg(session):
+    """
+      Opens a SequenceViewer on the assembled sequence upon the 'Display' button being pressed. The sequence is read
+      from the file it was saved to, if any, and is otherwise read from memory.
+      
+      Args:
+          session - the AssemblySession holding the assembled sequence.
+    
+      Returns:
+          NONE
+    
+      Raises:
+          KeyError: Raises an exception.
+      """
+    if session.filename != '' and session.issequencesaved != NOFILE and session.assembled_reads:
+        source = None
+        if session.issequencesaved is True and session.savedfile:
+            try:
+                source = SequenceSource(path=session.savedfile)
+            except (OSError, ValueError):
+                # The saved file or its index was moved or changed since.
+                source = None
+        if source is None:
+            source = SequenceSource(session.assembled_reads)
+        SequenceViewer(None, source)
+    else:
+        messagebox.showerror("Error Message", "No sequence to display")
+
+
+class NGSHomeScreen:
+    def __init__(self, master):
+        """
+            Handles all functionality for the GUI.
+
+            Args:
+                NONE
+          
+            Returns:
+                NONE
+
+            Raises:
+                KeyError: Raises an exception.
+            """
+
+        self.master = master
+        self.task = None
+        self.session = AssemblySession()
+        master.geometry('405x260+200+200')
+        menu = Menu(master)
+        master.config(menu=menu)
+        filemenu = Menu(master)
+        importmenu = Menu(master)
+
+        menu.add_cascade(label="File", menu=filemenu)
+        filemenu.add_cascade(label="Import", menu=importmenu)
+        filemenu.add_cascade(label="Save Sequence As...", command=lambda: save_sequence(self.session))
+        importmenu.add_command(label="DNA Strands",  command=lambda: read_data(self))
+
+        self.title = Label(master, text="DNA Sequence Assembler\n")
+        self.title.pack()
+
+        self.infile_name_display = Label(master, text="Input File: ")
+        self.infile_name_display.pack()
+
+        self.status = Label(master, text="")
+        self.status.pack()
+        self.progress = ttk.Progressbar(master, length=300, mode='determinate')
+        self.progress.pack()
+        self.cancel_button = Button(master, text="Cancel", state=DISABLED, command=self.cancel_task)
+        self.cancel_button.pack()
+
+        # def check_saved_file():
+        #     if issequencesaved == False:
+        #         messagebox.showerror("Warning", "Assembled sequence was not saved")
+        #     elif messagebox.askokcancel("Warning", "Do you want to exit?"):
+        #         quit()
+
+        # self.exit_button = Button(master, text="Exit", command=lambda: check_saved_file())
+        # self.exit_button.pack(side=BOTTOM)
+
+        self.about_button = Button(master, text="Instructions", command=instructions_page)
+        self.about_button.pack(side=BOTTOM)
+
+        self.display_button = Button(master, text="Display", command=lambda: display_pg(self.session))
+        self.display_button.pack(side=BOTTOM)
+
+        self.assemble_button = Button(master, text="Assemble", command=lambda: run_assembly(self))
+        self.assemble_button.pack(side=BOTTOM)
+
+    def show_filename(self):
+        """Displays the name of the input file."""
+        self.infile_name_display.configure(text="Input File: %s" % self.session.filename)
+
+    def start_task(self, title, function, args, on_done, on_error):
+        """
+          Runs a function in a BackgroundTask, showing its progress until it is done, fails or is cancelled.
+
+          Args:
+              title - the title of the task shown in the status line.
+              function - the function to run, see BackgroundTask.
+              args - the positional arguments of the function.
+              on_done - called with the result of the function.
+              on_error - called with an error message.
+
+          Returns:
+              NONE
+
+          Raises:
+              NONE
+          """
+        if self.task is not None:
+            messagebox.showerror("Error Message", "Please wait for the current task or cancel it")
+            return
+
+        def progress(stage, event, done):
+            if event == 'start':
+                self.status.configure(text="{}: {}".format(title, stage.replace('_', ' ')))
+                self.progress.stop()
+                self.progress.configure(mode='indeterminate', value=0)
+                self.progress.start()
+            elif event == 'progress' and done is not None:
+                self.progress.stop()
+                self.progress.configure(mode='determinate', maximum=done[1], value=done[0])
+
+        def finish(callback):
+            def finished(result):
+                self.stop_task()
+                callback(result)
+            return finished
+
+        self.status.configure(text="{}...".format(title))
+        self.cancel_button.configure(state=NORMAL)
+        self.assemble_button.configure(state=DISABLED)
+        self.progress.configure(mode='indeterminate')
+        self.progress.start()
+        self.task = BackgroundTask(self.master, function, args, progress, finish(on_done), finish(on_error))
+
+    def stop_task(self):
+        """Resets the progress display once the task is over."""
+        self.task = None
+        self.progress.stop()
+        self.progress.configure(mode='determinate', value=0)
+        self.status.configure(text="")
+        self.cancel_button.configure(state=DISABLED)
+        self.assemble_button.configure(state=NORMAL)
+
+    def cancel_task(self):
+        """Stops the running task."""
+        if self.task is not None:
+            self.task.cancel()
+            self.stop_task()
+            self.status.configure(text="Cancelled")
+
+
+def on_closing(screen):
+    if screen.session.issequencesaved == False:
+        messagebox.showerror("Warning", "Assembled sequence was not saved")
+    elif messagebox.askokcancel("Warning", "Do you want to exit?"):
+        screen.cancel_task()
+        quit()
+
+
+def main():
+    root = Tk()
+    root.resizable(0, 0)
+
+    screen = NGSHomeScreen(root)
+
+    root.protocol("WM_DELETE_WINDOW", lambda: on_closing(screen))
+    root.mainloop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+"""
+Batch assembly of many read sets.
+
+A manifest lists one job per line: the reads to assemble and, optionally, the file to write the contigs to and the
+memory limit of the job, separated by tabs. Blank lines and lines starting with # are skipped:
+
+    sample1.fastq.gz
+    sample2.fastq.gz	sample2.fa.gz	4G
+
+    python -m DNA_batch manifest.tsv --output-dir contigs --jobs 4 --memory-limit 2G [--metrics metrics.jsonl]
+
+Jobs are scheduled on one shared process pool. Its workers are started once and run job after job, so the process
+start-up and the imports are paid once per worker rather than once per job. Every job runs the pipeline of
+DNA_sequence_assembler serially within its worker, under its own address space limit (RLIMIT_AS): a job that runs out
+of memory fails with a MemoryError and the worker goes on with the next job. A worker that dies breaks the pool: only
+the job it was running is marked failed, the others are run again in a new pool. Every finished job appends a JSON
+line of metrics (status, wall time, worker, and the report of its Profiler) to the metrics file.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from DNA_de_bruijn import DEFAULT_K, MIN_COUNT
+from DNA_fasta import COMPRESSIONS, LINE_WIDTH
+from DNA_overlap import ERROR_RATE, OVERLAP_ENGINES, MyersEngine
+from DNA_profile import Profiler
+from DNA_reads import load_reads
+from DNA_sequence_assembler import ASSEMBLY_MODES, MIN_OVERLAP, run_assembly, write_output
+
+READ_EXTENSIONS = ('.fastq', '.fq', '.fasta', '.fa', '.fna', '.txt')
+SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+OUTPUT_EXTENSION = '.fa'
+
+log = logging.getLogger(__name__)
+
+
+def parse_size(text):
+    """
+    Parses a memory size such as 512M or 2G (binary units, an optional B suffix) into bytes.
+
+    Args:
+        text - the size.
+
+    Returns:
+        The size in bytes.
+
+    Raises:
+        ValueError: the size is not a positive amount of bytes, K, M, G or T.
+    """
+    value = text.strip().upper()
+    if value.endswith('B'):
+        value = value[:-1]
+    unit = value[-1:] if value[-1:] in SIZE_UNITS else ''
+    try:
+        size = int(float(value[:len(value) - len(unit)]) * SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError("Invalid size: {}".format(text)) from None
+    if size <= 0:
+        raise ValueError("Invalid size: {}".format(text))
+    return size
+
+
+def sample_name(filename):
+    """Returns the name of a read file without its directory, compression and read format extensions."""
+    name = os.path.basename(filename)
+    if name.lower().endswith('.gz'):
+        name = name[:-3]
+    root, extension = os.path.splitext(name)
+    return root if extension.lower() in READ_EXTENSIONS else name
+
+
+class BatchJob:
+    """An assembly job of a batch: the reads to assemble, the file to write the contigs to and a memory limit."""
+
+    def __init__(self, input, output, memory_limit=None):
+        """
+        Args:
+            input - the read file.
+            output - the contig file, multi-FASTA or one contig per line as chosen by DNA_sequence_assembler.
+            memory_limit - the address space limit of the job in bytes, None for no limit.
+        """
+        self.input = input
+        self.output = output
+        self.memory_limit = memory_limit
+
+    def __repr__(self):
+        return 'BatchJob({!r}, {!r}, {!r})'.format(self.input, self.output, self.memory_limit)
+
+
+def read_manifest(filename, output_dir='.', memory_limit=None):
+    """
+    Reads the jobs of a manifest. Relative read files are relative to the manifest, relative output files to the
+    output directory. The output file defaults to the sample name of the reads (see sample_name()) with a .fa
+    extension.
+
+    Args:
+        filename - the name of the manifest.
+        output_dir - the directory of the output files.
+        memory_limit - the memory limit of the jobs whose line sets none, in bytes, or None.
+
+    Returns:
+        jobs - the BatchJob of every line, in manifest order.
+
+    Raises:
+        OSError: the manifest cannot be read.
+        ValueError: a line is malformed, the manifest lists no job, or two jobs write to the same file.
+    """
+    base = os.path.dirname(os.path.abspath(filename))
+    jobs = []
+    outputs = dict()
+    with open(filename) as f:
+        for number, line in enumerate(f, 1):
+            line = line.rstrip('\r\n')
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            fields = [field.strip() for field in line.split('\t')]
+            if len(fields) > 3 or not fields[0]:
+                raise ValueError("{}:{}: expected reads, output and memory limit separated by tabs".format(filename,
+                                                                                                           number))
+            reads = os.path.join(base, fields[0])
+            output = fields[1] if len(fields) > 1 and fields[1] else sample_name(reads) + OUTPUT_EXTENSION
+            output = os.path.join(output_dir, output)
+            limit = parse_size(fields[2]) if len(fields) > 2 and fields[2] else memory_limit
+            if output in outputs:
+                raise ValueError("{}:{}: same output file as line {}: {}".format(filename, number, outputs[output],
+                                                                                output))
+            outputs[output] = number
+            jobs.append(BatchJob(reads, output, limit))
+    if not jobs:
+        raise ValueError("{}: no job to run".format(filename))
+    return jobs
+
+
+def _limit_memory(limit):
+    """Sets the soft address space limit of the process, returning the previous limits to restore."""
+    previous = resource.getrlimit(resource.RLIMIT_AS)
+    if limit is not None:
+        hard = previous[1]
+        resource.setrlimit(resource.RLIMIT_AS, (limit if hard == resource.RLIM_INFINITY else min(limit, hard), hard))
+    return previous
+
+
+def run_job(job, options, line_width=LINE_WIDTH, compression=None, started=None, number=None):
+    """
+    Runs a job: loads the reads, assembles them and writes the contigs, under the memory limit of the job. Meant to
+    run in a worker of the batch pool; the limit is lifted once the job is over, so the worker can run the next one.
+
+    Args:
+        job - the BatchJob.
+        options - the keyword arguments of DNA_sequence_assembler.run_assembly(), but for workers and profiler.
+        line_width - the amount of bases per line of FASTA output.
+        compression - the compression of FASTA output, see DNA_sequence_assembler.write_output().
+        started - a dictionary shared with the batch (e.g. by a multiprocessing manager) where the job records
+                  number: the pid of its worker when it starts, or None.
+        number - the number of the job in the batch.
+
+    Returns:
+        metrics - a JSON-serializable dictionary: input, output, status ('ok', 'error' or 'memory' when the job ran out
+                  of memory), error (the error message, when it failed), seconds, pid (of the worker) and profile (see
+                  DNA_profile.Profiler.report(); its peak RSS is the one of the worker so far).
+
+    Raises:
+        NONE
+    """
+    if started is not None:
+        started[number] = os.getpid()
+    metrics = {'input': job.input, 'output': job.output, 'memory_limit': job.memory_limit, 'pid': os.getpid()}
+    profiler = Profiler()
+    start = time.perf_counter()
+    previous = _limit_memory(job.memory_limit)
+    try:
+        with profiler.stage('read_load'):
+            reads = load_reads(job.input)
+        contigs = run_assembly(reads, workers=1, profiler=profiler, **options)
+        with profiler.stage('write_output'):
+            write_output(job.output, contigs, line_width=line_width, compression=compression)
+        metrics['status'] = 'ok'
+    except MemoryError:
+        metrics.update(status='memory', error="Memory limit exceeded")
+    except (OSError, ValueError) as error:
+        metrics.update(status='error', error=str(error))
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, previous)
+    metrics['seconds'] = time.perf_counter() - start
+    metrics['profile'] = profiler.report()
+    return metrics
+
+
+def _failure(job, error, pid=None):
+    """Returns the metrics of a job that did not return any."""
+    return {'input': job.input, 'output': job.output, 'memory_limit': job.memory_limit, 'pid': pid, 'status': 'error',
+            'error': error}
+
+
+def _run_pool(jobs, numbers, workers, arguments, started, finish):
+    """
+    Runs jobs on a new pool of worker processes until they are all done or a worker dies, which breaks the pool.
+
+    Args:
+        jobs - the BatchJobs of the batch.
+        numbers - the numbers of the jobs to run.
+        workers - the amount of worker processes.
+        arguments - the arguments of run_job() following the job.
+        started - the shared dictionary the jobs record their worker in, see run_job().
+        finish - called as finish(number, metrics) for every job done.
+
+    Returns:
+        (suspects, unstarted) - the numbers of the jobs that were running and of the jobs that had not started yet when
+                                the pool broke, both empty when it did not.
+    """
+    started.clear()
+    unfinished = set(numbers)
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(numbers)))) as executor:
+        futures = {executor.submit(run_job, jobs[number], *arguments, started=started, number=number): number
+                   for number in numbers}
+        for future in as_completed(futures):
+            number = futures[future]
+            try:
+                record = future.result()
+            except BrokenProcessPool:
+                continue
+            except Exception as error:
+                # An unexpected error of the job, which leaves its worker usable.
+                record = _failure(jobs[number], str(error) or type(error).__name__, started.get(number))
+            unfinished.discard(number)
+            finish(number, record)
+    running = started.copy()
+    return ([number for number in numbers if number in unfinished and number in running],
+            [number for number in numbers if number in unfinished and number not in running])
+
+
+def run_batch(jobs, options, workers=None, metrics=None, line_width=LINE_WIDTH, compression=None):
+    """
+    Runs jobs on a shared pool of worker processes, each worker running one job at a time and reusing its warmed up
+    interpreter for the next.
+
+    A worker that dies (e.g. killed by a signal or by the out of memory killer) breaks the pool and every job still
+    running on it. The jobs record their worker when they start, so the jobs that were running are told from those
+    still waiting: a job running alone is the one that killed its worker and is marked failed, several jobs running
+    together are run again one at a time to find it. The other jobs go on with a new pool.
+
+    Args:
+        jobs - the BatchJobs to run.
+        options - the keyword arguments of DNA_sequence_assembler.run_assembly(), but for workers and profiler.
+        workers - the amount of worker processes, None for one per CPU.
+        metrics - the file to append the metrics of every job to as JSON lines, in completion order, or None.
+        line_width - the amount of bases per line of FASTA output.
+        compression - the compression of FASTA output, see DNA_sequence_assembler.write_output().
+
+    Returns:
+        results - the metrics of every job (see run_job()), in job order.
+
+    Raises:
+        OSError: the metrics file or an output directory cannot be written.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    for job in jobs:
+        directory = os.path.dirname(job.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    results = [None] * len(jobs)
+    arguments = (options, line_width, compression)
+    log_file = open(metrics, 'a') if metrics else None
+
+    def finish(number, record):
+        results[number] = record
+        log.info("[%d/%d] %s: %s", sum(result is not None for result in results), len(jobs), jobs[number].input,
+                 record.get('error', record['status']))
+        if log_file is not None:
+            log_file.write(json.dumps(record) + "\n")
+            log_file.flush()
+
+    def died(number, pid):
+        finish(number, _failure(jobs[number], "The worker process died, e.g. killed by a signal or out of memory", pid))
+
+    try:
+        # The worker of each running job, kept by a manager process since it must outlive the pools.
+        with multiprocessing.Manager() as manager:
+            started = manager.dict()
+            waiting = list(range(len(jobs)))
+            while waiting:
+                suspects, unstarted = _run_pool(jobs, waiting, workers, arguments, started, finish)
+                if not suspects and len(unstarted) == len(waiting):
+                    # Nothing ran before the pool broke: try every job on its own.
+                    suspects, unstarted = unstarted, []
+                if len(suspects) == 1:
+                    died(suspects[0], started.get(suspects[0]))
+                else:
+                    for number in suspects:
+                        if any(_run_pool(jobs, [number], 1, arguments, started, finish)):
+                            died(number, started.get(number))
+                waiting = unstarted
+    finally:
+        if log_file is not None:
+            log_file.close()
+    return results
+
+
+def main(argv=None):
+    """
+    Command line entry point. Runs the jobs of a manifest.
+
+    Args:
+        argv - the command line arguments, sys.argv[1:] by default.
+
+    Returns:
+        The exit status: 0 when every job succeeded, 1 otherwise.
+
+    Raises:
+        NONE
+    """
+    parser = argparse.ArgumentParser(description="Assemble the read sets listed in a manifest on a shared pool of "
+                                                 "worker processes.")
+    parser.add_argument('manifest', help="one job per line: reads, then optionally the output file and the memory "
+                                         "limit, separated by tabs")
+    parser.add_argument('--output-dir', default='.',
+                        help="directory of the output files (default: the current directory)")
+    parser.add_argument('--jobs', type=int, default=0,
+                        help="worker processes, 0 for one per CPU (default: %(default)s)")
+    parser.add_argument('--memory-limit', type=parse_size,
+                        help="address space limit of every job without its own, e.g. 512M or 2G (default: none)")
+    parser.add_argument('--metrics', help="JSON lines file to append the metrics of every job to (default: "
+                                          "metrics.jsonl in the output directory)")
+    parser.add_argument('--line-width', type=int, default=LINE_WIDTH,
+                        help="bases per line of FASTA output (default: %(default)s)")
+    parser.add_argument('--compression', choices=COMPRESSIONS,
+                        help="compression of FASTA output; bgzip when the output file name ends with .gz by default")
+    parser.add_argument('--min-overlap', type=int, default=MIN_OVERLAP,
+                        help="smallest overlap between two reads (default: %(default)s)")
+    parser.add_argument('--engine', choices=sorted(OVERLAP_ENGINES), default='kmp',
+                        help="overlap engine (default: %(default)s)")
+    parser.add_argument('--error-rate', type=float,
+                        help="edits tolerated per overlapping nucleotide by the myers engine (default: {})"
+                             .format(ERROR_RATE))
+    parser.add_argument('--both-strands', action='store_true',
+                        help="reads may come from either strand of the DNA")
+    parser.add_argument('--cache', metavar='DIR', help="directory caching the overlap stage between runs")
+    parser.add_argument('--mode', choices=ASSEMBLY_MODES, default='overlap',
+                        help="assembly mode (default: %(default)s)")
+    parser.add_argument('--kmer', type=int, default=DEFAULT_K,
+                        help="k-mer length of the de-bruijn mode (default: %(default)s)")
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT,
+                        help="drop k-mers seen fewer times in the de-bruijn mode (default: %(default)s)")
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help="log every finished job to stderr; twice to also log the stages of the jobs")
+    args = parser.parse_args(argv)
+    if args.line_width < 1:
+        parser.error("--line-width must be positive")
+    if args.both_strands and args.mode != 'overlap':
+        parser.error("--both-strands needs --mode overlap")
+    engine = args.engine
+    if args.error_rate is not None:
+        if engine != MyersEngine.name:
+            parser.error("--error-rate needs --engine {}".format(MyersEngine.name))
+        try:
+            engine = MyersEngine(args.error_rate)
+        except ValueError as error:
+            parser.error(str(error))
+    # One -v logs the jobs of the batch only, the workers inheriting the WARNING level of the pipeline loggers.
+    logging.basicConfig(format='%(name)s: %(message)s', level=logging.INFO if args.verbose > 1 else logging.WARNING)
+    if args.verbose:
+        log.setLevel(logging.INFO)
+
+    try:
+        jobs = read_manifest(args.manifest, args.output_dir, args.memory_limit)
+    except (OSError, ValueError) as error:
+        print("Error: {}".format(error), file=sys.stderr)
+        return 1
+    options = {'min_overlap': args.min_overlap, 'engine': engine, 'mode': args.mode, 'k': args.kmer,
+               'min_count': args.min_count, 'cache': args.cache, 'both_strands': args.both_strands}
+    metrics = args.metrics or os.path.join(args.output_dir, 'metrics.jsonl')
+    try:
+        results = run_batch(jobs, options, args.jobs or None, metrics, args.line_width, args.compression)
+    except OSError as error:
+        print("Error: {}".format(error), file=sys.stderr)
+        return 1
+
+    failed = [result for result in results if result['status'] != 'ok']
+    for result in failed:
+        print("Error: {}: {}".format(result['input'], result['error']), file=sys.stderr)
+    print("{} of {} jobs assembled, metrics in {}".format(len(results) - len(failed), len(results), metrics))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,413 @@
+"""
+Benchmarks for the DNA sequence assembler.
+
+Usage:
+    python DNA_benchmark.py overlap [--lengths 100 200 300 400 500] [--pairs 2000]
+    python DNA_benchmark.py parallel [--reads 2000] [--workers 1 2 4 8] [--min-overlap 20 | --all-pairs]
+    python DNA_benchmark.py fragment [--sizes 1 10 100] [--gzip]
+    python DNA_benchmark.py assembly [--sizes 1000 10000 100000 1000000 10000000] [--json results.json]
+    python DNA_benchmark.py assembly --mode de-bruijn [--kmer 31] [--min-count 1]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import DNA_sequence_assembler as assembler
+from DNA_fragmenter import iter_fragments, map_genome, run_fragment, write_fragments
+from DNA_overlap import OVERLAP_ENGINES, iter_overlaps
+from DNA_profile import Profiler, peak_rss
+from DNA_reads import load_reads
+
+BASES = 'acgt'
+_TO_BASES = BASES.encode() * 64
+
+
+def random_sequence(length, rng):
+    """
+    Generates a random DNA sequence.
+
+    Args:
+        length - the amount of nucleotides to generate.
+        rng - the random.Random instance to draw from.
+
+    Returns:
+        The generated sequence.
+
+    Raises:
+        NONE
+    """
+    return ''.join(rng.choice(BASES) for _ in range(length))
+
+
+def write_genome(filename, length, rng, line_width=60):
+    """
+    Writes a random genome to a file, line wrapped like a typical reference.
+
+    Args:
+        filename - the name of the genome file.
+        length - the amount of nucleotides.
+        rng - the random.Random instance to draw from.
+        line_width - the amount of nucleotides per line.
+
+    Returns:
+        NONE
+
+    Raises:
+        OSError: the file cannot be written.
+    """
+    block = line_width * 4096
+    with open(filename, 'wb') as f:
+        for start in range(0, length, block):
+            data = rng.randbytes(min(block, length - start)).translate(_TO_BASES)
+            f.write(b'\n'.join(data[i:i + line_width] for i in range(0, len(data), line_width)) + b'\n')
+
+
+def make_pairs(length, pairs, rng):
+    """
+    Builds read pairs of a given length: a third unrelated, a third overlapping by a random amount, and a third where
+    the right read is contained in the left read.
+
+    Args:
+        length - the length of the reads.
+        pairs - the amount of pairs to build.
+        rng - the random.Random instance to draw from.
+
+    Returns:
+        A list of (left, right) tuples.
+
+    Raises:
+        NONE
+    """
+    result = []
+    for i in range(pairs):
+        left = random_sequence(length, rng)
+        kind = i % 3
+        if kind == 0:
+            right = random_sequence(length, rng)
+        elif kind == 1:
+            lap = rng.randint(1, length - 1)
+            right = left[length - lap:] + random_sequence(length - lap, rng)
+        else:
+            start = rng.randint(1, length // 2)
+            right = left[start:start + length // 3]
+        result.append((left, right))
+    return result
+
+
+def bench_overlap(lengths, pairs, seed=0):
+    """
+    Measures the per-pair cost of every registered overlap engine. The per-read prepare() step is timed separately,
+    since get_all_overlaps() runs it once per right read rather than once per pair. The results of the exact engines
+    are checked against each other.
+
+    Args:
+        lengths - the read lengths to benchmark.
+        pairs - the amount of pairs per read length.
+        seed - the seed of the random generator.
+
+    Returns:
+        results - a list of dictionaries with the engine, read length, microseconds per prepare() and per pair.
+
+    Raises:
+        AssertionError: two exact engines disagree on a pair.
+    """
+    rng = random.Random(seed)
+    results = []
+    for length in lengths:
+        sample = make_pairs(length, pairs, rng)
+        expected = None
+        for name, engine in OVERLAP_ENGINES.items():
+            start = time.perf_counter()
+            prepared = [engine.prepare(right) for left, right in sample]
+            middle = time.perf_counter()
+            found = [engine.overlap(left, right, state) for (left, right), state in zip(sample, prepared)]
+            end = time.perf_counter()
+            if engine.exact:
+                if expected is None:
+                    expected = found
+                assert found == expected, "engine {} disagrees".format(name)
+            results.append({'engine': name, 'length': length,
+                            'us_prepare': (middle - start) / pairs * 1e6,
+                            'us_per_pair': (end - middle) / pairs * 1e6})
+    return results
+
+
+def sample_reads(genome, count, lower, upper, rng):
+    """
+    Samples reads at random positions of a genome.
+
+    Args:
+        genome - the genome to sample from.
+        count - the amount of reads.
+        lower - the shortest read length.
+        upper - the longest read length.
+        rng - the random.Random instance to draw from.
+
+    Returns:
+        reads - a dictionary mapping the sequence number to the read, numbered from 1.
+
+    Raises:
+        NONE
+    """
+    reads = dict()
+    for key in range(1, count + 1):
+        length = rng.randint(lower, upper)
+        start = rng.randrange(max(1, len(genome) - length))
+        reads[key] = genome[start:start + length]
+    return reads
+
+
+def bench_parallel(read_count, workers, min_overlap=20, seed=0):
+    """
+    Measures how the overlap stage scales with the amount of worker processes. The reads are 80-120bp and sampled
+    from a random genome at roughly 10x coverage.
+
+    Args:
+        read_count - the amount of reads.
+        workers - the amounts of workers to benchmark.
+        min_overlap - the smallest overlap to keep, or None to compare all pairs.
+        seed - the seed of the random generator.
+
+    Returns:
+        results - a list of dictionaries with the amount of workers, wall time, speedup and amount of overlaps.
+
+    Raises:
+        AssertionError: the results depend on the amount of workers.
+    """
+    rng = random.Random(seed)
+    genome = random_sequence(max(200, read_count * 10), rng)
+    reads = sample_reads(genome, read_count, 80, 120, rng)
+
+    results = []
+    expected = None
+    for count in workers:
+        start = time.perf_counter()
+        found = list(iter_overlaps(reads, min_overlap=min_overlap, workers=count))
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            expected = found
+        assert found == expected, "{} workers disagree".format(count)
+        results.append({'workers': count, 'seconds': elapsed, 'speedup': results[0]['seconds'] / elapsed
+                        if results else 1.0, 'overlaps': len(found)})
+    return results
+
+
+def bench_fragment(sizes, compress=False, seed=0):
+    """
+    Measures the throughput of the fragmenter on random genomes, with its default parameters (100bp, 3 randomized
+    rounds of 50-150bp).
+
+    Args:
+        sizes - the genome sizes to benchmark, in megabases.
+        compress - whether to gzip compress the fragments.
+        seed - the seed of the random generator.
+
+    Returns:
+        results - a list of dictionaries with the genome size, wall time, fragments per second and genome and output
+                  megabytes per second.
+
+    Raises:
+        OSError: the temporary files cannot be written.
+    """
+    rng = random.Random(seed)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        genome = os.path.join(directory, 'genome.txt')
+        output = os.path.join(directory, 'FRAGMENTED.txt' + ('.gz' if compress else ''))
+        for size in sizes:
+            write_genome(genome, int(size * 1e6), rng)
+            start = time.perf_counter()
+            fragments = run_fragment(genome, 100, 3, 50, 150, output, compress)
+            elapsed = time.perf_counter() - start
+            results.append({'megabases': size, 'seconds': elapsed, 'fragments_per_second': fragments / elapsed,
+                            'genome_mb_per_second': os.path.getsize(genome) / 1e6 / elapsed,
+                            'output_mb_per_second': os.path.getsize(output) / 1e6 / elapsed})
+    return results
+
+
+def contig_accuracy(contigs, reference):
+    """
+    Compares assembled contigs with the reference genome.
+
+    Args:
+        contigs - the assembled contigs, longest first.
+        reference - the reference genome.
+
+    Returns:
+        A dictionary with whether the assembly is exactly the reference, the contig count, the total and largest
+        contig length, the N50, and the amount of contigs that are not a substring of the reference (misassembled).
+
+    Raises:
+        NONE
+    """
+    total = sum(map(len, contigs))
+    n50 = 0
+    covered = 0
+    for contig in contigs:
+        covered += len(contig)
+        if 2 * covered >= total:
+            n50 = len(contig)
+            break
+    return {'exact': contigs == [reference], 'contigs': len(contigs), 'assembled_length': total,
+            'reference_length': len(reference), 'largest_contig': len(contigs[0]) if contigs else 0, 'n50': n50,
+            'misassembled_contigs': sum(contig not in reference for contig in contigs)}
+
+
+def bench_assembly_case(size, seed=0, min_overlap=20, workers=1, mode='overlap', k=31, min_count=1):
+    """
+    Generates a random genome, fragments it with the fragmenter (100bp, 3 randomized rounds of 50-150bp), assembles
+    the fragments and checks the result against the genome. Meant to run in a fresh process, so that the peak RSS is
+    the one of this case only.
+
+    Args:
+        size - the genome size, in nucleotides.
+        seed - the seed of the genome and of the random fragment lengths.
+        min_overlap - the smallest overlap between two reads.
+        workers - the amount of worker processes for the overlap stage.
+        mode - the assembly mode, 'overlap' or 'de-bruijn'.
+        k - the k-mer length of the de-bruijn mode.
+        min_count - the smallest k-mer count kept by the de-bruijn mode. The fragments are error-free and only about
+                    3x deep, so every k-mer is kept by default.
+
+    Returns:
+        result - a dictionary with the read count, seconds per stage, total seconds, peak RSS, the counters of the
+                 pipeline (see DNA_profile.Profiler) and accuracy.
+
+    Raises:
+        OSError: the temporary files cannot be written.
+    """
+    rng = random.Random(seed)
+    profiler = Profiler()
+    with tempfile.TemporaryDirectory() as directory:
+        genome_file = os.path.join(directory, 'genome.txt')
+        reads_file = os.path.join(directory, 'FRAGMENTED.txt')
+        write_genome(genome_file, size, rng)
+        genome = map_genome(genome_file)
+        reference = genome[:].decode('ascii')
+        write_fragments(genome, iter_fragments(len(genome), 100, 3, 50, 150, rng), reads_file)
+        genome.close()
+
+        with profiler.stage('read_load'):
+            reads = load_reads(reads_file)
+
+    contigs = assembler.run_assembly(reads, min_overlap=min_overlap, workers=workers, mode=mode, k=k,
+                                     min_count=min_count, profiler=profiler)
+
+    return {'genome_size': size, 'reads': len(reads),
+            'stages': {name: record['seconds'] for name, record in profiler.stages.items()},
+            'seconds': profiler.seconds, 'peak_rss': peak_rss(), 'counters': dict(profiler.counters),
+            'accuracy': contig_accuracy(contigs, reference)}
+
+
+def bench_assembly(sizes, seed=0, min_overlap=20, workers=1, mode='overlap', k=31, min_count=1):
+    """
+    Runs bench_assembly_case() for every genome size, each in a fresh process.
+
+    Args:
+        sizes - the genome sizes to benchmark, in nucleotides.
+        seed - the seed of the genomes and of the random fragment lengths.
+        min_overlap - the smallest overlap between two reads.
+        workers - the amount of worker processes for the overlap stage.
+        mode - the assembly mode, 'overlap' or 'de-bruijn'.
+        k - the k-mer length of the de-bruijn mode.
+        min_count - the smallest k-mer count kept by the de-bruijn mode.
+
+    Returns:
+        report - a dictionary with the environment, the parameters and the result of every case.
+
+    Raises:
+        OSError: the temporary files cannot be written.
+    """
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        revision = None
+
+    cases = []
+    context = multiprocessing.get_context('spawn')
+    for size in sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            cases.append(executor.submit(bench_assembly_case, size, seed, min_overlap, workers, mode, k,
+                                         min_count).result())
+    return {'revision': revision, 'python': platform.python_version(), 'timestamp': time.time(),
+            'parameters': {'seed': seed, 'mode': mode, 'min_overlap': min_overlap, 'workers': workers, 'k': k,
+                           'min_count': min_count}, 'cases': cases}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DNA sequence assembler benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    overlap = commands.add_parser('overlap', help="per-pair cost of the overlap engines")
+    overlap.add_argument('--lengths', type=int, nargs='+', default=[100, 200, 300, 400, 500])
+    overlap.add_argument('--pairs', type=int, default=2000)
+    overlap.add_argument('--seed', type=int, default=0)
+
+    parallel = commands.add_parser('parallel', help="scaling of the overlap stage with worker processes")
+    parallel.add_argument('--reads', type=int, default=2000)
+    parallel.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parallel.add_argument('--min-overlap', type=int, default=20)
+    parallel.add_argument('--all-pairs', action='store_true', help="compare every pair instead of seeding")
+    parallel.add_argument('--seed', type=int, default=0)
+
+    fragment = commands.add_parser('fragment', help="throughput of the fragmenter")
+    fragment.add_argument('--sizes', type=float, nargs='+', default=[1, 10, 100], help="genome sizes in megabases")
+    fragment.add_argument('--gzip', action='store_true')
+    fragment.add_argument('--seed', type=int, default=0)
+
+    assembly = commands.add_parser('assembly', help="end-to-end assembly time, memory and accuracy")
+    assembly.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000, 10000000],
+                          help="genome sizes in nucleotides")
+    assembly.add_argument('--min-overlap', type=int, default=20)
+    assembly.add_argument('--workers', type=int, default=1)
+    assembly.add_argument('--mode', choices=assembler.ASSEMBLY_MODES, default='overlap')
+    assembly.add_argument('--kmer', type=int, default=31)
+    assembly.add_argument('--min-count', type=int, default=1)
+    assembly.add_argument('--seed', type=int, default=0)
+    assembly.add_argument('--json', help="file to write the results to")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'overlap':
+        print("{:<8} {:>8} {:>12} {:>12}".format("engine", "length", "us/prepare", "us/pair"))
+        for row in bench_overlap(args.lengths, args.pairs, args.seed):
+            print("{engine:<8} {length:>8} {us_prepare:>12.2f} {us_per_pair:>12.2f}".format(**row))
+
+    elif args.command == 'parallel':
+        min_overlap = None if args.all_pairs else args.min_overlap
+        print("{:>8} {:>10} {:>8} {:>10}".format("workers", "seconds", "speedup", "overlaps"))
+        for row in bench_parallel(args.reads, args.workers, min_overlap, args.seed):
+            print("{workers:>8} {seconds:>10.3f} {speedup:>8.2f} {overlaps:>10}".format(**row))
+
+    elif args.command == 'fragment':
+        print("{:>8} {:>10} {:>14} {:>12} {:>12}".format("Mb", "seconds", "fragments/s", "genome MB/s", "output MB/s"))
+        for row in bench_fragment(args.sizes, args.gzip, args.seed):
+            print("{megabases:>8g} {seconds:>10.3f} {fragments_per_second:>14.0f} {genome_mb_per_second:>12.2f} "
+                  "{output_mb_per_second:>12.2f}".format(**row))
+
+    elif args.command == 'assembly':
+        report = bench_assembly(args.sizes, args.seed, args.min_overlap, args.workers, args.mode, args.kmer,
+                                args.min_count)
+        print("{:>10} {:>8} {:>10} {:>10} {:>6} {:>8} {:>10} {:>8}".format(
+            "size", "reads", "seconds", "peak MB", "exact", "contigs", "N50", "misasm"))
+        for case in report['cases']:
+            accuracy = case['accuracy']
+            print("{:>10} {:>8} {:>10.3f} {:>10.1f} {:>6} {:>8} {:>10} {:>8}".format(
+                case['genome_size'], case['reads'], case['seconds'], case['peak_rss'] / 1e6, str(accuracy['exact']),
+                accuracy['contigs'], accuracy['n50'], accuracy['misassembled_contigs']))
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
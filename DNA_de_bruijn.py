@@ -0,0 +1,347 @@
+"""
+De Bruijn graph assembly for high-coverage short reads.
+
+Instead of comparing reads pairwise, the reads are cut into k-mers which are counted in KmerTable, an open addressing
+hash table of 2-bit encoded k-mers backed by two flat arrays. K-mers seen fewer than min_count times (mostly
+sequencing errors) are dropped, and the remaining k-mers form the nodes of a de Bruijn graph whose edges are implicit:
+the successors of a k-mer are the up to four k-mers it overlaps by k - 1 bases. Maximal non-branching paths (unitigs)
+of the graph are walked into contigs. Memory scales with the amount of distinct k-mers, about 18 bytes each.
+"""
+
+import logging
+from array import array
+
+from DNA_profile import Profiler
+
+DEFAULT_K = 31
+MIN_COUNT = 2
+MAX_K = 31
+
+_CODES = bytearray(b'\x04' * 256)
+for _code, _bases in enumerate((b'Aa', b'Cc', b'Gg', b'Tt')):
+    for _base in _bases:
+        _CODES[_base] = _code
+_CODES = bytes(_CODES)
+_DECODE = {False: bytes(b'ACGT' + bytes(252)), True: bytes(b'acgt' + bytes(252))}
+
+log = logging.getLogger(__name__)
+
+_EMPTY = -1
+_MAX_COUNT = 0xFFFFFFFF
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_HASH_MASK = (1 << 64) - 1
+
+
+def _check_k(k):
+    if not 0 < k <= MAX_K:
+        raise ValueError("k must be between 1 and {}".format(MAX_K))
+
+
+def encode_kmer(kmer):
+    """
+    Encodes a k-mer at 2 bits per base, the first base in the high bits.
+
+    Args:
+        kmer - the k-mer, at most MAX_K bases of A, C, G and T.
+
+    Returns:
+        The encoded k-mer.
+
+    Raises:
+        ValueError: the k-mer is too long or holds another character.
+    """
+    _check_k(len(kmer))
+    value = 0
+    for code in kmer.encode('ascii', 'replace').translate(_CODES):
+        if code > 3:
+            raise ValueError("Not a DNA k-mer: {}".format(kmer))
+        value = value << 2 | code
+    return value
+
+
+def decode_kmer(value, k, lowercase=False):
+    """
+    Decodes a k-mer encoded by encode_kmer().
+
+    Args:
+        value - the encoded k-mer.
+        k - the k-mer length.
+        lowercase - whether to return lowercase bases.
+
+    Returns:
+        The k-mer.
+
+    Raises:
+        NONE
+    """
+    codes = bytearray(k)
+    for position in range(k - 1, -1, -1):
+        codes[position] = value & 3
+        value >>= 2
+    return codes.translate(_DECODE[lowercase]).decode('ascii')
+
+
+def iter_kmers(sequence, k):
+    """
+    Encodes the k-mers of a sequence with a rolling 2-bit window. Windows holding a base other than A, C, G or T are
+    skipped.
+
+    Args:
+        sequence - the sequence.
+        k - the k-mer length.
+
+    Returns:
+        A generator of encoded k-mers, in sequence order.
+
+    Raises:
+        NONE
+    """
+    mask = (1 << 2 * k) - 1
+    value = 0
+    valid = 0
+    for code in sequence.encode('ascii', 'replace').translate(_CODES):
+        if code > 3:
+            valid = 0
+            continue
+        value = (value << 2 | code) & mask
+        valid += 1
+        if valid >= k:
+            yield value
+
+
+class KmerTable:
+    """
+    A hash table counting 2-bit encoded k-mers. Keys live in an int64 array and counts in a parallel uint32 array;
+    collisions are resolved by linear probing and the table doubles when it is 70% full.
+    """
+
+    def __init__(self, k, capacity=1 << 10):
+        """
+        Args:
+            k - the k-mer length, at most MAX_K.
+            capacity - the initial amount of slots, rounded up to a power of two.
+        """
+        _check_k(k)
+        self.k = k
+        self._allocate(max(capacity, 8))
+
+    def _allocate(self, capacity):
+        bits = (capacity - 1).bit_length()
+        self.shift = 64 - bits
+        self.keys = array('q', [_EMPTY]) * (1 << bits)
+        self.counts = array('I', bytes(4 << bits))
+        self.used = 0
+
+    def slot(self, kmer):
+        """Returns the slot holding the k-mer, or the empty slot where it would be inserted."""
+        keys = self.keys
+        mask = len(keys) - 1
+        slot = ((kmer * _HASH_MULTIPLIER) & _HASH_MASK) >> self.shift
+        while keys[slot] != _EMPTY and keys[slot] != kmer:
+            slot = (slot + 1) & mask
+        return slot
+
+    def add(self, kmer, count=1):
+        """
+        Adds to the count of a k-mer, inserting it when needed. Counts saturate at 2**32 - 1.
+
+        Args:
+            kmer - the encoded k-mer.
+            count - the amount to add.
+
+        Returns:
+            NONE
+
+        Raises:
+            NONE
+        """
+        slot = self.slot(kmer)
+        if self.keys[slot] == _EMPTY:
+            if 10 * (self.used + 1) > 7 * len(self.keys):
+                self._grow()
+                slot = self.slot(kmer)
+            self.keys[slot] = kmer
+            self.used += 1
+        self.counts[slot] = min(self.counts[slot] + count, _MAX_COUNT)
+
+    def _grow(self):
+        keys, counts = self.keys, self.counts
+        self._allocate(2 * len(keys))
+        for slot, kmer in enumerate(keys):
+            if kmer != _EMPTY:
+                new_slot = self.slot(kmer)
+                self.keys[new_slot] = kmer
+                self.counts[new_slot] = counts[slot]
+                self.used += 1
+
+    def solid(self, min_count):
+        """
+        Copies the k-mers seen at least min_count times into a new, right-sized table.
+
+        Args:
+            min_count - the smallest count to keep.
+
+        Returns:
+            The new KmerTable.
+
+        Raises:
+            NONE
+        """
+        kept = sum(1 for count in self.counts if count >= min_count)
+        table = KmerTable(self.k, 10 * kept // 7 + 1)
+        for kmer, count in self.items():
+            if count >= min_count:
+                table.add(kmer, count)
+        return table
+
+    def items(self):
+        """Returns a generator of (k-mer, count) pairs, in slot order."""
+        return ((kmer, self.counts[slot]) for slot, kmer in enumerate(self.keys) if kmer != _EMPTY)
+
+    def successors(self, kmer):
+        """Returns the k-mers of the table that follow the given k-mer, i.e. overlap its last k - 1 bases."""
+        shifted = (kmer << 2) & ((1 << 2 * self.k) - 1)
+        return [shifted | code for code in range(4) if shifted | code in self]
+
+    def predecessors(self, kmer):
+        """Returns the k-mers of the table that precede the given k-mer, i.e. overlap its first k - 1 bases."""
+        shifted = kmer >> 2
+        high = 2 * (self.k - 1)
+        return [code << high | shifted for code in range(4) if code << high | shifted in self]
+
+    def __getitem__(self, kmer):
+        slot = self.slot(kmer)
+        return self.counts[slot] if self.keys[slot] == kmer else 0
+
+    def __contains__(self, kmer):
+        return self.keys[self.slot(kmer)] == kmer
+
+    def __iter__(self):
+        return (kmer for kmer in self.keys if kmer != _EMPTY)
+
+    def __len__(self):
+        return self.used
+
+    @property
+    def nbytes(self):
+        """The size in bytes of the key and count arrays."""
+        return self.keys.itemsize * len(self.keys) + self.counts.itemsize * len(self.counts)
+
+
+def count_kmers(strands, k=DEFAULT_K):
+    """
+    Counts the k-mers of the reads.
+
+    Args:
+        strands - a dictionary mapping the sequence number to the DNA fragment, or a PackedReads.
+        k - the k-mer length.
+
+    Returns:
+        table - the KmerTable.
+
+    Raises:
+        ValueError: k is not between 1 and MAX_K.
+    """
+    table = KmerTable(k)
+    for sequence in strands.values():
+        for kmer in iter_kmers(sequence, k):
+            table.add(kmer)
+    return table
+
+
+def iter_unitigs(table):
+    """
+    Walks the maximal non-branching paths of the de Bruijn graph of a k-mer table. A path starts at every k-mer that
+    is not the only successor of its only predecessor, and is extended while the current k-mer has exactly one
+    successor and that successor has exactly one predecessor. K-mers left over form isolated cycles, which are walked
+    from an arbitrary k-mer. Every k-mer ends up in exactly one unitig.
+
+    Args:
+        table - the KmerTable.
+
+    Returns:
+        A generator of unitigs, each a list of encoded k-mers.
+
+    Raises:
+        NONE
+    """
+    visited = bytearray(len(table.keys))
+
+    def walk(kmer):
+        path = [kmer]
+        visited[table.slot(kmer)] = 1
+        successors = table.successors(kmer)
+        while len(successors) == 1:
+            kmer = successors[0]
+            slot = table.slot(kmer)
+            if visited[slot] or len(table.predecessors(kmer)) != 1:
+                break
+            path.append(kmer)
+            visited[slot] = 1
+            successors = table.successors(kmer)
+        return path
+
+    for kmer in table:
+        if visited[table.slot(kmer)]:
+            continue
+        predecessors = table.predecessors(kmer)
+        if len(predecessors) == 1 and predecessors[0] != kmer and len(table.successors(predecessors[0])) == 1:
+            continue
+        yield walk(kmer)
+
+    for kmer in table:
+        if not visited[table.slot(kmer)]:
+            yield walk(kmer)
+
+
+def unitig_sequence(path, k, lowercase=False):
+    """
+    Spells the sequence of a unitig: its first k-mer followed by the last base of every other k-mer.
+
+    Args:
+        path - the encoded k-mers of the unitig.
+        k - the k-mer length.
+        lowercase - whether to return lowercase bases.
+
+    Returns:
+        The sequence, len(path) + k - 1 bases long.
+
+    Raises:
+        NONE
+    """
+    codes = bytearray(code & 3 for code in path)
+    return decode_kmer(path[0], k, lowercase) + codes[1:].translate(_DECODE[lowercase]).decode('ascii')
+
+
+def assemble_de_bruijn(strands, k=DEFAULT_K, min_count=MIN_COUNT, profiler=None):
+    """
+    Assembles the reads with a compacted de Bruijn graph: counts the k-mers, drops the k-mers seen fewer than
+    min_count times and spells every unitig as a contig.
+
+    Args:
+        strands - a dictionary mapping the sequence number to the DNA fragment, or a PackedReads.
+        k - the k-mer length, at most MAX_K.
+        min_count - the smallest amount of times a k-mer must be seen to be kept.
+        profiler - the DNA_profile.Profiler recording the stages and counters, or None.
+
+    Returns:
+        contigs - the assembled sequences, one per unitig, longest first.
+
+    Raises:
+        ValueError: k is not between 1 and MAX_K.
+    """
+    if profiler is None:
+        profiler = Profiler()
+    lowercase = next(iter(strands.values()), '').islower()
+    with profiler.stage('count_kmers'):
+        table = count_kmers(strands, k)
+    profiler.count('distinct_kmers', len(table))
+    with profiler.stage('solid_kmers'):
+        table = table.solid(min_count)
+    profiler.count('solid_kmers', len(table))
+    log.info("K-mers: %d distinct, %d solid, %d bytes", profiler.counters['distinct_kmers'], len(table), table.nbytes)
+
+    with profiler.stage('unitigs'):
+        contigs = [unitig_sequence(path, k, lowercase) for path in iter_unitigs(table)]
+        contigs.sort(key=len, reverse=True)
+    return contigs
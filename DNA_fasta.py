@@ -0,0 +1,322 @@
+"""
+Streaming output of assembled contigs.
+
+FastaWriter writes contigs one record at a time as line-wrapped multi-FASTA, so the assembly never has to be joined
+into one string, optionally gzip or bgzip compressed. Alongside the file it writes a samtools-style .fai index (name,
+length, offset of the first base, bases and bytes per line), which lets downstream tools read a region without loading
+the file. bgzip output is made of independent BGZF blocks of at most BGZF_BLOCK_SIZE bytes and also gets a .gzi index
+of the block offsets, so it can be read at random like an uncompressed file. Plain gzip output cannot be read at random
+and gets no index. read_region() and read_entry() read a region back through these indexes.
+"""
+
+import gzip
+import os
+import struct
+import zlib
+
+LINE_WIDTH = 60
+COMPRESSIONS = ('gzip', 'bgzip')
+FASTA_EXTENSIONS = ('.fa', '.fasta', '.fna')
+BGZF_BLOCK_SIZE = 0xff00
+
+# Gzip member header with the BGZF extra field: 'BC', 2 bytes of payload holding the total block size minus 1.
+_BGZF_HEADER = struct.Struct('<4BI2BH2BHH')
+_BGZF_TRAILER = struct.Struct('<2I')
+_BGZF_EOF = bytes.fromhex('1f8b08040000000000ff0600424302001b0003000000000000000000')
+_GZI_ENTRY = struct.Struct('<2Q')
+
+
+def is_fasta(filename):
+    """Returns whether a file name has a FASTA extension, optionally followed by .gz."""
+    name = filename.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    return name.endswith(FASTA_EXTENSIONS)
+
+
+def _bgzf_block(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    payload = compressor.compress(data) + compressor.flush()
+    size = _BGZF_HEADER.size + len(payload) + _BGZF_TRAILER.size
+    return (_BGZF_HEADER.pack(0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6, ord('B'), ord('C'), 2, size - 1) + payload +
+            _BGZF_TRAILER.pack(zlib.crc32(data), len(data)))
+
+
+class BgzfFile:
+    """
+    A binary file writer compressing to BGZF blocks, the format of bgzip. Records the compressed and uncompressed
+    offset of every block after the first, the content of a .gzi index.
+    """
+
+    def __init__(self, filename, level=6):
+        """
+        Args:
+            filename - the name of the file.
+            level - the zlib compression level.
+        """
+        self.file = open(filename, 'wb')
+        self.level = level
+        self.buffer = bytearray()
+        self.blocks = []
+        self.compressed = 0
+        self.uncompressed = 0
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= BGZF_BLOCK_SIZE:
+            self._flush_block(bytes(self.buffer[:BGZF_BLOCK_SIZE]))
+            del self.buffer[:BGZF_BLOCK_SIZE]
+
+    def _flush_block(self, data):
+        if self.compressed:
+            self.blocks.append((self.compressed, self.uncompressed))
+        block = _bgzf_block(data, self.level)
+        self.file.write(block)
+        self.compressed += len(block)
+        self.uncompressed += len(data)
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            if self.buffer:
+                self._flush_block(bytes(self.buffer))
+                self.buffer.clear()
+            self.file.write(_BGZF_EOF)
+        finally:
+            self.file.close()
+
+    def write_index(self, filename):
+        """Writes the .gzi index: the amount of blocks after the first, then the offsets of each of them."""
+        with open(filename, 'wb') as f:
+            f.write(struct.pack('<Q', len(self.blocks)))
+            for entry in self.blocks:
+                f.write(_GZI_ENTRY.pack(*entry))
+
+
+class FastaWriter:
+    """
+    Writes contigs as line-wrapped multi-FASTA, one record per write() call, and their .fai index on close().
+
+    Offsets in the .fai index are offsets in the uncompressed text, as samtools expects for bgzip files.
+    """
+
+    def __init__(self, filename, line_width=LINE_WIDTH, compression=None, index=True):
+        """
+        Args:
+            filename - the name of the FASTA file.
+            line_width - the amount of bases per line.
+            compression - None, 'gzip' or 'bgzip'.
+            index - whether to write the .fai index (and the .gzi index of bgzip output) next to the file. Ignored for
+                    gzip output.
+
+        Raises:
+            ValueError: the compression or the line width is invalid.
+            OSError: the file cannot be created.
+        """
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError("Compression must be one of {}".format(", ".join(COMPRESSIONS)))
+        if line_width < 1:
+            raise ValueError("Line width must be positive")
+        self.filename = filename
+        self.line_width = line_width
+        self.compression = compression
+        self.index = index and compression != 'gzip'
+        self.entries = []
+        self.names = set()
+        self.offset = 0
+        if compression == 'bgzip':
+            self.file = BgzfFile(filename)
+        elif compression == 'gzip':
+            self.file = gzip.open(filename, 'wb')
+        else:
+            self.file = open(filename, 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, name, sequence, description=None):
+        """
+        Writes a FASTA record.
+
+        Args:
+            name - the record name, the first word of the header line. Names must be unique.
+            sequence - the sequence.
+            description - the rest of the header line, or None.
+
+        Returns:
+            NONE
+
+        Raises:
+            ValueError: the name is empty, holds white space or was already written.
+            OSError: the file cannot be written.
+        """
+        if not name or name.split()[0] != name:
+            raise ValueError("Invalid record name: {!r}".format(name))
+        if name in self.names:
+            raise ValueError("Duplicate record name: {}".format(name))
+        self.names.add(name)
+
+        header = '>{}\n'.format(name if description is None else name + ' ' + description).encode('ascii', 'replace')
+        self.file.write(header)
+        self.offset += len(header)
+        self.entries.append((name, len(sequence), self.offset, self.line_width, self.line_width + 1))
+
+        width = self.line_width
+        # Encode a few thousand lines at a time, so memory stays bounded on long contigs.
+        chunk = width * max(1, (1 << 20) // width)
+        for start in range(0, len(sequence), chunk):
+            part = sequence[start:start + chunk].encode('ascii', 'replace')
+            lines = b'\n'.join(part[i:i + width] for i in range(0, len(part), width)) + b'\n'
+            self.file.write(lines)
+            self.offset += len(lines)
+
+    def close(self):
+        """
+        Closes the file and writes its indexes.
+
+        Returns:
+            NONE
+
+        Raises:
+            OSError: the file or an index cannot be written.
+        """
+        if self.file is None:
+            return
+        file, self.file = self.file, None
+        file.close()
+        if self.index:
+            with open(self.filename + '.fai', 'w') as f:
+                for entry in self.entries:
+                    f.write('\t'.join(map(str, entry)) + '\n')
+            if self.compression == 'bgzip':
+                file.write_index(self.filename + '.gzi')
+
+
+def write_contigs(filename, contigs, line_width=LINE_WIDTH, compression=None, index=True):
+    """
+    Writes contigs to a FASTA file as they are produced, naming them contig_1, contig_2, ... in order.
+
+    Args:
+        filename - the name of the FASTA file.
+        contigs - an iterable of contig sequences.
+        line_width - the amount of bases per line.
+        compression - None, 'gzip' or 'bgzip'.
+        index - whether to write the .fai index (and the .gzi index of bgzip output). Ignored for gzip output.
+
+    Returns:
+        The amount of contigs written.
+
+    Raises:
+        ValueError: the compression or the line width is invalid.
+        OSError: the file cannot be written.
+    """
+    count = 0
+    with FastaWriter(filename, line_width, compression, index) as writer:
+        for count, contig in enumerate(contigs, 1):
+            writer.write('contig_{}'.format(count), contig, 'length={}'.format(len(contig)))
+    return count
+
+
+def read_fai(filename):
+    """
+    Reads a .fai index.
+
+    Args:
+        filename - the name of the FASTA file, whose index is filename + '.fai'.
+
+    Returns:
+        A dictionary mapping the record name to its (length, offset, line bases, line bytes).
+
+    Raises:
+        OSError: the index cannot be read.
+        ValueError: the index is malformed.
+    """
+    index = dict()
+    with open(filename + '.fai') as f:
+        for line in f:
+            fields = line.split('\t')
+            if len(fields) < 5:
+                raise ValueError("Malformed index line: {!r}".format(line))
+            index[fields[0]] = tuple(int(field) for field in fields[1:5])
+    return index
+
+
+def _read_bgzf(filename, start, size):
+    """Reads size uncompressed bytes from start in a bgzip file, decompressing only the blocks holding them."""
+    blocks = [(0, 0)]
+    with open(filename + '.gzi', 'rb') as f:
+        count, = struct.unpack('<Q', f.read(8))
+        blocks += [_GZI_ENTRY.unpack(f.read(_GZI_ENTRY.size)) for _ in range(count)]
+    compressed, uncompressed = max(block for block in blocks if block[1] <= start)
+
+    data = bytearray()
+    with open(filename, 'rb') as f:
+        f.seek(compressed)
+        while len(data) < start - uncompressed + size:
+            header = f.read(_BGZF_HEADER.size)
+            if len(header) < _BGZF_HEADER.size:
+                break
+            block_size = _BGZF_HEADER.unpack(header)[-1] + 1
+            block = f.read(block_size - _BGZF_HEADER.size)
+            if block_size == len(_BGZF_EOF):
+                break
+            data += zlib.decompress(block[:-_BGZF_TRAILER.size], -15)
+    return bytes(data[start - uncompressed:start - uncompressed + size])
+
+
+def read_region(filename, name, start=0, end=None):
+    """
+    Reads a region of a record through the .fai index, and the .gzi index for bgzip files, without reading the rest
+    of the file.
+
+    Args:
+        filename - the name of an uncompressed or bgzip FASTA file.
+        name - the record name.
+        start - the 0-based start of the region.
+        end - the end of the region (excluded), the end of the record by default.
+
+    Returns:
+        The sequence of the region.
+
+    Raises:
+        KeyError: the record is not in the index.
+        OSError: the file or its indexes cannot be read.
+        ValueError: the index is malformed.
+    """
+    return read_entry(filename, read_fai(filename)[name], start, end)
+
+
+def read_entry(filename, entry, start=0, end=None):
+    """
+    Reads a region of a record given its entry of the .fai index, so that reading many regions loads the index once.
+
+    Args:
+        filename - the name of an uncompressed or bgzip FASTA file.
+        entry - the (length, offset, line bases, line bytes) of the record, see read_fai().
+        start - the 0-based start of the region.
+        end - the end of the region (excluded), the end of the record by default.
+
+    Returns:
+        The sequence of the region.
+
+    Raises:
+        OSError: the file or its .gzi index cannot be read.
+    """
+    length, offset, line_bases, line_bytes = entry
+    end = length if end is None else min(end, length)
+    start = max(0, start)
+    if start >= end:
+        return ''
+    first = offset + start // line_bases * line_bytes + start % line_bases
+    last = offset + (end - 1) // line_bases * line_bytes + (end - 1) % line_bases
+    if os.path.exists(filename + '.gzi'):
+        data = _read_bgzf(filename, first, last - first + 1)
+    else:
+        with open(filename, 'rb') as f:
+            f.seek(first)
+            data = f.read(last - first + 1)
+    return data.replace(b'\n', b'').decode('ascii')
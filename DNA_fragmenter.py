@@ -2,86 +2,287 @@ __author__ = 'Kevin'
 
 # NGS technology reads produce shorter reads anywhere from 25-500bp
 
+# Usage:
+#     python -m DNA_fragmenter genome.txt -o FRAGMENTED.txt --length 100 --times 3 --lower 50 --upper 150
+#     python -m DNA_fragmenter genome.txt -o READS.txt --coverage 30 --lower 90 --upper 110 --seed 1 \
+#         --substitution-rate 0.01 --indel-rate 0.001 --reverse-complement 0.5
+# Run without a genome file to be prompted for the parameters and pick the genome in a file dialog.
 
-from tkinter import *
-from tkinter import filedialog
-from random import randint
+import argparse
+import gzip
+import mmap
+import sys
+import tempfile
+from math import ceil, log
+from random import Random, randint
 
-genome = ''
 outputfile = "FRAGMENTED.txt"
 
-root = Tk()
-root.resizable(0, 0)
+CHUNK_SIZE = 1 << 24
+WRITE_BUFFER = 1 << 22
+# Random-looking DNA barely compresses better at higher levels, which are several times slower.
+COMPRESS_LEVEL = 1
+# Everything stripped from the genome: whitespace and digits.
+NON_BASES = b' \t\n\r\x0b\x0c0123456789'
+COMPLEMENT = bytes.maketrans(b'ACGTacgt', b'TGCAtgca')
+SIMULATION_BATCH = 1 << 16
 
-flength = int(input('Initial fragmenting length: '))
 
-ftimes = int(input('How many times do you wish to fragment: '))
+def map_genome(filename):
+    """
+    Cleans the genome in CHUNK_SIZE blocks with a bytes translate into an anonymous temporary file, and memory-maps
+    the result, so genomes larger than memory can be fragmented. The returned map is read-only; an empty genome is
+    returned as b''.
+    """
+    with open(filename, 'rb') as source:
+        cleaned = tempfile.TemporaryFile()
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            cleaned.write(chunk.translate(None, NON_BASES))
+    with cleaned:
+        if not cleaned.tell():
+            return b''
+        cleaned.flush()
+        return mmap.mmap(cleaned.fileno(), 0, access=mmap.ACCESS_READ)
 
-flower = int(input('Lower bound: '))
 
-fupper = int(input('Upper bound: '))
+def fragment_views(genome_length, length, start=0):
+    """Yields the (offset, length) of consecutive fragments of the given length, from start to the end of the genome."""
+    for offset in range(start, genome_length, length):
+        yield offset, min(length, genome_length - offset)
 
 
-def open_genome():
-    filename = filedialog.askopenfilename()
-    file = open(filename)
-    x = file.read()
-    return x
+def iter_fragments(genome_length, flength, ftimes, flower, fupper, rng=None):
+    """
+    Yields the views of every fragmenting round: at flength, at flength from half a fragment in, then randomized.
+    The random lengths are drawn from rng, a random.Random, or the module level generator by default.
+    """
+    draw = randint if rng is None else rng.randint
+    yield from fragment_views(genome_length, flength)
+    # starting off at half.
+    yield from fragment_views(genome_length, flength, int(flength/2))
 
-def replace_non_bases(sequence):
-    sequence = sequence.replace('\n', '').replace(' ', '')
-    print(sequence)
-    x = []
-    for i in sequence:
-        if not i.isdigit():
-            x.append(i)
-    sequence = ''.join(x)
-    return sequence
+    # randomize fragmenting
+    for y in range(0, ftimes):
+        yield from fragment_views(genome_length, draw(flower, fupper))
 
 
-def fragment_DNA(string, length):
-    list = []
-    for j in range(0, len(string), length):
-        list.append(string[0+j:length+j])
-    return list
+def add_errors(read, rng, substitution_rate, indel_rate):
+    """
+    Adds sequencing errors to a read (bytes). Error positions are drawn as geometric gaps, so the cost is proportional
+    to the amount of errors rather than to the read length. Indels are split evenly between insertions and deletions.
+    """
+    error_rate = substitution_rate + indel_rate
+    log_keep = log(1.0 - error_rate)
+    parts = []
+    last = 0
+    position = -1
+    while True:
+        position += 1 + int(log(1.0 - rng.random()) / log_keep)
+        if position >= len(read):
+            break
+        parts.append(read[last:position])
+        base = read[position:position + 1]
+        bases = b'acgt' if base.islower() else b'ACGT'
+        kind = rng.random() * error_rate
+        if kind < substitution_rate:
+            parts.append(rng.choice(bases.replace(base, b'')).to_bytes(1, 'big'))
+        elif kind < substitution_rate + indel_rate / 2:
+            parts.append(base + rng.choice(bases).to_bytes(1, 'big'))
+        last = position + 1
+    parts.append(read[last:])
+    return b''.join(parts)
 
-def run_fragment():
-    global flength, ftimes, flower, fupper
 
-    genome = open_genome()
+def check_simulation(coverage, lower, upper, substitution_rate=0.0, indel_rate=0.0, reverse_complement=0.0):
+    """Raises a ValueError when the parameters of simulate_reads() are out of range."""
+    if coverage < 0:
+        raise ValueError("Coverage must not be negative")
+    check_lengths(lower, upper)
+    for name, rate in (("Substitution rate", substitution_rate), ("Indel rate", indel_rate)):
+        if not 0 <= rate < 1:
+            raise ValueError("{} must be between 0 and 1 (excluded)".format(name))
+    if substitution_rate + indel_rate >= 1:
+        raise ValueError("Error rates must add up to less than 1")
+    if not 0 <= reverse_complement <= 1:
+        raise ValueError("Reverse complement fraction must be between 0 and 1")
 
-    genome = replace_non_bases(genome)
 
-    print(genome)
-    genome_length = (len(genome))
-    print(flength)
-    fhalf = flength/2
+def check_fragmenting(flength, ftimes, flower, fupper):
+    """Raises a ValueError when the parameters of iter_fragments() are out of range."""
+    if flength < 1:
+        raise ValueError("Fragmenting length must be at least 1")
+    if ftimes < 0:
+        raise ValueError("Fragmenting rounds must not be negative")
+    check_lengths(flower, fupper)
 
 
-    genome1 = fragment_DNA(genome[int(fhalf):], flength)
-    genome2 = list(fragment_DNA(genome, flength))
-    genome2.extend(genome1)
+def check_lengths(lower, upper):
+    """Raises a ValueError unless 1 <= lower <= upper."""
+    if not 1 <= lower <= upper:
+        raise ValueError("Read lengths must satisfy 1 <= lower <= upper")
 
-    # starting off at half.
-    # randomize fragmenting
-    for y in range(0, ftimes):
-        genome3 = list(fragment_DNA(genome, randint(flower, fupper)))
-        print(genome3)
-        genome2.extend(genome3)
 
-    with open(outputfile, 'w') as file:
-        for item in genome2:
-            file.write("%s\n" % item)
+def simulate_reads(genome, coverage, lower, upper, seed=None, substitution_rate=0.0, indel_rate=0.0,
+                   reverse_complement=0.0):
+    """
+    Yields random reads (bytes) of the genome until the requested coverage depth is reached. Read lengths are uniform
+    between lower and upper, start positions uniform along the genome; both are drawn in batches of SIMULATION_BATCH
+    reads from a random.Random seeded with seed, so the same seed always gives the same reads. Reads get sequencing
+    errors at the given per-base rates, and a reverse_complement fraction of them comes from the opposite strand.
+    The parameters are checked when called rather than when iterated: out of range values raise a ValueError, see
+    check_simulation(). Reads longer than the genome are cut to its length, and nothing is yielded when even lower
+    exceeds it.
+    """
+    check_simulation(coverage, lower, upper, substitution_rate, indel_rate, reverse_complement)
+    return _simulate_reads(genome, coverage, lower, upper, seed, substitution_rate, indel_rate, reverse_complement)
 
-    x = 1
 
-    with open(outputfile, 'w') as file:
-        for item in genome2:
-            file.write("%s %s\n" % (x, item))
+def _simulate_reads(genome, coverage, lower, upper, seed, substitution_rate, indel_rate, reverse_complement):
+    genome_length = len(genome)
+    upper = min(upper, genome_length)
+    if genome_length == 0 or lower > upper:
+        return
+    rng = Random(seed)
+    count = ceil(coverage * genome_length / ((lower + upper) / 2))
+
+    for first in range(0, count, SIMULATION_BATCH):
+        size = min(SIMULATION_BATCH, count - first)
+        lengths = [rng.randint(lower, upper) for _ in range(size)]
+        starts = [rng.randrange(genome_length - length + 1) for length in lengths]
+        flips = [rng.random() < reverse_complement for _ in range(size)] if reverse_complement else [False] * size
+        for start, length, flip in zip(starts, lengths, flips):
+            read = genome[start:start + length]
+            if substitution_rate or indel_rate:
+                read = add_errors(read, rng, substitution_rate, indel_rate)
+            if flip:
+                read = read.translate(COMPLEMENT)[::-1]
+            yield read
+
+
+def write_reads(reads, outputfile, first=1, compress=False):
+    """
+    Writes numbered reads (bytes) in a single pass. Lines are gathered into WRITE_BUFFER sized blocks before being
+    written, gzip compressed when compress is set. Returns the next read number.
+    """
+    x = first
+    with (gzip.open(outputfile, 'wb', compresslevel=COMPRESS_LEVEL) if compress else open(outputfile, 'wb')) as file:
+        lines = []
+        pending = 0
+        for read in reads:
+            line = b"%d %s\n" % (x, read)
+            lines.append(line)
+            pending += len(line)
             x += 1
+            if pending >= WRITE_BUFFER:
+                file.write(b''.join(lines))
+                lines = []
+                pending = 0
+        file.write(b''.join(lines))
+    return x
+
+
+def write_fragments(genome, views, outputfile, first=1, compress=False):
+    """Writes numbered fragments straight from (offset, length) views of the genome. Returns the next number."""
+    return write_reads((genome[offset:offset + length] for offset, length in views), outputfile, first, compress)
+
+
+def run_fragment(filename, flength, ftimes, flower, fupper, outputfile=outputfile, compress=None, seed=None):
+    """
+    Fragments the genome file into numbered fragments, streamed to outputfile. The output is gzip compressed when
+    compress is set, or by default when outputfile ends with .gz. The random lengths are reproducible when a seed is
+    given. Returns the amount of fragments written. Out of range parameters raise a ValueError before the output is
+    opened, see check_fragmenting().
+    """
+    check_fragmenting(flength, ftimes, flower, fupper)
+    if compress is None:
+        compress = outputfile.endswith('.gz')
+    genome = map_genome(filename)
+    try:
+        views = iter_fragments(len(genome), flength, ftimes, flower, fupper, None if seed is None else Random(seed))
+        return write_fragments(genome, views, outputfile, compress=compress) - 1
+    finally:
+        if genome:
+            genome.close()
+
+
+def run_simulation(filename, coverage, lower, upper, outputfile=outputfile, compress=None, seed=None,
+                   substitution_rate=0.0, indel_rate=0.0, reverse_complement=0.0):
+    """Simulates reads of the genome file with simulate_reads() and streams them to outputfile, see run_fragment()."""
+    if compress is None:
+        compress = outputfile.endswith('.gz')
+    genome = map_genome(filename)
+    try:
+        reads = simulate_reads(genome, coverage, lower, upper, seed, substitution_rate, indel_rate,
+                               reverse_complement)
+        return write_reads(reads, outputfile, compress=compress) - 1
+    finally:
+        if genome:
+            genome.close()
+
+def run_gui():
+    from tkinter import Tk, Button, BOTTOM
+    from tkinter import filedialog
+
+    root = Tk()
+    root.resizable(0, 0)
+
+    flength = int(input('Initial fragmenting length: '))
+
+    ftimes = int(input('How many times do you wish to fragment: '))
+
+    flower = int(input('Lower bound: '))
+
+    fupper = int(input('Upper bound: '))
+
+    root.assemble_button = Button(root, text="Fragment", command=lambda: run_fragment(
+        filedialog.askopenfilename(), flength, ftimes, flower, fupper))
+    root.assemble_button.pack(side=BOTTOM)
+
+    root.mainloop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fragment a genome into shotgun reads.")
+    parser.add_argument('genome', nargs='?', help="genome file. Opens the GUI when omitted.")
+    parser.add_argument('-o', '--output', default=outputfile,
+                        help="fragments file, gzip compressed when it ends with .gz (default: %(default)s)")
+    parser.add_argument('--gzip', action='store_true', default=None, help="gzip compress the fragments file")
+    parser.add_argument('--length', type=int, default=100, help="initial fragmenting length (default: %(default)s)")
+    parser.add_argument('--times', type=int, default=3, help="randomized fragmenting rounds (default: %(default)s)")
+    parser.add_argument('--lower', type=int, default=50, help="lower bound of the random length (default: %(default)s)")
+    parser.add_argument('--upper', type=int, default=150,
+                        help="upper bound of the random length (default: %(default)s)")
+    parser.add_argument('--seed', type=int, help="seed of the random lengths and reads, for reproducible output")
+    simulation = parser.add_argument_group("simulator", "draw random reads between --lower and --upper bases long "
+                                                        "instead of fragmenting in rounds")
+    simulation.add_argument('--coverage', type=float, help="coverage depth to simulate; enables the simulator")
+    simulation.add_argument('--substitution-rate', type=float, default=0.0,
+                            help="per-base substitution rate (default: %(default)s)")
+    simulation.add_argument('--indel-rate', type=float, default=0.0,
+                            help="per-base insertion/deletion rate (default: %(default)s)")
+    simulation.add_argument('--reverse-complement', type=float, default=0.0,
+                            help="fraction of reads from the opposite strand (default: %(default)s)")
+    args = parser.parse_args(argv)
+    try:
+        if args.coverage is not None:
+            check_simulation(args.coverage, args.lower, args.upper, args.substitution_rate, args.indel_rate,
+                             args.reverse_complement)
+        else:
+            check_fragmenting(args.length, args.times, args.lower, args.upper)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.genome is None:
+        run_gui()
+    elif args.coverage is not None:
+        run_simulation(args.genome, args.coverage, args.lower, args.upper, args.output, args.gzip, args.seed,
+                       args.substitution_rate, args.indel_rate, args.reverse_complement)
+    else:
+        run_fragment(args.genome, args.length, args.times, args.lower, args.upper, args.output, args.gzip,
+                     args.seed)
+    return 0
 
-root.assemble_button = Button(root, text="Fragment", command=lambda: run_fragment())
-root.assemble_button.pack(side=BOTTOM)
 
-root.mainloop()
+if __name__ == '__main__':
+    sys.exit(main())
 
@@ -0,0 +1,247 @@
+"""
+Incremental assembly of reads delivered in batches.
+
+IncrementalAssembly keeps what the overlap stage learnt about the reads seen so far: the reads (packed), a sampled
+k-mer index of the maximal reads, the overlaps of at least min_overlap nucleotides, the contained reads and the current
+contigs. add_reads() overlaps a batch against that index only, so its cost is proportional to the batch: every new read
+is compared with the existing and new reads it shares a seed with, contained reads are flagged on either side, and only
+the contigs touching a new overlap or a newly contained read are laid out again. The state is saved between batches
+with save() and load_assembly().
+"""
+
+import heapq
+import pickle
+import sys
+from array import array
+
+from DNA_overlap import get_engine
+from DNA_reads import PackedReads
+
+
+class IncrementalAssembly:
+    """
+    The overlap index and layout of a growing read set. Reads are numbered 1..n in the order they were added, as in a
+    PackedReads store.
+
+    The index holds the k-mers of the maximal reads at every stride-th position, stride being min_overlap - k + 1: any
+    stretch of min_overlap nucleotides of a read then holds an indexed k-mer, so any overlap of at least min_overlap
+    nucleotides and any containment of a read of at least min_overlap nucleotides is found by looking up the k-mers of
+    the new read.
+
+    Engines tolerating errors need an exact k-mer even when errors hit some of them: the k-mers are then indexed end to
+    end (stride k), and by default are short enough that any stretch of at least min_overlap nucleotides holds more
+    whole indexed k-mers than the engine tolerates errors in it.
+    """
+
+    def __init__(self, min_overlap, k=None, engine=None):
+        """
+        Args:
+            min_overlap - the smallest overlap between two reads.
+            k - the seed length, at most min_overlap. min_overlap by default for exact engines; shorter seeds shrink
+                the index but find more candidate pairs. Engines tolerating errors only find every overlap with seeds
+                no longer than the default.
+            engine - the overlap engine (name or instance), the KMP engine by default.
+
+        Raises:
+            ValueError: the engine name is not registered or the seed length is invalid.
+        """
+        self.engine = get_engine(engine)
+        rate = self.engine.error_rate
+        if k is None:
+            # A stretch of L >= min_overlap nucleotides, at least (1 - rate) * L on the indexed read, holds at least
+            # ((1 - rate) * L - k + 1) // k whole seeds and at most rate * L errors, each breaking one seed at most.
+            k = min_overlap if self.engine.exact else max(1, int((min_overlap * (1 - rate) + 1) /
+                                                                 (rate * min_overlap + 2)))
+        if not 0 < k <= min_overlap:
+            raise ValueError("Seed length must be between 1 and the minimum overlap")
+        self.min_overlap = min_overlap
+        self.k = k
+        self.stride = min_overlap - k + 1 if self.engine.exact else k
+        self.reads = None
+        self.index = dict()
+        self.contained = bytearray()
+        self.edges = []
+        self.contig_of = array('i')
+        self.contigs = dict()
+        self.next_contig = 0
+
+    def __len__(self):
+        return len(self.contained)
+
+    def _index_read(self, number, sequence):
+        for i in range(0, len(sequence) - self.k + 1, self.stride):
+            self.index.setdefault(sequence[i:i + self.k], []).append(number)
+
+    def _candidates(self, sequence):
+        candidates = set()
+        for i in range(len(sequence) - self.k + 1):
+            hits = self.index.get(sequence[i:i + self.k])
+            if hits:
+                candidates.update(hits)
+        return sorted(candidates)
+
+    def add_reads(self, sequences):
+        """
+        Adds a batch of reads: overlaps them with the indexed reads and with each other, updates the contained reads
+        and lays out again the contigs they affect, along with the new reads. Overlaps between an affected contig and
+        an unaffected one are not reconsidered. Reads shorter than min_overlap are set aside.
+
+        Args:
+            sequences - an iterable of reads.
+
+        Returns:
+            The amount of contigs laid out again.
+
+        Raises:
+            NONE
+        """
+        engine = get_engine(self.engine)
+        first = len(self)
+        for sequence in sequences:
+            if self.reads is None:
+                self.reads = PackedReads(sequence.islower())
+            self.reads.append(sequence)
+            self.contained.append(0)
+            self.edges.append(dict())
+            self.contig_of.append(-1)
+
+        touched = set()
+        for number in range(first, len(self)):
+            sequence = self.reads.sequence(number)
+            if len(sequence) < self.min_overlap:
+                # Too short to overlap any read by min_overlap: set aside like a contained read.
+                self.contained[number] = 1
+                continue
+            prepared = engine.prepare(sequence)
+            for other in self._candidates(sequence):
+                if self.contained[other]:
+                    continue
+                sequence2 = self.reads.sequence(other)
+                forward = engine.overlap(sequence2, sequence, prepared)
+                if forward == sys.maxsize:
+                    # Duplicates are contained both ways; the read seen first is kept.
+                    self.contained[number] = 1
+                    break
+                backward = engine(sequence, sequence2)
+                if backward == sys.maxsize:
+                    self.contained[other] = 1
+                    touched.add(other)
+                    continue
+                if forward >= self.min_overlap:
+                    self.edges[other][number] = forward
+                    touched.add(other)
+                if backward >= self.min_overlap:
+                    self.edges[number][other] = backward
+                    touched.add(other)
+            if not self.contained[number]:
+                self._index_read(number, sequence)
+
+        affected = {self.contig_of[number] for number in touched if self.contig_of[number] >= 0}
+        members = [number for contig in affected for number in self.contigs.pop(contig)]
+        members += range(first, len(self))
+        self._layout(members)
+        return len(affected)
+
+    def _layout(self, members):
+        """
+        Lays out a set of reads into new contigs, see OverlapGraph.greedy_layout(), using only the overlaps between
+        them. Contained reads are dropped.
+        """
+        for number in members:
+            if self.contained[number]:
+                self.contig_of[number] = -1
+        members = [number for number in members if not self.contained[number]]
+        member = set(members)
+        heap = [(-overlap, source, target) for source in members for target, overlap in self.edges[source].items()
+                if target in member and not self.contained[target]]
+        heapq.heapify(heap)
+
+        parent = {number: number for number in members}
+
+        def find(number):
+            while parent[number] != number:
+                parent[number] = parent[parent[number]]
+                number = parent[number]
+            return number
+
+        successor = dict()
+        has_predecessor = set()
+        while heap:
+            _, source, target = heapq.heappop(heap)
+            if source in successor or target in has_predecessor:
+                continue
+            root_source, root_target = find(source), find(target)
+            if root_source == root_target:
+                continue
+            successor[source] = target
+            has_predecessor.add(target)
+            parent[root_target] = root_source
+
+        for number in members:
+            if number not in has_predecessor:
+                order = [number]
+                while order[-1] in successor:
+                    order.append(successor[order[-1]])
+                for read in order:
+                    self.contig_of[read] = self.next_contig
+                self.contigs[self.next_contig] = order
+                self.next_contig += 1
+
+    def contig_sequences(self):
+        """
+        Assembles the contigs.
+
+        Returns:
+            contigs - the assembled sequences, longest first.
+
+        Raises:
+            NONE
+        """
+        contigs = []
+        for order in self.contigs.values():
+            parts = [self.reads.sequence(order[0])]
+            for left, right in zip(order, order[1:]):
+                parts.append(self.reads.sequence(right)[self.edges[left][right]:])
+            contigs.append("".join(parts))
+        contigs.sort(key=len, reverse=True)
+        return contigs
+
+    def save(self, filename):
+        """
+        Saves the assembly state to a file.
+
+        Args:
+            filename - the name of the file.
+
+        Returns:
+            NONE
+
+        Raises:
+            OSError: the file cannot be written.
+        """
+        with open(filename, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_assembly(filename):
+    """
+    Loads an assembly state saved by IncrementalAssembly.save(). The state is a pickle: only load trusted files.
+
+    Args:
+        filename - the name of the file.
+
+    Returns:
+        The IncrementalAssembly.
+
+    Raises:
+        OSError: the file cannot be read.
+        ValueError: the file does not hold an assembly state.
+    """
+    with open(filename, 'rb') as f:
+        try:
+            assembly = pickle.load(f)
+        except (pickle.UnpicklingError, EOFError, AttributeError) as error:
+            raise ValueError("Not an assembly state: {}".format(error)) from None
+    if not isinstance(assembly, IncrementalAssembly):
+        raise ValueError("Not an assembly state")
+    return assembly
@@ -0,0 +1,1020 @@
+"""
+Overlap engines used by the DNA sequence assembler.
+
+Every engine follows the contract of the original get_overlap(): it returns the amount of nucleotides by which the
+right read overlaps the left read, sys.maxsize when the right read is contained in the left read, and 0 when there is
+no overlap. The naive and KMP engines require exact equality; the Myers engine tolerates an edit rate, so that
+sequencing errors do not break overlaps.
+"""
+
+import math
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from DNA_overlap_cache import CHECKPOINT_ROWS, get_cache
+from DNA_reads import STRANDS, OrientedSequences, PackedReads, reverse_complement
+
+# Serial runs are split into at least this many blocks too, so the progress is reported often enough.
+MIN_BLOCKS = 64
+ERROR_RATE = 0.05
+# Batches of fewer left reads are overlapped one pair at a time by the Myers engine, packing them does not pay off.
+MIN_LANES = 4
+# Left reads handed to OverlapEngine.overlap_many() at once.
+BATCH_SIZE = 64
+
+
+def get_overlap_naive(left, right):
+    """
+    Gets the overlap by comparing slices of both reads at every offset. This is the original O(L^2) implementation and
+    is kept as a reference for the other engines.
+
+    Args:
+        left - the left read.
+        right - the right read.
+
+    Returns:
+        The overlap length, sys.maxsize if the right read is contained in the left read, or 0 for no overlap.
+
+    Raises:
+        NONE
+    """
+    for i in range(len(left)):
+        if left[i:] == right[:len(left) - i]:
+            return len(left[i:])
+        elif left[i:i + len(right)] == right:
+            return sys.maxsize
+    return 0
+
+
+def prefix_function(sequence):
+    """
+    Computes the Knuth-Morris-Pratt prefix function (failure table) of a sequence.
+
+    Args:
+        sequence - the sequence to analyse.
+
+    Returns:
+        failure - a list in where failure[i] is the length of the longest proper border of sequence[:i + 1].
+
+    Raises:
+        NONE
+    """
+    failure = [0] * len(sequence)
+    k = 0
+    for i in range(1, len(sequence)):
+        base = sequence[i]
+        while k and sequence[k] != base:
+            k = failure[k - 1]
+        if sequence[k] == base:
+            k += 1
+        failure[i] = k
+    return failure
+
+
+def get_overlap_kmp(left, right, failure=None):
+    """
+    Gets the overlap in linear time by running the KMP automaton of the right read over the left read. The state left
+    over after the last base is the longest suffix of the left read that is a prefix of the right read, and reaching
+    the full length of the right read before the end of the left read means the right read is contained in it.
+
+    Args:
+        left - the left read.
+        right - the right read.
+        failure - the prefix function of the right read, computed on the fly when not given.
+
+    Returns:
+        The overlap length, sys.maxsize if the right read is contained in the left read, or 0 for no overlap.
+
+    Raises:
+        NONE
+    """
+    if not left or not right:
+        return 0
+    if failure is None:
+        failure = prefix_function(right)
+
+    last = len(left) - 1
+    right_length = len(right)
+    state = 0
+    for position, base in enumerate(left):
+        while state and right[state] != base:
+            state = failure[state - 1]
+        if right[state] == base:
+            state += 1
+            if state == right_length:
+                # A match ending on the last base is a suffix/prefix overlap, anything earlier is a containment.
+                return right_length if position == last else sys.maxsize
+    return state
+
+
+class OverlapEngine:
+    """
+    A pluggable overlap engine. prepare() is called once per right read and its result is handed back to overlap() for
+    every left read, so engines can precompute per-read state instead of recomputing it for each pair.
+
+    Engines that tolerate errors set exact to False and their error_rate, and index shorter seeds tiled along the whole
+    read through seed_count() and seed_length(), so that the candidate pairs still include every overlap of at least
+    min_overlap nucleotides holding up to the tolerated amount of errors.
+    """
+
+    name = ''
+    exact = True
+    error_rate = 0
+
+    @property
+    def key(self):
+        """Identifies the engine and its parameters, e.g. in cache keys."""
+        return self.name
+
+    def seed_count(self, min_overlap):
+        """Returns the amount of seeds to index end to end from the start of every read, None for the whole read."""
+        return 1
+
+    def seed_length(self, min_overlap):
+        """Returns the default seed length of the candidate index, see seed_count()."""
+        return min_overlap
+
+    def prepare(self, right):
+        return None
+
+    def overlap(self, left, right, prepared=None):
+        raise NotImplementedError
+
+    def overlap_many(self, lefts, right, prepared=None):
+        """Overlaps the right read on several left reads. Engines can override it to process the pairs together."""
+        return [self.overlap(left, right, prepared) for left in lefts]
+
+    def __call__(self, left, right):
+        return self.overlap(left, right, self.prepare(right))
+
+
+class NaiveEngine(OverlapEngine):
+    name = 'naive'
+
+    def overlap(self, left, right, prepared=None):
+        return get_overlap_naive(left, right)
+
+
+class KMPEngine(OverlapEngine):
+    name = 'kmp'
+
+    def prepare(self, right):
+        return prefix_function(right)
+
+    def overlap(self, left, right, prepared=None):
+        return get_overlap_kmp(left, right, prepared)
+
+
+def _best_prefix(positive, negative, length, distance, error_rate):
+    """
+    Finds the longest accepted overlap in the last column of the Myers algorithm, from the bottom up. The column moves
+    by at most 1 per row, so when row i is error_rate * i + excess edits away, no row within excess / (1 - error_rate)
+    rows above can be accepted either: those rows are skipped, their deltas being summed by counting bits.
+
+    Args:
+        positive - the positive vertical deltas of the column.
+        negative - the negative vertical deltas of the column.
+        length - the length of the right read.
+        distance - the edit distance of the whole right read, the last row of the column.
+        error_rate - the tolerated edit rate.
+
+    Returns:
+        The overlap length, or 0.
+    """
+    i = length
+    while i > 0:
+        excess = distance - error_rate * i
+        if excess <= 0:
+            if not positive >> (i - 1) & 1:
+                return i
+            step = 1
+        else:
+            step = min(i, max(1, math.ceil(excess / (1 - error_rate) - 1e-9)))
+        window = ((1 << i) - 1) ^ ((1 << (i - step)) - 1)
+        distance -= bin(positive & window).count('1') - bin(negative & window).count('1')
+        i -= step
+    return 0
+
+
+def get_overlap_myers(left, right, error_rate=ERROR_RATE, pattern=None):
+    """
+    Gets the longest approximate overlap with Myers' bit-parallel edit distance algorithm. The right read is the
+    pattern: bit i of the vertical delta vectors holds the difference between rows i + 1 and i of the dynamic
+    programming column, and one column is computed per base of the left read with a handful of operations on integers
+    as wide as the right read, i.e. O(len(left) * len(right) / w) machine operations, w being the word size. Row 0 is
+    0 in every column (the alignment may start anywhere in the left read), so the last column holds, for every prefix
+    of the right read, the edit distance to the best matching suffix of the left read.
+
+    A prefix of i nucleotides is accepted as an overlap when its edit distance is at most error_rate * i and it does not
+    end with an insertion, which would only lengthen the overlap. The right read is contained in the left read when it
+    matches a substring ending before the last base within error_rate * len(right) edits. With an error rate of 0 the
+    results are those of get_overlap_kmp().
+
+    Args:
+        left - the left read.
+        right - the right read.
+        error_rate - the tolerated edit rate.
+        pattern - the match masks of the right read, computed on the fly when not given, see myers_pattern().
+
+    Returns:
+        The overlap length (in nucleotides of the right read), sys.maxsize if the right read is contained in the left
+        read, or 0 for no overlap.
+
+    Raises:
+        NONE
+    """
+    if not left or not right:
+        return 0
+    if pattern is None:
+        pattern = myers_pattern(right)
+
+    length = len(right)
+    mask = (1 << length) - 1
+    high = 1 << (length - 1)
+    allowed = int(error_rate * length)
+    get = pattern.get
+    # x ^ mask stands for ~x, which would turn the vectors into slower negative integers.
+    positive, negative = mask, 0
+    score = length
+    last = len(left) - 1
+    for position, base in enumerate(left):
+        match = get(base, 0)
+        vertical = match | negative
+        horizontal = (((match & positive) + positive) ^ positive) | match
+        horizontal_positive = negative | ((horizontal | positive) ^ mask)
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & high:
+            score += 1
+        elif horizontal_negative & high:
+            score -= 1
+            if score <= allowed and position < last:
+                return sys.maxsize
+        # Row 0 stays at 0, so no carry is shifted in.
+        horizontal_positive = (horizontal_positive << 1) & mask
+        positive = ((horizontal_negative << 1) | ((vertical | horizontal_positive) ^ mask)) & mask
+        negative = horizontal_positive & vertical
+    return _best_prefix(positive, negative, length, score, error_rate)
+
+
+def get_overlaps_myers(lefts, right, error_rate=ERROR_RATE, pattern=None):
+    """
+    Runs get_overlap_myers() on several left reads at once. Each left read gets a lane of the delta vectors, as many
+    bytes wide as needed to hold the right read plus a guard bit that stops carries from crossing lanes, so one
+    operation on the packed integers advances every pair by one column. The left reads are aligned on their last base,
+    shorter ones being padded at the start with columns that match nothing, which leave the column unchanged. The
+    edit distance of the whole right read is kept per lane in the same layout, to flag containments.
+
+    Args:
+        lefts - the left reads.
+        right - the right read.
+        error_rate - the tolerated edit rate.
+        pattern - the match masks of the right read, computed on the fly when not given, see myers_pattern().
+
+    Returns:
+        The results of get_overlap_myers(), one per left read.
+
+    Raises:
+        NONE
+    """
+    if pattern is None:
+        pattern = myers_pattern(right)
+    if len(lefts) < MIN_LANES or not right or any(not 0 < ord(base) < 256 for base in pattern):
+        return [get_overlap_myers(left, right, error_rate, pattern) for left in lefts]
+
+    length = len(right)
+    lanes = len(lefts)
+    size = length // 8 + 1
+    width = 8 * size
+    columns = max(map(len, lefts))
+    table = [bytes(size)] * 256
+    for base, bits in pattern.items():
+        table[ord(base)] = bits.to_bytes(size, 'little')
+    # Column-major copy of the left reads: byte column * lanes + lane holds the base of that lane in that column.
+    text = bytearray(columns * lanes)
+    for lane, left in enumerate(lefts):
+        text[(columns - len(left)) * lanes + lane::lanes] = left.encode('latin-1', 'replace')
+
+    one = int.from_bytes((b'\x01' + bytes(size - 1)) * lanes, 'little')
+    mask = one * ((1 << length) - 1)
+    high = length - 1
+    highs = one << high
+    flags = one << (width - 1)
+    # score + bias reaches the flag bit of a lane when its score is above the allowed edits.
+    bias = one * ((1 << (width - 1)) - int(error_rate * length) - 1)
+    positive, negative = mask, 0
+    score = one * length
+    contained = 0
+    get = table.__getitem__
+    for column in range(columns):
+        match = int.from_bytes(b''.join(map(get, text[column * lanes:(column + 1) * lanes])), 'little')
+        vertical = match | negative
+        horizontal = ((((match & positive) + positive) & mask) ^ positive) | match
+        horizontal_positive = negative | ((horizontal | positive) ^ mask)
+        horizontal_negative = positive & horizontal
+        score = score + ((horizontal_positive & highs) >> high) - ((horizontal_negative & highs) >> high)
+        if column < columns - 1:
+            contained |= flags ^ ((score + bias) & flags)
+        horizontal_positive = (horizontal_positive << 1) & mask
+        positive = ((horizontal_negative << 1) | ((vertical | horizontal_positive) ^ mask)) & mask
+        negative = horizontal_positive & vertical
+
+    total = size * lanes
+    positive, negative, score, contained = (value.to_bytes(total, 'little')
+                                            for value in (positive, negative, score, contained))
+    overlaps = []
+    for lane in range(lanes):
+        start, end = lane * size, (lane + 1) * size
+        if not lefts[lane]:
+            overlaps.append(0)
+        elif contained[end - 1] & 0x80:
+            overlaps.append(sys.maxsize)
+        else:
+            overlaps.append(_best_prefix(int.from_bytes(positive[start:end], 'little'),
+                                         int.from_bytes(negative[start:end], 'little'), length,
+                                         int.from_bytes(score[start:end], 'little'), error_rate))
+    return overlaps
+
+
+def myers_pattern(sequence):
+    """Returns the match masks of a sequence: a dictionary mapping every base to the bits of its positions."""
+    pattern = dict()
+    for position, base in enumerate(sequence):
+        pattern[base] = pattern.get(base, 0) | 1 << position
+    return pattern
+
+
+class MyersEngine(OverlapEngine):
+    """Approximate overlaps allowing up to error_rate edits per overlapping nucleotide, see get_overlap_myers()."""
+
+    name = 'myers'
+
+    def __init__(self, error_rate=ERROR_RATE):
+        """
+        Args:
+            error_rate - the tolerated edit rate, at least 0 and below 0.5.
+
+        Raises:
+            ValueError: the error rate is out of range.
+        """
+        if not 0 <= error_rate < 0.5:
+            raise ValueError("Error rate must be at least 0 and below 0.5")
+        self.error_rate = error_rate
+        self.exact = error_rate == 0
+
+    @property
+    def key(self):
+        return '{}:{!r}'.format(self.name, self.error_rate)
+
+    def seed_count(self, min_overlap):
+        return 1 if self.exact else None
+
+    def seed_length(self, min_overlap):
+        # An overlap of L >= min_overlap nucleotides holds at most error_rate * L edits, each breaking at most one of
+        # the L // k seeds tiled along the prefix of the right read. L / k >= error_rate * L + 1 leaves one seed exact
+        # whatever L, which holds for every L once it holds for min_overlap.
+        if self.exact:
+            return min_overlap
+        return max(1, int(min_overlap / (self.error_rate * min_overlap + 1)))
+
+    def prepare(self, right):
+        return myers_pattern(right)
+
+    def overlap(self, left, right, prepared=None):
+        return get_overlap_myers(left, right, self.error_rate, prepared)
+
+    def overlap_many(self, lefts, right, prepared=None):
+        return get_overlaps_myers(lefts, right, self.error_rate, prepared)
+
+
+OVERLAP_ENGINES = {engine.name: engine for engine in (NaiveEngine(), KMPEngine(), MyersEngine())}
+DEFAULT_ENGINE = OVERLAP_ENGINES['kmp']
+
+get_overlap = DEFAULT_ENGINE
+
+
+def get_engine(engine):
+    """
+    Resolves an engine name or instance to an OverlapEngine.
+
+    Args:
+        engine - the name of a registered engine, an OverlapEngine, or None for the default engine.
+
+    Returns:
+        The matching OverlapEngine.
+
+    Raises:
+        ValueError: the engine name is not registered.
+    """
+    if engine is None:
+        return DEFAULT_ENGINE
+    if isinstance(engine, OverlapEngine):
+        return engine
+    try:
+        return OVERLAP_ENGINES[engine]
+    except KeyError:
+        raise ValueError("Unknown overlap engine: {}".format(engine)) from None
+
+
+def _seed_starts(length, k, seeds):
+    """Returns the starts of the seeds of a read: seeds k-mers end to end from its start, all of them for None."""
+    end = length - k + 1
+    return range(0, end if seeds is None else min(seeds * k, end), k)
+
+
+def build_prefix_index(strands, k, seeds=1):
+    """
+    Indexes every read by the k-mer it starts with. Any overlap of at least k nucleotides, and any containment, places
+    that k-mer somewhere inside the left read, so the index finds every such pair.
+
+    With several seeds, every read is also indexed by the k-mers that follow its first one, end to end: an overlap
+    of L nucleotides holding fewer than min(seeds, L // k) errors leaves one of them exact. With seeds None the
+    k-mers are tiled along the whole read, see MyersEngine.seed_length().
+
+    Args:
+        strands - a dictionary mapping the sequence number to the DNA fragment.
+        k - the seed length.
+        seeds - the amount of seeds per read, None to tile the whole read.
+
+    Returns:
+        index - a dictionary mapping a seed k-mer to the list of reads holding it.
+
+    Raises:
+        NONE
+    """
+    index = dict()
+    for key, sequence in strands.items():
+        for start in _seed_starts(len(sequence), k, seeds):
+            hits = index.setdefault(sequence[start:start + k], [])
+            if not hits or hits[-1] != key:
+                hits.append(key)
+    return index
+
+
+def find_candidate_pairs(strands, k, seeds=1):
+    """
+    Finds the pairs of reads that share a seed, i.e. the left read contains a seed k-mer of the right read.
+
+    Args:
+        strands - a dictionary mapping the sequence number to the DNA fragment.
+        k - the seed length.
+        seeds - the amount of seeds per read, see build_prefix_index().
+
+    Returns:
+        candidates - a dictionary mapping each right read to the set of left reads it may overlap.
+
+    Raises:
+        NONE
+    """
+    index = build_prefix_index(strands, k, seeds)
+    candidates = {key: set() for key in strands}
+    for key1, sequence1 in strands.items():
+        for i in range(len(sequence1) - k + 1):
+            hits = index.get(sequence1[i:i + k])
+            if hits:
+                for key2 in hits:
+                    if key2 != key1:
+                        candidates[key2].add(key1)
+
+    keys = list(strands)
+    for number2, _, number1 in _find_short_reads(_numbered(strands), k):
+        candidates[keys[number2]].add(keys[number1])
+    return candidates
+
+
+def _find_short_reads(sequences, k, both_strands=False):
+    """
+    Yields (read number, strand, containing read number) for every read shorter than the seed length k and every other
+    read containing it, on its forward strand (0) or, with both_strands, also reverse complemented (1).
+    """
+    # Reads shorter than the seed cannot be indexed, but can still be contained in another read.
+    for number2, sequence2 in enumerate(sequences):
+        if len(sequence2) < k:
+            orientations = (sequence2, reverse_complement(sequence2)) if both_strands else (sequence2,)
+            for strand, oriented in enumerate(orientations):
+                for number1, sequence1 in enumerate(sequences):
+                    if number1 != number2 and oriented in sequence1:
+                        yield number2, strand, number1
+
+
+def _numbered(strands):
+    """Returns the reads indexed by 0-based read number, in the order of strands."""
+    # Packed read stores (DNA_reads.PackedReads) decode reads on access instead of holding every read as a str.
+    numbered = getattr(strands, 'numbered', None)
+    return numbered() if numbered is not None else list(strands.values())
+
+
+def remove_contained_reads(strands, k):
+    """
+    Finds the reads that add nothing to the assembly, before any overlap is computed: exact duplicates (all but the
+    first copy) and reads contained in another read. Reads are hashed to find duplicates, then scanned from the longest
+    to the shortest against an index of prefix k-mers; a read found inside a longer read is marked contained and is not
+    scanned itself, since anything it contains is also inside its container.
+
+    Args:
+        strands - a dictionary mapping the sequence number to the DNA fragment.
+        k - the seed length of the prefix index.
+
+    Returns:
+        (maximal_reads, useless_reads) - the keys of the reads to keep and of the reads to drop, in the order of
+                                         strands.
+
+    Raises:
+        ValueError: the seed length is not positive.
+    """
+    if k < 1:
+        raise ValueError("Seed length must be positive")
+    keys = list(strands)
+    sequences = _numbered(strands)
+    contained = bytearray(len(keys))
+    lengths = array('i')
+
+    buckets = dict()
+    for number in range(len(keys)):
+        sequence = sequences[number]
+        lengths.append(len(sequence))
+        bucket = buckets.setdefault(hash(sequence), [])
+        if any(sequences[other] == sequence for other in bucket):
+            contained[number] = 1
+        else:
+            bucket.append(number)
+    del buckets
+
+    index = dict()
+    for number in range(len(keys)):
+        if not contained[number] and lengths[number] >= k:
+            index.setdefault(sequences[number][:k], []).append(number)
+
+    for number in sorted(range(len(keys)), key=lengths.__getitem__, reverse=True):
+        if contained[number]:
+            continue
+        sequence = sequences[number]
+        for i in range(len(sequence) - k + 1):
+            hits = index.get(sequence[i:i + k])
+            if hits:
+                for other in hits:
+                    if (other != number and not contained[other] and lengths[other] <= len(sequence) - i and
+                            sequence.startswith(sequences[other], i)):
+                        contained[other] = 1
+
+    # A duplicate is as long as the read it repeats, and was already dropped above.
+    for number, _, other in _find_short_reads(sequences, k):
+        if lengths[other] > lengths[number]:
+            contained[number] = 1
+
+    return ([key for key, flag in zip(keys, contained) if not flag],
+            [key for key, flag in zip(keys, contained) if flag])
+
+
+def _representative(left, right, lengths):
+    """
+    Picks which of an oriented edge and its twin (the same overlap read on the other strand: right ^ 1 -> left ^ 1) is
+    computed: the one whose right read is the shorter, since only the right read can be found contained. Ties go to the
+    smaller right, then left, oriented read number.
+    """
+    twin_left, twin_right = right ^ 1, left ^ 1
+    if (lengths[right >> 1], right, left) <= (lengths[twin_right >> 1], twin_right, twin_left):
+        return left, right
+    return twin_left, twin_right
+
+
+def find_oriented_candidates(strands, k, seeds=1, twins=False):
+    """
+    Finds the pairs of oriented reads that share a seed, for strand-aware overlapping. The seeds of both strands of
+    every read are indexed once, under their canonical form (the smaller of the k-mer and its reverse complement), so a
+    single scan of the forward strand of every left read finds the seeds of the right reads on either of its strands.
+    Of an oriented edge and its twin, which hold the same overlap for exact engines, only one is kept, see
+    _representative(), unless twins is set.
+
+    Oriented reads are numbered as in DNA_reads.OrientedSequences: 2 * i for read i, 2 * i + 1 for its reverse
+    complement.
+
+    Args:
+        strands - a dictionary mapping the sequence number to the DNA fragment.
+        k - the seed length.
+        seeds - the amount of seeds per read, see build_prefix_index().
+        twins - whether to keep both edges of every twin pair, for engines tolerating errors, whose overlap of a pair
+                may differ from the one of its twin by the indels they allow.
+
+    Returns:
+        candidates - a dictionary mapping each right oriented read number to the set of left oriented read numbers it
+                     may overlap.
+
+    Raises:
+        NONE
+    """
+    sequences = _numbered(strands)
+    lengths = array('i', map(len, sequences))
+    index = dict()
+    for number, sequence in enumerate(sequences):
+        for strand, oriented in enumerate((sequence, reverse_complement(sequence))):
+            for start in _seed_starts(len(oriented), k, seeds):
+                seed = oriented[start:start + k]
+                reverse = reverse_complement(seed)
+                # The low bit records whether the seed is indexed reverse complemented.
+                hit = (2 * number + strand) << 1 | (reverse < seed)
+                hits = index.setdefault(min(seed, reverse), [])
+                if not hits or hits[-1] != hit:
+                    hits.append(hit)
+
+    candidates = dict()
+    for number, sequence in enumerate(sequences):
+        reverse = reverse_complement(sequence)
+        length = len(sequence)
+        for i in range(length - k + 1):
+            kmer = sequence[i:i + k]
+            reverse_kmer = reverse[length - i - k:length - i]
+            hits = index.get(min(kmer, reverse_kmer))
+            if not hits:
+                continue
+            flipped = reverse_kmer < kmer
+            for hit in hits:
+                right = hit >> 1
+                if right >> 1 == number:
+                    continue
+                if kmer == reverse_kmer:
+                    lefts = (2 * number, 2 * number + 1)
+                else:
+                    # The seed is on the forward strand of the left read when both were indexed the same way.
+                    lefts = (2 * number + (flipped != hit & 1),)
+                for left in lefts:
+                    if twins:
+                        candidates.setdefault(right, set()).add(left)
+                        candidates.setdefault(left ^ 1, set()).add(right ^ 1)
+                    else:
+                        left, right_read = _representative(left, right, lengths)
+                        candidates.setdefault(right_read, set()).add(left)
+
+    for number2, strand, number1 in _find_short_reads(sequences, k, both_strands=True):
+        candidates.setdefault(2 * number2 + strand, set()).add(2 * number1)
+        if twins:
+            candidates.setdefault(2 * number1 + 1, set()).add((2 * number2 + strand) ^ 1)
+    return candidates
+
+
+def _plan_oriented_rows(strands, min_overlap, k, seeds=1, twins=False):
+    """
+    Plans the strand-aware overlap computation as rows of (right oriented read number, left oriented read numbers), see
+    find_oriented_candidates(). Without min_overlap every pair of oriented reads of different reads is planned, one
+    edge of every twin pair only unless twins is set.
+    """
+    if min_overlap is None:
+        sequences = _numbered(strands)
+        lengths = array('i', map(len, sequences))
+        nodes = range(2 * len(sequences))
+        return [(right, [left for left in nodes if left >> 1 != right >> 1 and
+                         (twins or _representative(left, right, lengths) == (left, right))]) for right in nodes]
+    candidates = find_oriented_candidates(strands, k, seeds, twins)
+    return [(right, sorted(candidates[right])) for right in sorted(candidates)]
+
+
+def _plan_rows(strands, min_overlap, k, seeds=1):
+    """
+    Plans the overlap computation as rows of (right read number, left read numbers), reads being numbered in the order
+    of strands. The left read numbers are None when the right read must be compared with every read.
+
+    Args:
+        strands - a dictionary mapping the sequence number to the DNA fragment.
+        min_overlap - the smallest overlap to keep, or None to compare all pairs.
+        k - the seed length used by the index.
+        seeds - the amount of seeds per read, see build_prefix_index().
+
+    Returns:
+        rows - a list of (right read number, left read numbers) tuples, in read order.
+
+    Raises:
+        NONE
+    """
+    if min_overlap is None:
+        return [(right, None) for right in range(len(strands))]
+    number = {key: i for i, key in enumerate(strands)}
+    return [(number[key2], [number[key1] for key1 in sorted(lefts)])
+            for key2, lefts in find_candidate_pairs(strands, k, seeds).items() if lefts]
+
+
+def _pair_count(rows, read_count):
+    """Returns the amount of pairs the engine compares for planned rows."""
+    return sum(read_count - 1 if lefts is None else len(lefts) for right, lefts in rows)
+
+
+def _overlap_rows(sequences, engine, min_overlap, rows):
+    """
+    Computes the overlaps of planned rows.
+
+    Args:
+        sequences - the list of reads, indexed by read number.
+        engine - the OverlapEngine to use.
+        min_overlap - the smallest overlap to keep, or None to keep every overlap.
+        rows - (right read number, left read numbers) tuples as planned by _plan_rows().
+
+    Returns:
+        A generator of (left read number, right read number, overlap) tuples.
+
+    Raises:
+        NONE
+    """
+    everyone = range(len(sequences))
+    for right, lefts in rows:
+        sequence2 = sequences[right]
+        # The right read is prepared once and reused against every left read, handed to the engine in batches.
+        prepared = engine.prepare(sequence2)
+        lefts = [left for left in (everyone if lefts is None else lefts) if left != right]
+        for start in range(0, len(lefts), BATCH_SIZE):
+            batch = lefts[start:start + BATCH_SIZE]
+            overlaps = engine.overlap_many([sequences[left] for left in batch], sequence2, prepared)
+            for left, overlap in zip(batch, overlaps):
+                if min_overlap is None or overlap >= min_overlap:
+                    yield left, right, overlap
+
+
+def _share_reads(sequences):
+    """
+    Copies the reads into a shared memory block, so worker processes can load them without pickling them per task.
+    Reads held as strs are laid out as (count + 1) int64 offsets followed by the UTF-8 encoded reads. Reads of a
+    PackedReads store are shared in their packed form: (count + 1) int64 offsets, count int32 lengths, packed bases.
+
+    Args:
+        sequences - the reads indexed by read number, a list or PackedReads.numbered().
+
+    Returns:
+        (block, packed) - the SharedMemory block, which the caller is responsible for closing and unlinking, and
+                          whether it holds packed reads.
+
+    Raises:
+        NONE
+    """
+    store = getattr(sequences, 'store', None)
+    if store is not None:
+        parts = (store.offsets.tobytes(), store.lengths.tobytes(), store.data)
+        block = shared_memory.SharedMemory(create=True, size=max(sum(map(len, parts)), 1))
+        position = 0
+        for part in parts:
+            block.buf[position:position + len(part)] = part
+            position += len(part)
+        return block, True
+
+    offsets = array('q', [0])
+    for sequence in sequences:
+        offsets.append(offsets[-1] + len(sequence.encode('utf-8')))
+    header = offsets.itemsize * len(offsets)
+
+    block = shared_memory.SharedMemory(create=True, size=max(header + offsets[-1], 1))
+    block.buf[:header] = offsets.tobytes()
+    for sequence, start, end in zip(sequences, offsets, offsets[1:]):
+        block.buf[header + start:header + end] = sequence.encode('utf-8')
+    return block, False
+
+
+_worker = dict()
+
+
+def _init_worker(name, count, packed, lowercase, exceptions, engine, min_overlap, oriented=False):
+    """
+    Loads the shared reads once per worker process. Packed reads stay in shared memory and are decoded on access.
+    Strand-aware runs also see the reverse complements, see DNA_reads.OrientedSequences.
+    """
+    block = shared_memory.SharedMemory(name=name)
+    header = 8 * (count + 1)
+    offsets = block.buf[:header].cast('q')
+    if packed:
+        lengths = block.buf[header:header + 4 * count].cast('i')
+        store = PackedReads.from_buffers(block.buf[header + 4 * count:], offsets, lengths, lowercase, exceptions)
+        _worker['block'] = block
+        _worker['sequences'] = store.numbered()
+    else:
+        _worker['sequences'] = [bytes(block.buf[header + offsets[i]:header + offsets[i + 1]]).decode('utf-8')
+                                for i in range(count)]
+        offsets.release()
+        block.close()
+    if oriented:
+        _worker['sequences'] = OrientedSequences(_worker['sequences'])
+    _worker['engine'] = engine
+    _worker['min_overlap'] = min_overlap
+
+
+def _overlap_arrays(sequences, engine, min_overlap, rows):
+    """Computes a block of rows and returns the results as compact (lefts, rights, overlaps) arrays."""
+    lefts, rights, overlaps = array('i'), array('i'), array('q')
+    for left, right, overlap in _overlap_rows(sequences, engine, min_overlap, rows):
+        lefts.append(left)
+        rights.append(right)
+        overlaps.append(overlap)
+    return lefts, rights, overlaps
+
+
+def _overlap_block(rows):
+    """Computes a block of rows in a worker process."""
+    return _overlap_arrays(_worker['sequences'], _worker['engine'], _worker['min_overlap'], rows)
+
+
+def _iter_blocks(sequences, engine, min_overlap, blocks, workers, oriented=False):
+    """
+    Computes blocks of planned rows, in a pool of worker processes when there are several workers and blocks. Blocks
+    are produced in plan order, so the results are the same whatever the amount of workers. With oriented, the rows
+    hold oriented read numbers, see DNA_reads.OrientedSequences.
+
+    Returns:
+        A generator of (lefts, rights, overlaps) arrays, one per block.
+    """
+    if workers <= 1 or len(blocks) <= 1:
+        if oriented:
+            sequences = OrientedSequences(sequences)
+        for rows in blocks:
+            yield _overlap_arrays(sequences, engine, min_overlap, rows)
+        return
+
+    shared, packed = _share_reads(sequences)
+    lowercase = packed and sequences.store.lowercase
+    # The few runs of unpacked characters are pickled to every worker rather than shared.
+    exceptions = sequences.store.exceptions if packed else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.name, len(sequences), packed, lowercase, exceptions, engine,
+                                           min_overlap, oriented)) as executor:
+            yield from executor.map(_overlap_block, blocks)
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def _iter_overlaps_blocks(sequences, engine, min_overlap, rows, workers, block_size, profiler, oriented=False):
+    """
+    Splits the planned rows into blocks of block_size rows, spread over a pool of worker processes when there are
+    several workers, and reports the progress after every block.
+    """
+    if block_size is None:
+        block_size = max(1, -(-len(rows) // max(workers * 8, MIN_BLOCKS)))
+    blocks = [rows[start:start + block_size] for start in range(0, len(rows), block_size)]
+    computed = _iter_blocks(sequences, engine, min_overlap, blocks, workers, oriented)
+    for number, (lefts, rights, overlaps) in enumerate(computed):
+        if profiler is not None:
+            profiler.advance(number + 1, len(blocks))
+        yield from zip(lefts, rights, overlaps)
+
+
+def _iter_overlaps_cached(strands, engine, min_overlap, k, seeds, workers, cache, profiler, oriented=False,
+                          block_size=None, twins=False):
+    """
+    Reads the overlaps from the cache, or computes them in checkpointed blocks of CHECKPOINT_ROWS rows and caches them.
+    Blocks checkpointed by an interrupted run are loaded instead of being computed again. The blocks still to compute
+    are handed to the workers in parts of block_size rows, sized as in _iter_overlaps_blocks() by default, and a block
+    is checkpointed once all its parts are done. The progress is reported in rows.
+
+    Returns:
+        A generator of (left read number, right read number, overlap) tuples.
+    """
+    key = cache.key(strands, engine.key, min_overlap, k, both_strands=oriented, twins=twins)
+    cached = cache.load(key)
+    if profiler is not None:
+        profiler.count('overlap_cache_hits' if cached is not None else 'overlap_cache_misses')
+    if cached is None:
+        if oriented:
+            rows = _plan_oriented_rows(strands, min_overlap, k, seeds, twins)
+        else:
+            rows = _plan_rows(strands, min_overlap, k, seeds)
+        blocks = [rows[start:start + CHECKPOINT_ROWS] for start in range(0, len(rows), CHECKPOINT_ROWS)]
+        done = [cache.load_block(key, number) for number in range(len(blocks))]
+        missing = [number for number, block in enumerate(done) if block is None]
+        if profiler is not None:
+            profiler.count('checkpoint_blocks_loaded', len(blocks) - len(missing))
+            profiler.count('pairs_evaluated', sum(_pair_count(blocks[number], len(strands)) for number in missing))
+        if block_size is None:
+            block_size = -(-sum(len(blocks[number]) for number in missing) // max(workers * 8, MIN_BLOCKS))
+        block_size = max(1, min(block_size, CHECKPOINT_ROWS))
+        parts = [(number, blocks[number][start:start + block_size]) for number in missing
+                 for start in range(0, len(blocks[number]), block_size)]
+        computed = _iter_blocks(_numbered(strands), engine, min_overlap, [part for _, part in parts], workers,
+                                oriented)
+        finished = len(rows) - sum(len(blocks[number]) for number in missing)
+        remaining = {number: len(blocks[number]) for number in missing}
+        for (number, part), arrays in zip(parts, computed):
+            if done[number] is None:
+                done[number] = array('i'), array('i'), array('q')
+            for whole, piece in zip(done[number], arrays):
+                whole.extend(piece)
+            remaining[number] -= len(part)
+            if not remaining[number]:
+                cache.store_block(key, number, *done[number])
+            finished += len(part)
+            if profiler is not None:
+                profiler.advance(finished, len(rows))
+
+        cached = lefts, rights, overlaps = array('i'), array('i'), array('q')
+        for block in done:
+            lefts.extend(block[0])
+            rights.extend(block[1])
+            overlaps.extend(block[2])
+        del done
+        cache.store(key, lefts, rights, overlaps)
+    return zip(*cached)
+
+
+def iter_overlaps(strands, engine=None, min_overlap=None, k=None, workers=1, block_size=None, cache=None,
+                  profiler=None, both_strands=False):
+    """
+    Computes the overlap combinations one pair at a time.
+
+    Without min_overlap every ordered pair is compared, zero overlaps included. With min_overlap the pairs are first
+    filtered through a k-mer seed index and only pairs that share a seed are verified by the engine; only containments
+    and overlaps of at least min_overlap nucleotides are then produced. Engines tolerating errors index shorter seeds
+    tiled along the whole read (see OverlapEngine.seed_count() and seed_length()).
+
+    The comparisons are split into blocks of right reads, after each of which the progress is reported to the
+    profiler. With more than one worker the blocks are computed by a process pool, the reads being shared with the
+    workers through shared memory. The output does not depend on the amount of
+    workers.
+
+    With a cache, the overlaps are loaded from it when the same reads were overlapped with the same parameters before,
+    and are otherwise computed in checkpointed blocks and stored in it, see DNA_overlap_cache.
+
+    With both_strands, reads may come from either strand: the reads are compared with each other's reverse complement
+    too, through a single index of canonical seeds (see find_oriented_candidates()), and the keys produced are oriented
+    keys (key, '+') and (key, '-') as in DNA_reads.OrientedReads. An overlap of a left on a right oriented read is also
+    an overlap of the reverse complement of the right on the reverse complement of the left read, its twin. Exact
+    engines find the same overlap both ways, and only one of the two is produced. Engines tolerating errors may not,
+    since an indel makes the overlap one base longer on one read than on the other: both are then computed and
+    produced, each measured on its own oriented pair.
+
+    Args:
+        strands - a dictionary mapping the sequence number to the DNA fragment.
+        engine - the overlap engine (name or instance) to use, the KMP engine by default.
+        min_overlap - the smallest overlap to keep, or None to compare all pairs.
+        k - the seed length used by the index, OverlapEngine.seed_length() by default. Must not exceed min_overlap.
+        workers - the amount of worker processes, None for one per CPU.
+        block_size - the amount of right reads per block handed to a worker, chosen from the amount of workers by
+                     default. Cached runs checkpoint blocks of CHECKPOINT_ROWS right reads, split into parts of at most
+                     block_size right reads for the workers.
+        cache - an OverlapCache or a cache directory, None to not cache.
+        profiler - a DNA_profile.Profiler counting the pairs evaluated and following the progress, or None.
+        both_strands - whether to also overlap the reads with the reverse complement of the others.
+
+    Returns:
+        A generator of (left key, right key, overlap) tuples, grouped by right key.
+
+    Raises:
+        ValueError: the engine name is not registered or the seed length is invalid.
+        OSError: the cache cannot be written.
+    """
+    engine = get_engine(engine)
+    seeds = 1
+    if min_overlap is not None:
+        seeds = engine.seed_count(min_overlap)
+        if k is None:
+            k = engine.seed_length(min_overlap)
+        if not 0 < k <= min_overlap:
+            raise ValueError("Seed length must be between 1 and the minimum overlap")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    keys = list(strands)
+    twins = both_strands and not engine.exact
+    if both_strands:
+        keys = [(key, strand) for key in keys for strand in STRANDS]
+    if cache is not None:
+        overlaps = _iter_overlaps_cached(strands, engine, min_overlap, k, seeds, workers, get_cache(cache), profiler,
+                                         both_strands, block_size, twins)
+    else:
+        sequences = _numbered(strands)
+        if both_strands:
+            rows = _plan_oriented_rows(strands, min_overlap, k, seeds, twins)
+        else:
+            rows = _plan_rows(strands, min_overlap, k, seeds)
+        if profiler is not None:
+            profiler.count('pairs_evaluated', _pair_count(rows, len(keys)))
+        overlaps = _iter_overlaps_blocks(sequences, engine, min_overlap, rows, workers, block_size, profiler,
+                                         both_strands)
+    for left, right, overlap in overlaps:
+        yield keys[left], keys[right], overlap
+
+
+def get_all_overlaps(strands, useless_reads, engine=None, min_overlap=None, k=None, workers=1, cache=None,
+                     profiler=None):
+    """
+    Creates an overlap matrix (essentially a 2D dictionary) containing the overlap combinations. The matrix is dense
+    without min_overlap and sparse with it, see iter_overlaps().
+
+    Args:
+        strands - a dictionary mapping the sequence number to the DNA fragment.
+        useless_reads - a list that collects the reads marked by sys.maxsize (contained in another read).
+        engine - the overlap engine (name or instance) to use, the KMP engine by default.
+        min_overlap - the smallest overlap to keep, or None to compare all pairs.
+        k - the seed length used by the index, min_overlap by default. Must not exceed min_overlap.
+        workers - the amount of worker processes, None for one per CPU.
+        cache - an OverlapCache or a cache directory, None to not cache.
+        profiler - a DNA_profile.Profiler counting the pairs evaluated, or None.
+
+    Returns:
+        overlap_matrix - a 2D dictionary containing the overlap combinations.
+
+    Raises:
+        ValueError: the engine name is not registered or the seed length is invalid.
+    """
+    overlap_matrix = {key: dict() for key in strands}
+    for key1, key2, overlap in iter_overlaps(strands, engine, min_overlap, k, workers, cache=cache,
+                                             profiler=profiler):
+        overlap_matrix[key1][key2] = overlap
+        if overlap == sys.maxsize:
+            useless_reads.append(key2)
+    return overlap_matrix
@@ -0,0 +1,180 @@
+"""
+On-disk cache of the overlap stage.
+
+The overlaps computed by iter_overlaps() are stored as three flat, memory-mappable arrays: left read numbers (int32),
+right read numbers (int32) and overlaps (int64), in a file named after a hash of the reads and of the overlap
+parameters. A rerun on the same reads with the same parameters, e.g. to try another layout, maps the file instead of
+recomputing the overlaps. While the overlaps are computed, every block of CHECKPOINT_ROWS right reads is written to its
+own checkpoint file, so an interrupted run resumes from the blocks it already finished.
+
+Files are written in native byte order and are meant to be reused on the machine that wrote them.
+"""
+
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+from array import array
+
+from DNA_reads import PackedReads
+
+CACHE_VERSION = 2
+CHECKPOINT_ROWS = 1024
+MAGIC = b'DNAOVL1\0'
+HEADER = struct.Struct('=8sq')
+
+
+def hash_reads(strands):
+    """
+    Hashes a read set, keys and sequences in order. Packed stores are hashed in their packed form.
+
+    Args:
+        strands - a dictionary mapping the sequence number to the DNA fragment, or a PackedReads.
+
+    Returns:
+        A hashlib sha256 object, to be updated with the parameters.
+
+    Raises:
+        NONE
+    """
+    digest = hashlib.sha256()
+    if isinstance(strands, PackedReads):
+        digest.update(b'packed %d %d\n' % (strands.lowercase, len(strands)))
+        for part in (strands.offsets, strands.lengths, strands.numbers or array('q'), strands.data):
+            digest.update(part)
+        if strands.exceptions:
+            digest.update(repr(sorted(strands.exceptions.items())).encode('utf-8'))
+        return digest
+    for key, sequence in strands.items():
+        digest.update(repr(key).encode('utf-8') + b'\0' + sequence.encode('utf-8') + b'\n')
+    return digest
+
+
+def write_overlaps(filename, lefts, rights, overlaps):
+    """
+    Writes overlap arrays to a file, atomically: the file either holds every array or does not exist.
+
+    Args:
+        filename - the name of the file.
+        lefts - the left read number of every overlap, an array('i').
+        rights - the right read number of every overlap, an array('i').
+        overlaps - the overlaps, an array('q').
+
+    Returns:
+        NONE
+
+    Raises:
+        OSError: the file cannot be written.
+    """
+    temporary = '{}.{}.tmp'.format(filename, os.getpid())
+    with open(temporary, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(lefts)))
+        lefts.tofile(f)
+        rights.tofile(f)
+        overlaps.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, filename)
+
+
+def map_overlaps(filename):
+    """
+    Memory-maps a file written by write_overlaps().
+
+    Args:
+        filename - the name of the file.
+
+    Returns:
+        (lefts, rights, overlaps) - memoryviews on the mapped file, or None when the file is missing or damaged.
+
+    Raises:
+        NONE
+    """
+    try:
+        with open(filename, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError:
+        return None
+    magic, count = HEADER.unpack_from(mapped)
+    if magic != MAGIC or size != HEADER.size + 16 * count:
+        mapped.close()
+        return None
+    view = memoryview(mapped)
+    start = HEADER.size
+    return (view[start:start + 4 * count].cast('i'), view[start + 4 * count:start + 8 * count].cast('i'),
+            view[start + 8 * count:].cast('q'))
+
+
+class OverlapCache:
+    """
+    A directory of overlap files, one per read set and set of overlap parameters, and of the checkpoint blocks of the
+    overlaps still being computed.
+    """
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory - the cache directory, created when needed.
+        """
+        self.directory = directory
+
+    def key(self, strands, engine, min_overlap, k, block_rows=CHECKPOINT_ROWS, both_strands=False, twins=False):
+        """
+        Computes the cache key of a read set and its overlap parameters.
+
+        Args:
+            strands - a dictionary mapping the sequence number to the DNA fragment, or a PackedReads.
+            engine - the key of the overlap engine, see OverlapEngine.key.
+            min_overlap - the smallest overlap to keep, or None.
+            k - the seed length used by the index.
+            block_rows - the amount of right reads per checkpoint block.
+            both_strands - whether the reads were also overlapped with the reverse complement of the others.
+            twins - whether both edges of every twin pair were computed, see DNA_overlap.iter_overlaps().
+
+        Returns:
+            The key, a hex string.
+
+        Raises:
+            NONE
+        """
+        digest = hash_reads(strands)
+        digest.update('{} {} {} {} {}'.format(CACHE_VERSION, engine, min_overlap, k, block_rows).encode('ascii'))
+        if both_strands:
+            digest.update(b' both-strands')
+        if twins:
+            digest.update(b' twins')
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.overlaps')
+
+    def block_path(self, key, number):
+        return os.path.join(self.directory, key + '.blocks', '{:08d}.overlaps'.format(number))
+
+    def load(self, key):
+        """Maps the overlaps of a key, or returns None when they are not cached."""
+        return map_overlaps(self.path(key))
+
+    def store(self, key, lefts, rights, overlaps):
+        """Writes the overlaps of a key and drops its checkpoint blocks."""
+        os.makedirs(self.directory, exist_ok=True)
+        write_overlaps(self.path(key), lefts, rights, overlaps)
+        shutil.rmtree(os.path.join(self.directory, key + '.blocks'), ignore_errors=True)
+
+    def load_block(self, key, number):
+        """Maps a checkpoint block, or returns None when the block was not finished."""
+        return map_overlaps(self.block_path(key, number))
+
+    def store_block(self, key, number, lefts, rights, overlaps):
+        """Checkpoints a finished block."""
+        os.makedirs(os.path.dirname(self.block_path(key, number)), exist_ok=True)
+        write_overlaps(self.block_path(key, number), lefts, rights, overlaps)
+
+
+def get_cache(cache):
+    """Returns the OverlapCache for a cache directory, or the given OverlapCache."""
+    return cache if isinstance(cache, OverlapCache) else OverlapCache(cache)
@@ -0,0 +1,518 @@
+"""
+Compact sparse overlap graph.
+
+The graph stores only the non-zero overlaps, in compressed sparse row (CSR) form: an offsets array indexed by read, and
+parallel int32 target/overlap arrays sorted by source read. Contained reads are kept as flags instead of sys.maxsize
+edges. Compared to the nested-dict overlap matrix this costs 8 bytes per edge plus a few bytes per read.
+
+OrientedOverlapGraph is the strand-aware variant, whose nodes are the two strands of every read.
+"""
+
+import heapq
+import sys
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+
+from DNA_overlap import get_engine, iter_overlaps
+from DNA_reads import STRANDS
+
+OVERLAP_CACHE_SIZE = 4096
+
+
+def _csr(node_count, sources, targets, overlaps):
+    """
+    Sorts an edge list by source read (counting sort) into CSR arrays. Edges of the same source keep the order of their
+    target reads.
+
+    Args:
+        node_count - the amount of reads.
+        sources - the source read of every edge.
+        targets - the target read of every edge.
+        overlaps - the overlap of every edge.
+
+    Returns:
+        (offsets, targets, overlaps) - the edges of read i are targets[offsets[i]:offsets[i + 1]].
+
+    Raises:
+        NONE
+    """
+    offsets = array('i', bytes(4 * (node_count + 1)))
+    for source in sources:
+        offsets[source + 1] += 1
+    for node in range(node_count):
+        offsets[node + 1] += offsets[node]
+
+    # iter_overlaps() already produces edges in target order, which the stable counting sort preserves.
+    edges = range(len(targets))
+    if any(targets[edge] > targets[edge + 1] for edge in range(len(targets) - 1)):
+        edges = sorted(edges, key=targets.__getitem__)
+
+    fill = array('i', offsets)
+    sorted_targets = array('i', bytes(4 * len(targets)))
+    sorted_overlaps = array('i', bytes(4 * len(targets)))
+    for edge in edges:
+        position = fill[sources[edge]]
+        sorted_targets[position] = targets[edge]
+        sorted_overlaps[position] = overlaps[edge]
+        fill[sources[edge]] = position + 1
+    return offsets, sorted_targets, sorted_overlaps
+
+
+class OverlapGraph:
+    """
+    A sparse overlap graph over a set of reads. Reads are numbered 0..n-1 internally; the public methods take and
+    return the read keys used by read_data().
+    """
+
+    def __init__(self, keys, sources=(), targets=(), overlaps=(), contained=()):
+        """
+        Args:
+            keys - the read keys, in read order.
+            sources - the source read number of every edge.
+            targets - the target read number of every edge.
+            overlaps - the overlap of every edge.
+            contained - the numbers of the reads contained in another read.
+        """
+        self.keys = list(keys)
+        self.index = {key: node for node, key in enumerate(self.keys)}
+        self.offsets, self.targets, self.overlaps = _csr(len(self.keys), array('i', sources), array('i', targets),
+                                                         array('i', overlaps))
+        self.contained = bytearray(len(self.keys))
+        for node in contained:
+            self.contained[node] = 1
+        self.alive = bytearray(b'\x01') * len(self.keys)
+        self.best = array('i', [-1]) * len(self.keys)
+        self._update_best()
+
+    @classmethod
+    def from_edges(cls, keys, edges):
+        """
+        Builds the graph from (left key, right key, overlap) tuples such as produced by iter_overlaps(). Zero overlaps
+        are dropped and sys.maxsize marks the right read as contained. Reads contained in each other, which approximate
+        engines report for near-identical reads, are treated as duplicates: the first in read order is kept.
+
+        Args:
+            keys - the read keys, in read order.
+            edges - an iterable of (left key, right key, overlap) tuples.
+
+        Returns:
+            The OverlapGraph.
+
+        Raises:
+            KeyError: an edge refers to an unknown read.
+        """
+        keys = list(keys)
+        index = {key: node for node, key in enumerate(keys)}
+        sources, targets, overlaps = array('i'), array('i'), array('i')
+        containments = set()
+        for key1, key2, overlap in edges:
+            if overlap == sys.maxsize:
+                containments.add((index[key1], index[key2]))
+            elif overlap:
+                sources.append(index[key1])
+                targets.append(index[key2])
+                overlaps.append(overlap)
+        contained = {inner for outer, inner in containments if inner > outer or (inner, outer) not in containments}
+        return cls(keys, sources, targets, overlaps, contained)
+
+    @classmethod
+    def from_matrix(cls, overlap_matrix):
+        """
+        Builds the graph from an overlap matrix created by get_all_overlaps().
+
+        Args:
+            overlap_matrix - a 2D dictionary containing the overlap combinations.
+
+        Returns:
+            The OverlapGraph.
+
+        Raises:
+            NONE
+        """
+        edges = ((key1, key2, overlap) for key1, row in overlap_matrix.items() for key2, overlap in row.items())
+        return cls.from_edges(overlap_matrix, edges)
+
+    def __len__(self):
+        return sum(self.alive)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def edge_overlaps(self):
+        """Returns the overlap of every edge, e.g. for a histogram."""
+        return self.overlaps
+
+    @property
+    def nbytes(self):
+        """The size in bytes of the graph arrays."""
+        return (self.offsets.itemsize * len(self.offsets) + self.targets.itemsize * len(self.targets) +
+                self.overlaps.itemsize * len(self.overlaps) + self.best.itemsize * len(self.best) +
+                len(self.contained) + len(self.alive))
+
+    def useless_reads(self):
+        """Returns the keys of the contained reads, in read order."""
+        return [self.keys[node] for node, flag in enumerate(self.contained) if flag]
+
+    def successors(self, key):
+        """Returns the (key, overlap) pairs of the reads overlapping the given read on its right."""
+        node = self.index[key]
+        start, end = self.offsets[node], self.offsets[node + 1]
+        return [(self.keys[target], overlap) for target, overlap in
+                zip(self.targets[start:end], self.overlaps[start:end]) if self.alive[target]]
+
+    def overlap(self, left, right):
+        """Returns the overlap of the right read on the left read, 0 when there is no edge."""
+        node, target = self.index[left], self.index[right]
+        start, end = self.offsets[node], self.offsets[node + 1]
+        position = bisect_left(self.targets, target, start, end)
+        if position < end and self.targets[position] == target and self.alive[target]:
+            return self.overlaps[position]
+        return 0
+
+    def best_successor(self, key):
+        """Returns the key of the read with the largest overlap on the right of the given read, or None."""
+        target = self.best[self.index[key]]
+        return None if target < 0 else self.keys[target]
+
+    def _update_best(self):
+        """Recomputes the best successor of every read. Ties go to the first read in read order."""
+        targets, overlaps, alive = self.targets, self.overlaps, self.alive
+        for node in range(len(self.keys)):
+            best, largest = -1, 0
+            for position in range(self.offsets[node], self.offsets[node + 1]):
+                if overlaps[position] > largest and alive[targets[position]]:
+                    best, largest = targets[position], overlaps[position]
+            self.best[node] = best
+
+    def delete_useless_reads(self, useless_reads=None):
+        """
+        Removes reads from the graph, along with every edge pointing to them, and compacts the edge arrays.
+
+        Args:
+            useless_reads - the keys of the reads to remove, the contained reads by default.
+
+        Returns:
+            NONE
+
+        Raises:
+            KeyError: a key is not part of the graph.
+        """
+        if useless_reads is None:
+            useless_reads = self.useless_reads()
+        for key in useless_reads:
+            self.alive[self.index[key]] = 0
+
+        offsets, targets, overlaps, alive = self.offsets, self.targets, self.overlaps, self.alive
+        kept = 0
+        start = 0
+        for node in range(len(self.keys)):
+            end = offsets[node + 1]
+            if alive[node]:
+                for position in range(start, end):
+                    if alive[targets[position]]:
+                        targets[kept] = targets[position]
+                        overlaps[kept] = overlaps[position]
+                        kept += 1
+            start = end
+            offsets[node + 1] = kept
+        del targets[kept:]
+        del overlaps[kept:]
+        self._update_best()
+
+    def incoming_overlaps(self):
+        """Returns an array with the sum of the overlaps of every read when placed on the right of other reads."""
+        totals = array('q', bytes(8 * len(self.keys)))
+        for target, overlap in zip(self.targets, self.overlaps):
+            totals[target] += overlap
+        return totals
+
+    def find_first_read(self):
+        """
+        Finds the first read (i.e. the leftmost read): the read with the least amount of overlap when placed on the
+        right of other reads. Ties go to the first read in read order.
+
+        Returns:
+            The key of the first read, or None when the graph is empty.
+        """
+        totals = self.incoming_overlaps()
+        first, smallest = None, None
+        for node, total in enumerate(totals):
+            if self.alive[node] and (smallest is None or total < smallest):
+                first, smallest = node, total
+        return None if first is None else self.keys[first]
+
+    def find_next_read(self, key):
+        """Finds the next read, i.e. the read with the largest overlap on the right of the given read, or None."""
+        return self.best_successor(key)
+
+    def find_order(self, first_read):
+        """
+        Finds the order of reads for assembly by following the best successor of every read, starting from the first
+        read, until a read has no successor or its successor is already placed.
+
+        Args:
+            first_read - the key of the first (i.e. the leftmost) read.
+
+        Returns:
+            order - a list containing the order of assembly.
+        """
+        order = [first_read]
+        visited = {first_read}
+        next_read = self.find_next_read(first_read)
+        while next_read is not None and next_read not in visited:
+            order.append(next_read)
+            visited.add(next_read)
+            next_read = self.find_next_read(next_read)
+        return order
+
+    def greedy_layout(self):
+        """
+        Lays the reads out into contigs by greedily merging along the largest overlaps first. Edges are popped from a
+        heap ordered by overlap length; an edge is used when its source has no successor yet, its target has no
+        predecessor yet, and the two reads are not already in the same contig (tracked with union-find), so every
+        read is placed exactly once and no cycle is formed. Runs in O(E log E).
+
+        Returns:
+            contigs - a list of read orders, one per contig, longest contig (in reads) first. Reads without usable
+                      overlaps form contigs of their own.
+        """
+        node_count = len(self.keys)
+        parent = array('i', range(node_count))
+
+        def find(node):
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        heap = [(-self.overlaps[position], source, self.targets[position])
+                for source in range(node_count) if self.alive[source]
+                for position in range(self.offsets[source], self.offsets[source + 1])
+                if self.alive[self.targets[position]]]
+        heapq.heapify(heap)
+
+        successor = array('i', [-1]) * node_count
+        has_predecessor = bytearray(node_count)
+        while heap:
+            _, source, target = heapq.heappop(heap)
+            if successor[source] >= 0 or has_predecessor[target]:
+                continue
+            root_source, root_target = find(source), find(target)
+            if root_source == root_target:
+                continue
+            successor[source] = target
+            has_predecessor[target] = 1
+            parent[root_target] = root_source
+
+        contigs = []
+        for node in range(node_count):
+            if self.alive[node] and not has_predecessor[node]:
+                contig = [self.keys[node]]
+                while successor[node] >= 0:
+                    node = successor[node]
+                    contig.append(self.keys[node])
+                contigs.append(contig)
+        contigs.sort(key=len, reverse=True)
+        return contigs
+
+
+class OrientedOverlapGraph(OverlapGraph):
+    """
+    A sparse overlap graph over both strands of a set of reads. Nodes are oriented reads, numbered 2 * i for read i and
+    2 * i + 1 for its reverse complement, with keys (key, '+') and (key, '-') as in DNA_reads.OrientedReads. Every
+    overlap is stored along with its twin: when strand a of one read overlaps strand b of another, the reverse
+    complement of b overlaps the reverse complement of a, by as much for exact engines. Contained reads are flagged on
+    both strands.
+    """
+
+    @classmethod
+    def from_edges(cls, keys, edges, twins=False):
+        """
+        Builds the graph from (left oriented key, right oriented key, overlap) tuples such as produced by
+        iter_overlaps() with both_strands. Zero overlaps are dropped and sys.maxsize marks the right read as contained,
+        whatever its strand. Reads contained in each other are treated as duplicates: the first in read order is kept.
+
+        Args:
+            keys - the read keys, in read order.
+            edges - an iterable of (left oriented key, right oriented key, overlap) tuples.
+            twins - whether the edges hold both edges of every twin pair, each with its own overlap, as produced for
+                    engines tolerating errors. An edge whose twin is missing (e.g. below the minimum overlap) is then
+                    dropped. Otherwise they hold one edge of every twin pair, and the twin gets the same overlap.
+
+        Returns:
+            The OrientedOverlapGraph.
+
+        Raises:
+            KeyError: an edge refers to an unknown read.
+        """
+        keys = [(key, strand) for key in keys for strand in STRANDS]
+        index = {key: node for node, key in enumerate(keys)}
+        sources, targets, overlaps = array('i'), array('i'), array('i')
+        containments = set()
+        found = dict()
+        for key1, key2, overlap in edges:
+            node1, node2 = index[key1], index[key2]
+            if overlap == sys.maxsize:
+                containments.add((node1 >> 1, node2 >> 1))
+            elif overlap and twins:
+                found[node1, node2] = overlap
+            elif overlap:
+                sources.extend((node1, node2 ^ 1))
+                targets.extend((node2, node1 ^ 1))
+                overlaps.extend((overlap, overlap))
+        for (node1, node2), overlap in found.items():
+            if (node2 ^ 1, node1 ^ 1) in found:
+                sources.append(node1)
+                targets.append(node2)
+                overlaps.append(overlap)
+        del found
+        contained = [2 * inner + strand for outer, inner in containments
+                     if inner > outer or (inner, outer) not in containments for strand in range(2)]
+        return cls(keys, sources, targets, overlaps, contained)
+
+    def __len__(self):
+        return sum(self.alive) // 2
+
+    @property
+    def edge_count(self):
+        return len(self.targets) // 2
+
+    def edge_overlaps(self):
+        """Returns the overlap of every edge, once per twin pair: the edge whose source is the smaller oriented read."""
+        return [self.overlaps[position] for source in range(len(self.keys))
+                for position in range(self.offsets[source], self.offsets[source + 1])
+                if source < self.targets[position] ^ 1]
+
+    def useless_reads(self):
+        """Returns the keys of the contained reads (not oriented), in read order."""
+        return [self.keys[node][0] for node in range(0, len(self.keys), 2) if self.contained[node]]
+
+    def delete_useless_reads(self, useless_reads=None):
+        """
+        Removes reads from the graph, both strands, along with every edge pointing to them.
+
+        Args:
+            useless_reads - the keys (not oriented) of the reads to remove, the contained reads by default.
+
+        Returns:
+            NONE
+
+        Raises:
+            KeyError: a key is not part of the graph.
+        """
+        if useless_reads is None:
+            useless_reads = self.useless_reads()
+        super().delete_useless_reads([(key, strand) for key in useless_reads for strand in STRANDS])
+
+    def greedy_layout(self):
+        """
+        Lays the reads out into contigs like OverlapGraph.greedy_layout(), choosing the strand of every read. Using an
+        edge also uses its twin, so every contig is laid out on both strands at once, and union-find over reads
+        rather than oriented reads places every read once, on a single strand.
+
+        Returns:
+            contigs - a list of oriented read orders, one per contig, longest contig (in reads) first. Every contig is
+                      listed once, read from whichever of its two ends has the smaller oriented read number.
+        """
+        node_count = len(self.keys)
+        parent = array('i', range(node_count // 2))
+
+        def find(read):
+            while parent[read] != read:
+                parent[read] = parent[parent[read]]
+                read = parent[read]
+            return read
+
+        heap = [(-self.overlaps[position], source, self.targets[position])
+                for source in range(node_count) if self.alive[source]
+                for position in range(self.offsets[source], self.offsets[source + 1])
+                if self.alive[self.targets[position]]]
+        heapq.heapify(heap)
+
+        successor = array('i', [-1]) * node_count
+        has_predecessor = bytearray(node_count)
+        while heap:
+            _, source, target = heapq.heappop(heap)
+            if successor[source] >= 0 or has_predecessor[target]:
+                continue
+            root_source, root_target = find(source >> 1), find(target >> 1)
+            if root_source == root_target:
+                continue
+            successor[source] = target
+            has_predecessor[target] = 1
+            successor[target ^ 1] = source ^ 1
+            has_predecessor[source ^ 1] = 1
+            parent[root_target] = root_source
+
+        contigs = []
+        placed = bytearray(node_count // 2)
+        for node in range(node_count):
+            if self.alive[node] and not has_predecessor[node] and not placed[node >> 1]:
+                contig = [self.keys[node]]
+                placed[node >> 1] = 1
+                while successor[node] >= 0:
+                    node = successor[node]
+                    contig.append(self.keys[node])
+                    placed[node >> 1] = 1
+                contigs.append(contig)
+        contigs.sort(key=len, reverse=True)
+        return contigs
+
+
+def get_overlap_graph(strands, engine=None, min_overlap=None, k=None, workers=1, cache=None, profiler=None,
+                      both_strands=False):
+    """
+    Computes the overlaps of the reads straight into an OverlapGraph, without building the overlap matrix. With
+    both_strands, reads may come from either strand and an OrientedOverlapGraph is built instead.
+
+    Args:
+        strands - a dictionary mapping the sequence number to the DNA fragment.
+        engine - the overlap engine (name or instance) to use, the KMP engine by default.
+        min_overlap - the smallest overlap to keep, or None to compare all pairs.
+        k - the seed length used by the index, OverlapEngine.seed_length() by default.
+        workers - the amount of worker processes, None for one per CPU.
+        cache - an OverlapCache or a cache directory to load the overlaps from or store them in, None to not cache.
+        profiler - a DNA_profile.Profiler counting the pairs evaluated, or None.
+        both_strands - whether to also overlap the reads with the reverse complement of the others.
+
+    Returns:
+        The OverlapGraph, with the contained reads flagged but not yet deleted.
+
+    Raises:
+        ValueError: the engine name is not registered or the seed length is invalid.
+        OSError: the cache cannot be written.
+    """
+    edges = iter_overlaps(strands, engine, min_overlap, k, workers, cache=cache, profiler=profiler,
+                          both_strands=both_strands)
+    if both_strands:
+        return OrientedOverlapGraph.from_edges(strands, edges, twins=not get_engine(engine).exact)
+    return OverlapGraph.from_edges(strands, edges)
+
+
+class OverlapLookup:
+    """
+    Hands the overlaps computed by the overlap stage to the layout and assembly stages. Overlaps are read from the
+    graph; pairs the graph does not hold (e.g. below the minimum overlap) are computed with the engine and memoized in
+    an LRU cache of cache_size pairs, so memory stays bounded however many pairs are looked up.
+    """
+
+    def __init__(self, graph, strands, engine=None, cache_size=OVERLAP_CACHE_SIZE):
+        """
+        Args:
+            graph - the OverlapGraph of the reads.
+            strands - a dictionary mapping the sequence number to the DNA fragment.
+            engine - the overlap engine (name or instance) for pairs missing from the graph.
+            cache_size - the amount of computed pairs to remember.
+        """
+        self.graph = graph
+        self.strands = strands
+        self.engine = get_engine(engine)
+        self.compute = lru_cache(maxsize=cache_size)(self._compute)
+
+    def _compute(self, left, right):
+        return self.engine(self.strands[left], self.strands[right])
+
+    def __call__(self, left, right):
+        return self.graph.overlap(left, right) or self.compute(left, right)
@@ -0,0 +1,133 @@
+"""
+Instrumentation of the assembly pipeline.
+
+A Profiler records the wall time of every stage of the pipeline and the peak resident set size of the process at the
+end of it, along with named counters (e.g. pairs evaluated, contained reads dropped) and histograms (e.g. overlap
+lengths). Hooks registered with add_hook() are called when a stage starts, progresses and ends, so callers can follow
+the pipeline without parsing its log. report() returns everything as a JSON-serializable dictionary and write() saves it.
+"""
+
+import json
+import logging
+import platform
+import resource
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+
+def peak_rss():
+    """Returns the peak resident set size of the current process, in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak if platform.system() == 'Darwin' else peak * 1024
+
+
+class Profiler:
+    """
+    Per-stage timers, counters and histograms of an assembly run.
+
+    A hook is called as hook(event, stage, profiler), event being 'start', 'progress' or 'end'. On 'progress',
+    profiler.progress holds the (done, total) units of work of the stage. An exception raised by a hook propagates out
+    of the stage, which lets a hook stop the pipeline.
+    """
+
+    def __init__(self, hooks=()):
+        """
+        Args:
+            hooks - the hooks to call on stage events.
+        """
+        self.stages = dict()
+        self.counters = Counter()
+        self.histograms = dict()
+        self.hooks = list(hooks)
+        self.current = None
+        self.progress = None
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def _notify(self, event, name):
+        for hook in self.hooks:
+            hook(event, name, self)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times a stage of the pipeline. A stage entered several times accumulates its time.
+
+        Args:
+            name - the name of the stage.
+
+        Returns:
+            A context manager.
+
+        Raises:
+            Whatever a hook raises.
+        """
+        outer = self.current
+        self.current, self.progress = name, None
+        self._notify('start', name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current = outer
+            seconds = time.perf_counter() - start
+            record = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'peak_rss': 0})
+            record['seconds'] += seconds
+            record['calls'] += 1
+            record['peak_rss'] = peak_rss()
+            log.info("%s: %.3f s, peak RSS %.1f MB", name, seconds, record['peak_rss'] / 1e6)
+        self._notify('end', name)
+
+    def advance(self, done, total):
+        """Reports the progress of the current stage, in units of work."""
+        self.progress = (done, total)
+        self._notify('progress', self.current)
+
+    def count(self, name, amount=1):
+        """Adds to a counter."""
+        self.counters[name] += amount
+
+    def observe(self, name, values):
+        """Adds values to a histogram, counting every distinct value."""
+        self.histograms.setdefault(name, Counter()).update(values)
+
+    @property
+    def seconds(self):
+        return sum(record['seconds'] for record in self.stages.values())
+
+    def report(self):
+        """
+        Collects the measurements.
+
+        Returns:
+            A dictionary with the stages (seconds, calls and peak RSS of each), the total seconds, the peak RSS, the
+            counters and the histograms (value to count, in value order).
+
+        Raises:
+            NONE
+        """
+        return {'stages': {name: dict(record) for name, record in self.stages.items()}, 'seconds': self.seconds,
+                'peak_rss': peak_rss(), 'counters': dict(self.counters),
+                'histograms': {name: {str(value): histogram[value] for value in sorted(histogram)}
+                               for name, histogram in self.histograms.items()}}
+
+    def write(self, filename):
+        """
+        Writes the report as JSON.
+
+        Args:
+            filename - the name of the report file.
+
+        Returns:
+            NONE
+
+        Raises:
+            OSError: the file cannot be written.
+        """
+        with open(filename, 'w') as f:
+            json.dump(self.report(), f, indent=2)
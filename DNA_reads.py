@@ -0,0 +1,478 @@
+"""
+Streaming read input and compact read storage.
+
+iter_reads() yields reads lazily from FASTA, FASTQ or the "<sequence #> <sequence>" .txt format, plain or gzip
+compressed. PackedReads stores them at 2 bits per base in one bytearray, with an offsets index, and decodes a read only
+when it is accessed. The runs of other characters (N, IUPAC codes, bases of the other case) are kept aside and restored
+on decoding. OrientedReads presents both strands of a read set, reverse complementing reads on access.
+"""
+
+import gzip
+import re
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+
+_ENCODE = bytearray(256)
+for _code, _bases in enumerate((b'Aa', b'Cc', b'Gg', b'Tt')):
+    for _base in _bases:
+        _ENCODE[_base] = _code
+_ENCODE = bytes(_ENCODE)
+_DECODE = {False: bytes(b'ACGT' + bytes(252)), True: bytes(b'acgt' + bytes(252))}
+# The characters a store cannot pack, by lowercase.
+_EXCEPTIONS = {False: re.compile('[^ACGT]+'), True: re.compile('[^acgt]+')}
+_COMPLEMENT = str.maketrans('ACGTNacgtn', 'TGCANtgcan')
+
+STRANDS = ('+', '-')
+
+
+def open_reads(filename):
+    """
+    Opens a reads file for reading as text, decompressing it on the fly when it is gzip compressed.
+
+    Args:
+        filename - the name of the reads file.
+
+    Returns:
+        A text file object.
+
+    Raises:
+        OSError: the file cannot be opened.
+    """
+    with open(filename, 'rb') as f:
+        magic = f.read(2)
+    if magic == b'\x1f\x8b':
+        return gzip.open(filename, 'rt')
+    return open(filename, 'r')
+
+
+def iter_fasta(lines):
+    """
+    Parses FASTA records, whose sequence may span several lines.
+
+    Args:
+        lines - an iterable of text lines.
+
+    Returns:
+        A generator of (name, sequence) tuples.
+
+    Raises:
+        ValueError: a sequence line appears before the first header.
+    """
+    name = None
+    parts = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('>'):
+            if name is not None:
+                yield name, ''.join(parts)
+            name = line[1:].split(None, 1)[0] if len(line) > 1 else ''
+            parts = []
+        elif name is None:
+            raise ValueError("FASTA sequence before the first header")
+        else:
+            parts.append(line)
+    if name is not None:
+        yield name, ''.join(parts)
+
+
+def iter_fastq(lines):
+    """
+    Parses four-line FASTQ records. The qualities are checked for length and dropped.
+
+    Args:
+        lines - an iterable of text lines.
+
+    Returns:
+        A generator of (name, sequence) tuples.
+
+    Raises:
+        ValueError: a record is truncated or malformed.
+    """
+    lines = (line.strip() for line in lines)
+    for header in lines:
+        if not header:
+            continue
+        try:
+            sequence, separator, quality = next(lines), next(lines), next(lines)
+        except StopIteration:
+            raise ValueError("Truncated FASTQ record: {}".format(header)) from None
+        if not header.startswith('@') or not separator.startswith('+') or len(quality) != len(sequence):
+            raise ValueError("Malformed FASTQ record: {}".format(header))
+        yield header[1:].split(None, 1)[0] if len(header) > 1 else '', sequence
+
+
+def iter_numbered(lines):
+    """
+    Parses the .txt format of the assembler: sequence #, (space), sequence, (newline).
+
+    Args:
+        lines - an iterable of text lines.
+
+    Returns:
+        A generator of (sequence #, sequence) tuples.
+
+    Raises:
+        ValueError: a line is not in the expected format.
+    """
+    for line in lines:
+        if line.strip():
+            (key, val) = line.split()
+            yield int(key), val
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def iter_reads(filename):
+    """
+    Streams the reads of a FASTA, FASTQ or numbered .txt file, plain or gzip compressed. The format is detected from
+    the first character of the file.
+
+    Args:
+        filename - the name of the reads file.
+
+    Returns:
+        A generator of (name, sequence) tuples. Names are ints for the numbered .txt format.
+
+    Raises:
+        OSError: the file cannot be read.
+        ValueError: the file is not in a supported format.
+    """
+    with open_reads(filename) as f:
+        first = ''
+        for first in f:
+            if first.strip():
+                break
+        lines = _chain(first, f)
+        marker = first.lstrip()[:1]
+        if marker == '>':
+            yield from iter_fasta(lines)
+        elif marker == '@':
+            yield from iter_fastq(lines)
+        elif marker:
+            yield from iter_numbered(lines)
+
+
+def pack_bases(sequence):
+    """
+    Packs a sequence at 2 bits per base, 4 bases per byte with the first base in the low bits. Bases other than
+    A, C, G and T are stored as A.
+
+    Args:
+        sequence - the sequence to pack.
+
+    Returns:
+        The packed bytes, (len(sequence) + 3) // 4 long.
+
+    Raises:
+        NONE
+    """
+    codes = sequence.encode('ascii', 'replace').translate(_ENCODE)
+    codes += bytes(-len(codes) % 4)
+    # Every byte of the four strides holds a 2-bit code, so they can be shifted into place as big integers.
+    packed = (int.from_bytes(codes[0::4], 'little') | int.from_bytes(codes[1::4], 'little') << 2 |
+              int.from_bytes(codes[2::4], 'little') << 4 | int.from_bytes(codes[3::4], 'little') << 6)
+    return packed.to_bytes(len(codes) // 4, 'little')
+
+
+def unpack_bases(packed, length, lowercase=False):
+    """
+    Unpacks a sequence packed by pack_bases().
+
+    Args:
+        packed - the packed bytes.
+        length - the amount of bases to unpack.
+        lowercase - whether to return lowercase bases.
+
+    Returns:
+        The sequence.
+
+    Raises:
+        NONE
+    """
+    size = len(packed)
+    value = int.from_bytes(packed, 'little')
+    mask = int.from_bytes(b'\x03' * size, 'little')
+    codes = bytearray(4 * size)
+    for shift in range(4):
+        codes[shift::4] = ((value >> (2 * shift)) & mask).to_bytes(size, 'little')
+    return codes[:length].translate(_DECODE[lowercase]).decode('ascii')
+
+
+class PackedReads(Mapping):
+    """
+    A read set stored at 2 bits per base. It behaves as a read-only dictionary mapping the sequence numbers 1..n to the
+    reads, so it can be handed to the assembly functions in place of the dictionary built by read_reads(). A store
+    made by subset() keeps the sequence numbers of the reads it was selected from, in ascending order.
+
+    Characters the store does not pack, i.e. other than A, C, G and T in the case of the store, are packed as A and
+    kept as exceptions: the runs of such characters of every read, which are put back when the read is decoded.
+    """
+
+    def __init__(self, lowercase=False):
+        """
+        Args:
+            lowercase - whether reads are decoded as lowercase bases.
+        """
+        self.lowercase = lowercase
+        self.data = bytearray()
+        self.offsets = array('q', [0])
+        self.lengths = array('i')
+        self.numbers = None
+        self.exceptions = dict()
+
+    def append(self, sequence):
+        """
+        Adds a read to the store.
+
+        Args:
+            sequence - the read.
+
+        Returns:
+            The sequence number of the read.
+
+        Raises:
+            NONE
+        """
+        runs = tuple((match.start(), match.group()) for match in _EXCEPTIONS[self.lowercase].finditer(sequence))
+        if runs:
+            self.exceptions[len(self.lengths)] = runs
+        self.data += pack_bases(sequence)
+        self.offsets.append(len(self.data))
+        self.lengths.append(len(sequence))
+        if self.numbers is None:
+            return len(self.lengths)
+        self.numbers.append(self.numbers[-1] + 1 if self.numbers else 1)
+        return self.numbers[-1]
+
+    @classmethod
+    def from_buffers(cls, data, offsets, lengths, lowercase=False, exceptions=None):
+        """
+        Wraps existing buffers, e.g. views on shared memory, without copying them.
+
+        Args:
+            data - the packed bases.
+            offsets - the byte offset of every read in data, plus the end offset.
+            lengths - the length in bases of every read.
+            lowercase - whether reads are decoded as lowercase bases.
+            exceptions - the exceptions of the reads, by 0-based read number, or None when there are none.
+
+        Returns:
+            The PackedReads.
+
+        Raises:
+            NONE
+        """
+        store = cls(lowercase)
+        store.data, store.offsets, store.lengths = data, offsets, lengths
+        if exceptions:
+            store.exceptions = exceptions
+        return store
+
+    def extend(self, sequences):
+        for sequence in sequences:
+            self.append(sequence)
+
+    def subset(self, keys):
+        """
+        Copies the given reads, still packed, into a new store that keeps their sequence numbers.
+
+        Args:
+            keys - the sequence numbers of the reads to keep.
+
+        Returns:
+            The new PackedReads.
+
+        Raises:
+            KeyError: a key is not part of the store.
+        """
+        store = PackedReads(self.lowercase)
+        store.numbers = array('q')
+        for key in sorted(keys):
+            number = self._number(key)
+            if number in self.exceptions:
+                store.exceptions[len(store.lengths)] = self.exceptions[number]
+            store.data += self.data[self.offsets[number]:self.offsets[number + 1]]
+            store.offsets.append(len(store.data))
+            store.lengths.append(self.lengths[number])
+            store.numbers.append(key)
+        return store
+
+    def _number(self, key):
+        """Returns the 0-based read number of a sequence number."""
+        if isinstance(key, int):
+            if self.numbers is None:
+                if 0 < key <= len(self.lengths):
+                    return key - 1
+            else:
+                number = bisect_left(self.numbers, key)
+                if number < len(self.numbers) and self.numbers[number] == key:
+                    return number
+        raise KeyError(key)
+
+    def sequence(self, number):
+        """Decodes the read with the given 0-based read number."""
+        sequence = unpack_bases(self.data[self.offsets[number]:self.offsets[number + 1]], self.lengths[number],
+                                self.lowercase)
+        runs = self.exceptions.get(number)
+        if runs is None:
+            return sequence
+        parts = []
+        end = 0
+        for start, characters in runs:
+            parts.append(sequence[end:start])
+            parts.append(characters)
+            end = start + len(characters)
+        parts.append(sequence[end:])
+        return ''.join(parts)
+
+    def numbered(self):
+        """Returns a lazy sequence of the reads indexed by 0-based read number."""
+        return _NumberedReads(self)
+
+    def length(self, key):
+        return self.lengths[self._number(key)]
+
+    def __getitem__(self, key):
+        return self.sequence(self._number(key))
+
+    def __iter__(self):
+        if self.numbers is None:
+            return iter(range(1, len(self.lengths) + 1))
+        return iter(self.numbers)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __contains__(self, key):
+        try:
+            self._number(key)
+        except KeyError:
+            return False
+        return True
+
+    @property
+    def nbytes(self):
+        """The size in bytes of the packed bases and the index, and the characters of the exceptions."""
+        return (len(self.data) + self.offsets.itemsize * len(self.offsets) +
+                self.lengths.itemsize * len(self.lengths) +
+                (0 if self.numbers is None else self.numbers.itemsize * len(self.numbers)) +
+                sum(len(characters) for runs in self.exceptions.values() for _, characters in runs))
+
+
+class _NumberedReads(Sequence):
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, number):
+        if not 0 <= number < len(self.store):
+            raise IndexError(number)
+        return self.store.sequence(number)
+
+    def __len__(self):
+        return len(self.store)
+
+
+def reverse_complement(sequence):
+    """Returns the reverse complement of a sequence. Characters other than A, C, G, T and N are kept as they are."""
+    return sequence.translate(_COMPLEMENT)[::-1]
+
+
+class OrientedReads(Mapping):
+    """
+    Both strands of a read set: a read-only dictionary mapping (key, '+') to a read and (key, '-') to its reverse
+    complement, which is computed on access. Oriented keys come in read order, the forward strand first, so oriented
+    read number 2 * i + s is strand s of read i and oriented read number n ^ 1 is the other strand of read n.
+    """
+
+    def __init__(self, strands):
+        """
+        Args:
+            strands - a dictionary mapping the sequence number to the DNA fragment, or a PackedReads.
+        """
+        self.strands = strands
+
+    def __getitem__(self, key):
+        read, strand = key
+        if strand not in STRANDS:
+            raise KeyError(key)
+        sequence = self.strands[read]
+        return sequence if strand == '+' else reverse_complement(sequence)
+
+    def __iter__(self):
+        for key in self.strands:
+            for strand in STRANDS:
+                yield key, strand
+
+    def __len__(self):
+        return 2 * len(self.strands)
+
+
+class OrientedSequences(Sequence):
+    """Both strands of reads indexed by read number: item 2 * i + s is strand s of read i, see OrientedReads."""
+
+    def __init__(self, sequences):
+        """
+        Args:
+            sequences - the reads indexed by 0-based read number.
+        """
+        self.sequences = sequences
+
+    def __getitem__(self, number):
+        if not 0 <= number < len(self):
+            raise IndexError(number)
+        sequence = self.sequences[number >> 1]
+        return reverse_complement(sequence) if number & 1 else sequence
+
+    def __len__(self):
+        return 2 * len(self.sequences)
+
+
+def select_reads(strands, keys):
+    """
+    Selects some of the reads, keeping their sequence numbers. Packed stores stay packed.
+
+    Args:
+        strands - a dictionary mapping the sequence number to the DNA fragment, or a PackedReads.
+        keys - the sequence numbers of the reads to keep.
+
+    Returns:
+        The selected reads, of the same kind as strands.
+
+    Raises:
+        KeyError: a key is not part of strands.
+    """
+    if isinstance(strands, PackedReads):
+        return strands.subset(keys)
+    return {key: strands[key] for key in keys}
+
+
+def load_reads(filename, lowercase=None):
+    """
+    Streams a reads file into a PackedReads store. The names of the reads are dropped; reads are numbered from 1 in
+    file order.
+
+    Args:
+        filename - the name of the reads file, see iter_reads().
+        lowercase - whether reads are decoded as lowercase bases, detected from the first read by default.
+
+    Returns:
+        store - the PackedReads.
+
+    Raises:
+        OSError: the file cannot be read.
+        ValueError: the file is empty or not in a supported format.
+    """
+    store = None
+    for name, sequence in iter_reads(filename):
+        if store is None:
+            store = PackedReads(sequence.islower() if lowercase is None else lowercase)
+        store.append(sequence)
+    if store is None:
+        raise ValueError("File is empty")
+    return store
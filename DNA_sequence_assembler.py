@@ -1,144 +1,64 @@
-from tkinter import *
-from tkinter import filedialog
-from tkinter import messagebox
-import os
-
-MAX_NUCLEOTIDES = 5000
-NOFILE = 2
+"""
+DNA sequence assembler.
 
-filename = ''
-reads = dict() 
-assembled_reads = ""
-issequencesaved = NOFILE
+The assembly pipeline can be imported without side effects, or run headless:
 
-root = Tk()
-root.resizable(0, 0)
+    python -m DNA_sequence_assembler reads.fastq.gz -o assembled.txt [--min-overlap 10] [--workers 4] [--cache DIR]
+    python -m DNA_sequence_assembler reads.fastq.gz -o assembled.txt --mode de-bruijn [--kmer 31] [--min-count 2]
+    python -m DNA_sequence_assembler batch.fastq.gz -o assembled.txt --incremental state.pickle
+    python -m DNA_sequence_assembler reads.fastq.gz -o contigs.fa.gz [--line-width 60] [--compression bgzip]
+    python -m DNA_sequence_assembler reads.fastq.gz -o assembled.txt --both-strands
 
+Reads can be given as FASTA, FASTQ or the numbered .txt format, plain or gzip compressed. Contigs are written one per
+line, or as indexed multi-FASTA when the output file has a FASTA extension (see DNA_fasta).
 
-def read_data():
-    """
-    Reads DNA fragments into a dictionary, in where the sequence number is the key, and the DNA fragment is the value.
-    
-    Args:
-        NONE
-
-    Returns:
-        filename - The name of the input file.
-
-    Raises:
-        KeyError: Raises an exception.
-    """
-    global filename
-    global issequencesaved
-
-    filename = filedialog.askopenfilename()
-    try:
-        if filename.endswith('.txt'):
-            if os.stat(filename).st_size == 0:
-                filename = ''
-                issequencesaved = NOFILE
-                messagebox.showerror("Error Message", "File is empty")
-            else:
-                with open(filename, 'r') as f:
-                    for line in f:
-                        (key, val) = line.split()
-                        reads[int(key)] = val
-
-        elif not filename:
-            pass
-        elif filename.endswith('.txt'):
-            filename = ''
-            issequencesaved = NOFILE
-            messagebox.showerror("Error Message", "Incorrect file extension")
-
-    except Exception:
-        filename = ''
-        issequencesaved = NOFILE
-        messagebox.showerror("Error Message", "Incorrect file format or file does not exist")
-
-    return filename
-
-
-def save_sequence():
-    """
-      Saves the assembled sequence to a designated location.
-      
-      Args:
-          NONE
+Run without an input file to open the GUI (DNA_assembler_gui).
+"""
 
-      Returns:
-          NONE
+import argparse
+import logging
+import os
+import sys
 
-      Raises:
-          KeyError: Raises an exception.
-     """
-    global filename
-    global issequencesaved
+from DNA_de_bruijn import DEFAULT_K, MIN_COUNT, assemble_de_bruijn
+from DNA_fasta import COMPRESSIONS, LINE_WIDTH, is_fasta, write_contigs
+from DNA_incremental import IncrementalAssembly, load_assembly
+from DNA_overlap import ERROR_RATE, OVERLAP_ENGINES, MyersEngine, get_overlap, remove_contained_reads
+from DNA_overlap_graph import OverlapLookup, get_overlap_graph
+from DNA_profile import Profiler
+from DNA_reads import OrientedReads, load_reads, select_reads
 
-    if filename == '':
-        messagebox.showerror("Error Message", "No import file")
-    elif issequencesaved == False:
-        f = filedialog.asksaveasfile(mode='w', defaultextension=".txt")
-        if f is None:
-            return
-        f.write(assembled_reads)
-        f.close()
-        issequencesaved = True
-    else:
-        messagebox.showerror("Error Message", "No assembled sequence")
+MIN_OVERLAP = 10
+ASSEMBLY_MODES = ('overlap', 'de-bruijn')
 
+log = logging.getLogger(__name__)
 
 
-def get_overlap(left, right):
+def read_reads(filename):
     """
-      Gets the amount of nucleotides by which the right read overlaps the left read.
-      
-      Args:
-          left - the left read.
-          right - the right read.
-    
-      Returns:
-         len(left[i:]) -  The amount by which the right strand overlaps the left strand.
-         sys.maxsize - Python's max int value. Indicates that the right strand is a useless or insignificant read.
-         0 - Indicates no overlap.
+    Reads DNA fragments into a dictionary, in where the sequence number is the key, and the DNA fragment is the value.
+    The file is in the format of: sequence #, (space), sequence, (newline).
 
-      Raises:
-          KeyError: Raises an exception.
-      """
-    right_strand = right
-    for i in range(len(left)):
-        if left[i:] == right[:len(left)-i]:
-            return len(left[i:])
-        elif left[i:i+len(right_strand)] == right_strand:
-            return sys.maxsize
-    return 0
+    Args:
+        filename - The name of the input file.
 
+    Returns:
+        reads - a dictionary mapping the sequence number to the DNA fragment.
 
-def get_all_overlaps(strands, useless_reads):
+    Raises:
+        OSError: the file cannot be read.
+        ValueError: the file is empty or a line is not in the expected format.
     """
-      Creates an overlap matrix (essentially a 2D dictionary) containing all the overlap combinations.
-      
-      Args:
-          strands - The dictionary of strands created in read_data()
-          useless_reads - Insignificant reads marked by sys.maxsize in get_overlap()
-    
-      Returns:
-          overlap_matrix - a 2D dictionary containing all overlap combinations.
-
-      Raises:
-          KeyError: Raises an exception.
-      """
-    overlap_matrix = dict()
-    for key1, sequence1 in strands.items():
-        for key2, sequence2 in strands.items():
-            if key1 == key2:
+    reads = dict()
+    with open(filename, 'r') as f:
+        for line in f:
+            if not line.strip():
                 continue
-            if key1 not in overlap_matrix:
-                overlap_matrix[key1] = dict()
-            overlap_matrix[key1][key2] = get_overlap(sequence1, sequence2)
-            if overlap_matrix[key1][key2] == sys.maxsize:
-                useless_reads.append(key2)
-    return overlap_matrix
+            (key, val) = line.split()
+            reads[int(key)] = val
+    if not reads:
+        raise ValueError("File is empty")
+    return reads
 
 
 def delete_useless_reads(overlap_matrix, useless_reads):
@@ -158,7 +78,7 @@ def delete_useless_reads(overlap_matrix, useless_reads):
     for junk in useless_reads:
         del overlap_matrix[junk]
         for key in overlap_matrix:
-            del overlap_matrix[key][junk]
+            overlap_matrix[key].pop(junk, None)
 
 
 def find_first_read(overlap_matrix):
@@ -176,12 +96,9 @@ def find_first_read(overlap_matrix):
           KeyError: Raises an exception.
       """
     templist = dict()
-    sum_overlaps = 0
     for i in overlap_matrix:
-        for j in overlap_matrix[i]:
-            sum_overlaps += overlap_matrix[j][i]
-        templist[i] = sum_overlaps
-    print("Templist = ", templist)
+        templist[i] = sum(overlap_matrix[j].get(i, 0) for j in overlap_matrix if j != i)
+    log.debug("Templist = %s", templist)
     return min(templist, key=templist.get)
 
 
@@ -222,25 +139,25 @@ def find_order(first_read, overlap_matrix):
       Raises:
           KeyError: Raises an exception.
       """
-    order = []
-    for i in range(0, len(overlap_matrix)):
-        if i == 0:
-            order.append(first_read)
-        elif i == 1:
-            next_read = find_next_read(overlap_matrix[first_read])
-            order.append(next_read)
-        else:
-            next_read = find_next_read(overlap_matrix[next_read])
-            order.append(next_read)
+    order = [first_read]
+    visited = {first_read}
+    next_read = find_next_read(overlap_matrix[first_read])
+    while next_read in overlap_matrix and next_read not in visited:
+        order.append(next_read)
+        visited.add(next_read)
+        next_read = find_next_read(overlap_matrix[next_read])
     return order
 
 
-def assemble_reads(read_order):
+def assemble_reads(read_order, reads, overlap=None):
     """
       Assembles the reads using the order of reads provided by find_order()
       
       Args:
           read_order - A list containing the order of assembly.
+          reads - a dictionary mapping the sequence number to the DNA fragment.
+          overlap - a function (left key, right key) returning the overlap of two reads, such as an OverlapLookup.
+                    The overlaps are recomputed with get_overlap() by default.
     
       Returns:
           assembled_reads - the assembled genome/sequence.
@@ -248,244 +165,290 @@ def assemble_reads(read_order):
       Raises:
           KeyError: Raises an exception.
       """
-    global assembled_reads
+    if not read_order:
+        return ""
+    if overlap is None:
+        overlap = lambda left, right: get_overlap(reads[left], reads[right])
+    parts = [reads[read_order[0]]]
     for i in range(0, (len(read_order) - 1)):
-        if i == 0:
-            assembled_reads = reads[read_order[i]]
-        lap = get_overlap(reads[read_order[i]], reads[read_order[i + 1]])
-        temp = reads[read_order[i + 1]][lap:]
-        assembled_reads += temp
-    return assembled_reads
+        lap = overlap(read_order[i], read_order[i + 1])
+        parts.append(reads[read_order[i + 1]][lap:])
+    return "".join(parts)
 
 
-def run_assembly():
+def run_assembly(reads, min_overlap=MIN_OVERLAP, engine=None, workers=1, mode='overlap', k=DEFAULT_K,
+                 min_count=MIN_COUNT, cache=None, profiler=None, both_strands=False):
     """
       Runs the assembly by utilizing required functions.
       
       Args:
-          NONE
+          reads - a dictionary mapping the sequence number to the DNA fragment.
+          min_overlap - the smallest overlap between two reads, see get_overlap_graph().
+          engine - the overlap engine (name or instance) to use.
+          workers - the amount of worker processes for the overlap stage.
+          mode - 'overlap' for overlap-layout over read pairs, or 'de-bruijn' for a de Bruijn graph of k-mers, which
+                 suits high-coverage short reads, see assemble_de_bruijn().
+          k - the k-mer length of the de-bruijn mode.
+          min_count - the smallest k-mer count kept by the de-bruijn mode.
+          cache - a directory caching the overlap stage, so reruns on the same reads and parameters skip it and
+                  interrupted runs resume from their last checkpointed block. None to not cache.
+          profiler - a DNA_profile.Profiler recording the time and peak memory of every stage, the pairs evaluated,
+                     the contained reads dropped and the overlap lengths. Its hooks are called as stages start and
+                     end. None to not keep the measurements.
+          both_strands - whether reads may come from either strand of the DNA: reads are also overlapped with the
+                         reverse complement of the others, and reads laid out on the other strand are reverse
+                         complemented in the contigs, see OrientedOverlapGraph. Overlap mode only.
     
       Returns:
-          assembled_reads - the assembled genome/sequence.
+          contigs - the assembled sequences, one per contig, longest first.
     
       Raises:
-          KeyError: Raises an exception.
+          ValueError: there are no reads to assemble, or the mode is unknown.
       """
-
-    if filename != '':
-        useless_reads = []
-
-        matrix_of_overlaps = (get_all_overlaps(reads, useless_reads))
-
-        useless_reads = list(set(useless_reads))
-        useless_reads.sort()
-
-        delete_useless_reads(matrix_of_overlaps, useless_reads)
-
-        print("X = ", useless_reads)
-
-        print("MODIFIED OVERLAPS = ", matrix_of_overlaps)
-
-        first = (find_first_read(matrix_of_overlaps))
-        print("FIRST = ", first)
-
-        order = find_order(first, matrix_of_overlaps)
-        print("ORDER = ", order)
-
-        global assembled_reads
-        assembled_reads = "".join(assemble_reads(order))
-        print("ASSEMBLED = ", assembled_reads)
-
-        global issequencesaved
-        issequencesaved = False
-
-        # REFERENCE = atgagccaagttccgaacaaggattcgcggggaggatagatcagcgcccgagaggggtgagtcggtaaagagcattggaacgtcggagatacaactcccaagaaggaaaaaagagaaagcaagaagcggatgaatttccccataacgccagtgaaactctaggaaggggaaagagggaaggtggaagagaaggaggcgggcctcccgatccgaggggcccggcggccaagtttggaggacactccggcccgaagggttgagagtaccccagagggaggaagccacacggagtagaacagagaaatcacctccagaggaccccttcagcgaacagagagcgcatcgcgagagggagtagaccatagcgataggaggggatgctaggagttgggggagaccgaagcgaggaggaaagcaaagagagcagcggggctagcaggtgggtgttccgccccccgagaggggacgagtgaggcttatcccggggaactcgacttatcgtccccacatagcagactcccggaccccctttcaaagtgaccgaggggggtgactttgaacattggggaccagtggagccatgggatgctcctcccgattccgcccaagctccttccccccaagggtcgcccaggaatggcgggaccccactctgcagggtccgcgttccatcctttcttacctgatggccggcatggtcccagcctcctcgctggcgccggctgggcaacattccgaggggaccgtcccctcggtaatggcgaatgggacccacaaatctctctagcttcccagagagaagcgagagaaaagtggctctcccttagccatccgagtggacgtgcgtcctccttcggatgcccaggtcggaccgcgaggaggtggagatgccatgccgacccgaagaggaaagaaggacgcgagacgcaaacctgcgagtggaaacccgctttattcactggggtcgacaactctggggagaggagggagggtcggctgggaagagtatatcctatgggaatccctggcttccccttatgtccagtccctccccggtccgagtaaagggggactccgggactccttgcatgctggggacgaagccgcccccgggcgctcccctcgttccaccttcgagggggttcacacccccaacctgcgggccggctattcttctttcccttctctcgtcttcctcggtcaacctcctaagttcctcttcctcctccttgctgaggttctttccccccgccgatagctgctttctcttgttctcgagggccttccttcgtcggtgatcctgcctctccttgtcggtgaatcctcccctggaaggcctcttcctaggtccggagtctacttccatctggtccgttcgggccctcttcgccgggggagccccctctccatccttatctttctttccgagaattcctttgatgtttcccagccagggatgttcatcctcaagtttcttgattttcttcttaaccttccggaggtctctctcgagttcctctaacttctttcttccgctcacccactgctcgagaacctcttctctccccccgcggtttttccttccttcgggccggctcatcttcgactagaggcgacggtcctcagtactcttactcttttctgtaaagaggagactgctggccctgtcgcccaagttcgag
-        # ASSEMBLED = atgagccaagttccgaacaaggattcgcggggaggatagatcagcgcccgagaggggtgagtcggtaaagagcattggaacgtcggagatacaactcccaagaaggaaaaaagagaaagcaagaagcggatgaatttccccataacgccagtgaaactctaggaaggggaaagagggaaggtggaagagaaggaggcgggcctcccgatccgaggggcccggcggccaagtttggaggacactccggcccgaagggttgagagtaccccagagggaggaagccacacggagtagaacagagaaatcacctccagaggaccccttcagcgaacagagagcgcatcgcgagagggagtagaccatagcgataggaggggatgctaggagttgggggagaccgaagcgaggaggaaagcaaagagagcagcggggctagcaggtgggtgttccgccccccgagaggggacgagtgaggcttatcccggggaactcgacttatcgtccccacatagcagactcccggaccccctttcaaagtgaccgaggggggtgactttgaacattggggaccagtggagccatgggatgctcctcccgattccgcccaagctccttccccccaagggtcgcccaggaatggcgggaccccactctgcagggtccgcgttccatcctttcttacctgatggccggcatggtcccagcctcctcgctggcgccggctgggcaacattccgaggggaccgtcccctcggtaatggcgaatgggacccacaaatctctctagcttcccagagagaagcgagagaaaagtggctctcccttagccatccgagtggacgtgcgtcctccttcggatgcccaggtcggaccgcgaggaggtggagatgccatgccgacccgaagaggaaagaaggacgcgagacgcaaacctgcgagtggaaacccgctttattcactggggtcgacaactctggggagaggagggagggtcggctgggaagagtatatcctatgggaatccctggcttccccttatgtccagtccctccccggtccgagtaaagggggactccgggactccttgcatgctggggacgaagccgcccccgggcgctcccctcgttccaccttcgagggggttcacacccccaacctgcgggccggctattcttctttcccttctctcgtcttcctcggtcaacctcctaagttcctcttcctcctccttgctgaggttctttccccccgccgatagctgctttctcttgttctcgagggccttccttcgtcggtgatcctgcctctccttgtcggtgaatcctcccctggaaggcctcttcctaggtccggagtctacttccatctggtccgttcgggccctcttcgccgggggagccccctctccatccttatctttctttccgagaattcctttgatgtttcccagccagggatgttcatcctcaagtttcttgattttcttcttaaccttccggaggtctctctcgagttcctctaacttctttcttccgctcacccactgctcgagaacctcttctctccccccgcggtttttccttccttcgggccggctcatcttcgactagaggcgacggtcctcagtactcttactcttttctgtaaagaggagactgctggccctgtcgcccaagttcgag
-
-    else:
-        messagebox.showerror("Error Message", "No input file or incorrect file format")
-
-
-def instructions_page():
+    if not reads:
+        raise ValueError("No reads to assemble")
+    if mode not in ASSEMBLY_MODES:
+        raise ValueError("Unknown assembly mode: {}".format(mode))
+    if both_strands and mode != 'overlap':
+        raise ValueError("Both strands can only be assembled in overlap mode")
+
+    if profiler is None:
+        profiler = Profiler()
+    profiler.count('reads', len(reads))
+
+    if mode == 'de-bruijn':
+        contigs = assemble_de_bruijn(reads, k, min_count, profiler)
+        profiler.count('contigs', len(contigs))
+        log.info("%d contigs", len(contigs))
+        log.debug("ASSEMBLED = %s", contigs[0] if contigs else "")
+        return contigs
+
+    with profiler.stage('remove_contained_reads'):
+        maximal_reads, useless_reads = remove_contained_reads(reads, min_overlap or MIN_OVERLAP)
+
+    with profiler.stage('overlaps'):
+        graph_of_overlaps = get_overlap_graph(select_reads(reads, maximal_reads), engine=engine,
+                                              min_overlap=min_overlap, workers=workers, cache=cache, profiler=profiler,
+                                              both_strands=both_strands)
+
+    useless_reads += graph_of_overlaps.useless_reads()
+
+    with profiler.stage('delete_useless_reads'):
+        graph_of_overlaps.delete_useless_reads()
+
+    profiler.count('contained_reads', len(useless_reads))
+    profiler.count('overlaps', graph_of_overlaps.edge_count)
+    profiler.observe('overlap_length', graph_of_overlaps.edge_overlaps())
+    log.info("%d contained reads dropped", len(useless_reads))
+    log.debug("X = %s", useless_reads)
+    log.info("Overlap graph: %d reads, %d edges, %d bytes", len(graph_of_overlaps), graph_of_overlaps.edge_count,
+             graph_of_overlaps.nbytes)
+
+    with profiler.stage('layout'):
+        layout = graph_of_overlaps.greedy_layout()
+    log.debug("ORDER = %s", layout)
+
+    with profiler.stage('assemble_reads'):
+        # Layouts of both strands hold oriented keys, whose sequences are reverse complemented as needed.
+        sequences = OrientedReads(reads) if both_strands else reads
+        lookup = OverlapLookup(graph_of_overlaps, sequences, engine)
+        contigs = [assemble_reads(order, sequences, lookup) for order in layout]
+        contigs.sort(key=len, reverse=True)
+    profiler.count('contigs', len(contigs))
+    log.info("%d contigs, largest %d nucleotides", len(contigs), len(contigs[0]) if contigs else 0)
+    log.debug("ASSEMBLED = %s", contigs[0] if contigs else "")
+
+    # REFERENCE = atgagccaagttccgaacaaggattcgcggggaggatagatcagcgcccgagaggggtgagtcggtaaagagcattggaacgtcggagatacaactcccaagaaggaaaaaagagaaagcaagaagcggatgaatttccccataacgccagtgaaactctaggaaggggaaagagggaaggtggaagagaaggaggcgggcctcccgatccgaggggcccggcggccaagtttggaggacactccggcccgaagggttgagagtaccccagagggaggaagccacacggagtagaacagagaaatcacctccagaggaccccttcagcgaacagagagcgcatcgcgagagggagtagaccatagcgataggaggggatgctaggagttgggggagaccgaagcgaggaggaaagcaaagagagcagcggggctagcaggtgggtgttccgccccccgagaggggacgagtgaggcttatcccggggaactcgacttatcgtccccacatagcagactcccggaccccctttcaaagtgaccgaggggggtgactttgaacattggggaccagtggagccatgggatgctcctcccgattccgcccaagctccttccccccaagggtcgcccaggaatggcgggaccccactctgcagggtccgcgttccatcctttcttacctgatggccggcatggtcccagcctcctcgctggcgccggctgggcaacattccgaggggaccgtcccctcggtaatggcgaatgggacccacaaatctctctagcttcccagagagaagcgagagaaaagtggctctcccttagccatccgagtggacgtgcgtcctccttcggatgcccaggtcggaccgcgaggaggtggagatgccatgccgacccgaagaggaaagaaggacgcgagacgcaaacctgcgagtggaaacccgctttattcactggggtcgacaactctggggagaggagggagggtcggctgggaagagtatatcctatgggaatccctggcttccccttatgtccagtccctccccggtccgagtaaagggggactccgggactccttgcatgctggggacgaagccgcccccgggcgctcccctcgttccaccttcgagggggttcacacccccaacctgcgggccggctattcttctttcccttctctcgtcttcctcggtcaacctcctaagttcctcttcctcctccttgctgaggttctttccccccgccgatagctgctttctcttgttctcgagggccttccttcgtcggtgatcctgcctctccttgtcggtgaatcctcccctggaaggcctcttcctaggtccggagtctacttccatctggtccgttcgggccctcttcgccgggggagccccctctccatccttatctttctttccgagaattcctttgatgtttcccagccagggatgttcatcctcaagtttcttgattttcttcttaaccttccggaggtctctctcgagttcctctaacttctttcttccgctcacccactgctcgagaacctcttctctccccccgcggtttttccttccttcgggccggctcatcttcgactagaggcgacggtcctcagtactcttactcttttctgtaaagaggagactgctggccctgtcgcccaagttcgag
+    # ASSEMBLED = atgagccaagttccgaacaaggattcgcggggaggatagatcagcgcccgagaggggtgagtcggtaaagagcattggaacgtcggagatacaactcccaagaaggaaaaaagagaaagcaagaagcggatgaatttccccataacgccagtgaaactctaggaaggggaaagagggaaggtggaagagaaggaggcgggcctcccgatccgaggggcccggcggccaagtttggaggacactccggcccgaagggttgagagtaccccagagggaggaagccacacggagtagaacagagaaatcacctccagaggaccccttcagcgaacagagagcgcatcgcgagagggagtagaccatagcgataggaggggatgctaggagttgggggagaccgaagcgaggaggaaagcaaagagagcagcggggctagcaggtgggtgttccgccccccgagaggggacgagtgaggcttatcccggggaactcgacttatcgtccccacatagcagactcccggaccccctttcaaagtgaccgaggggggtgactttgaacattggggaccagtggagccatgggatgctcctcccgattccgcccaagctccttccccccaagggtcgcccaggaatggcgggaccccactctgcagggtccgcgttccatcctttcttacctgatggccggcatggtcccagcctcctcgctggcgccggctgggcaacattccgaggggaccgtcccctcggtaatggcgaatgggacccacaaatctctctagcttcccagagagaagcgagagaaaagtggctctcccttagccatccgagtggacgtgcgtcctccttcggatgcccaggtcggaccgcgaggaggtggagatgccatgccgacccgaagaggaaagaaggacgcgagacgcaaacctgcgagtggaaacccgctttattcactggggtcgacaactctggggagaggagggagggtcggctgggaagagtatatcctatgggaatccctggcttccccttatgtccagtccctccccggtccgagtaaagggggactccgggactccttgcatgctggggacgaagccgcccccgggcgctcccctcgttccaccttcgagggggttcacacccccaacctgcgggccggctattcttctttcccttctctcgtcttcctcggtcaacctcctaagttcctcttcctcctccttgctgaggttctttccccccgccgatagctgctttctcttgttctcgagggccttccttcgtcggtgatcctgcctctccttgtcggtgaatcctcccctggaaggcctcttcctaggtccggagtctacttccatctggtccgttcgggccctcttcgccgggggagccccctctccatccttatctttctttccgagaattcctttgatgtttcccagccagggatgttcatcctcaagtttcttgattttcttcttaaccttccggaggtctctctcgagttcctctaacttctttcttccgctcacccactgctcgagaacctcttctctccccccgcggtttttccttccttcgggccggctcatcttcgactagaggcgacggtcctcagtactcttactcttttctgtaaagaggagactgctggccctgtcgcccaagttcgag
+
+    return contigs
+
+
+def run_incremental(reads, state, min_overlap=MIN_OVERLAP, engine=None, profiler=None):
     """
-      Outputs instructions page upon 'Instructions' button being pressed.
-      
+      Adds a batch of reads to an incremental assembly saved in a state file, see DNA_incremental. Only the overlaps
+      involving the new reads are computed.
+
       Args:
-          NONE
-    
+          reads - a dictionary mapping the sequence number to the DNA fragment, or a PackedReads.
+          state - the state file, created when it does not exist yet.
+          min_overlap - the smallest overlap between two reads, only used when the state is created.
+          engine - the overlap engine (name or instance), only used when the state is created.
+          profiler - a DNA_profile.Profiler recording the stages, or None.
+
       Returns:
-          NONE
-    
+          contigs - the assembled sequences of every read added so far, one per contig, longest first.
+
       Raises:
-          KeyError: Raises an exception.
+          OSError: the state file cannot be read or written.
+          ValueError: the state file does not hold an assembly state.
       """
-    instructions = Toplevel()
-
-    instructions.title("Instructions")
-    # http://www.python-course.eu/tkinter_text_widget.php <-- to help with text
-    instructions.title = Message(instructions, text="Welcome to the DNA sequence assembler by Kevin Jian. "
-                                              "This program takes shogunned DNA strands in the form of "
-                                              "the nucleotide bases Cytosine(C), Guanine(G), Adenine(A), "
-                                              "and Thymine(T), and assembles them by looking for regions "
-                                              "of overlap. When you are ready, Import your file by "
-                                              "clicking file:Import on the top left of the main screen. "
-                                              "\nThe file must be a .txt and in the format of: sequence #, "
-                                              "(space), sequence, (newline).\n\n"
-                                              "Example of correct format:\n"
-                                              "1 ATCG\n2 ATGG\n3 AGGG\n"
-                                              "\nWhen everything is set, press 'Assemble'. If you wish to display "
-                                              "The sequence, press 'display' and you will be prompted to "
-                                              "input the amount of strands you wish to display, the max "
-                                              "number of strands is 5,000. After the sequence is assembled, "
-                                              "export the assembled sequence by clicking file:export.")
-
-    # Welcome to the DNA sequence assembler by Kevin Jian. This software takes shotgunned DNA strands in the form of the nucleotide bases Cytosine(C), Guanine(G), Adenine(A), and Thymine(T), and assembles them by looking for regions of overlap. When you are ready, Import your file by clicking file:Import on the top left of the main screen. Note: the format of the file is very specific. Each individual DNA sequence must be on its own line. When everything is set, press 'Assemble'.
-    instructions.title.pack()
-
-
-def display_pg():
+    if profiler is None:
+        profiler = Profiler()
+    with profiler.stage('load_state'):
+        if os.path.exists(state):
+            assembly = load_assembly(state)
+        else:
+            assembly = IncrementalAssembly(min_overlap, engine=engine)
+
+    with profiler.stage('add_reads'):
+        relaid = assembly.add_reads(reads.values())
+    with profiler.stage('save_state'):
+        assembly.save(state)
+    with profiler.stage('assemble_reads'):
+        contigs = assembly.contig_sequences()
+    profiler.count('reads', len(reads))
+    profiler.count('contigs_laid_out', relaid)
+    profiler.count('contigs', len(contigs))
+    log.info("Incremental assembly: %d reads, %d contigs, %d laid out again", len(assembly), len(contigs), relaid)
+    return contigs
+
+
+def write_output(filename, contigs, fasta=None, line_width=LINE_WIDTH, compression=None):
     """
-      Outputs assembly page upon the 'Assemble' button being pressed. The assembly page contains an input field and a
-      display button. The user, if they desire, has the option to input an x amount of nucleotides to be displayed,
-      with the maximum being 5000. Once the user presses the display button, x nucleotides is displayed on screen.
-      
+      Writes the assembled contigs to a file: as indexed multi-FASTA (see DNA_fasta.write_contigs()), or one contig per
+      line. The FASTA writer streams whatever iterable it is given, but the assembly only returns its contigs once they
+      are all laid out and sorted longest first, so every contig is held in memory until the output is written.
+
       Args:
-          NONE
-    
+          filename - the name of the output file.
+          contigs - the assembled sequences, longest first.
+          fasta - whether to write FASTA, guessed from the file name by default.
+          line_width - the amount of bases per line of FASTA output.
+          compression - the compression of FASTA output, see DNA_fasta.COMPRESSIONS. bgzip when the file name ends
+                        with .gz by default.
+
       Returns:
           NONE
-    
+
       Raises:
-          KeyError: Raises an exception.
+          OSError: the file cannot be written.
+          ValueError: the compression is unknown or the line width is not positive.
       """
+    if fasta is None:
+        fasta = is_fasta(filename)
+    if not fasta:
+        with open(filename, 'w') as f:
+            f.write("\n".join(contigs))
+        return
+    if compression is None and filename.lower().endswith('.gz'):
+        compression = 'bgzip'
+    write_contigs(filename, contigs, line_width, compression)
+
+
+def main(argv=None):
+    """
+    Command line entry point. Assembles the input file headless, or opens the GUI when no input file is given.
 
-    if filename != '' and issequencesaved != NOFILE:
-        # run_assembly()
-        #
-        # global issequencesaved
-        # issequencesaved = FILENOTSAVED
-
-        assemblypage = Toplevel()
-        assemblypage.resizable(0, 0)
-
-        assemblypage.L1 = Label(assemblypage, text=("Nucleotides to be displayed (max: {})"
-                                                    .format(len(assembled_reads))))
-        assemblypage.L1.pack(side=TOP)
-
-        assemblypage.E1 = Entry(assemblypage)
-        assemblypage.E1.pack(side=LEFT)
-
-    else:
-        messagebox.showerror("Error Message", "No sequence to display")
-
-    def display():
-        strands = int(assemblypage.E1.get())
-
-        if strands > MAX_NUCLEOTIDES:
-            strands = MAX_NUCLEOTIDES
-
-        if 0 < strands <= len(assembled_reads):
-            displaypage = Toplevel()
-            displaypage.resizable(0, 0)
-
-            scrollbar = Scrollbar(displaypage)
-            sequence = Text(displaypage, font="TkDefaultFont", height=10, width=50)
+    Args:
+        argv - the command line arguments, sys.argv[1:] by default.
 
-            scrollbar.pack(side=RIGHT, fill=Y)
-            sequence.pack(side=LEFT, fill=Y)
+    Returns:
+        The exit status.
 
-            scrollbar.config(command=sequence.yview)
-            sequence.config(yscrollcommand=scrollbar.set)
+    Raises:
+        NONE
+    """
+    parser = argparse.ArgumentParser(description="Assemble shotgunned DNA reads by looking for regions of overlap.")
+    parser.add_argument('input', nargs='?', help="reads as FASTA, FASTQ or in the format: sequence #, (space), "
+                                                 "sequence; optionally gzip compressed. Opens the GUI when omitted.")
+    parser.add_argument('-o', '--output', help="file to write the assembled contigs to once they are all assembled, "
+                                               "longest first: multi-FASTA with a .fai index when it ends with .fa, "
+                                               ".fasta or .fna (optionally followed by .gz), one per line otherwise. "
+                                               "stdout by default")
+    parser.add_argument('--format', choices=('lines', 'fasta'),
+                        help="output format, guessed from the output file name by default")
+    parser.add_argument('--line-width', type=int, default=LINE_WIDTH,
+                        help="bases per line of FASTA output (default: %(default)s)")
+    parser.add_argument('--compression', choices=COMPRESSIONS,
+                        help="compression of FASTA output; bgzip when the output file name ends with .gz by default. "
+                             "bgzip output can be read at random through its .fai and .gzi indexes")
+    parser.add_argument('--min-overlap', type=int, default=MIN_OVERLAP,
+                        help="smallest overlap between two reads (default: %(default)s)")
+    parser.add_argument('--engine', choices=sorted(OVERLAP_ENGINES), default='kmp',
+                        help="overlap engine; myers tolerates sequencing errors in overlaps (default: %(default)s)")
+    parser.add_argument('--error-rate', type=float,
+                        help="edits tolerated per overlapping nucleotide by the myers engine (default: {})"
+                             .format(ERROR_RATE))
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes for the overlap stage, 0 for one per CPU (default: %(default)s)")
+    parser.add_argument('--cache', metavar='DIR',
+                        help="directory caching the overlap stage between runs, with checkpoints to resume "
+                             "interrupted runs")
+    parser.add_argument('--incremental', metavar='STATE',
+                        help="add the input reads to the incremental assembly saved in STATE (created if missing) and "
+                             "output the contigs of every read added so far")
+    parser.add_argument('--both-strands', action='store_true',
+                        help="reads may come from either strand: also overlap every read with the reverse complement "
+                             "of the others, and reverse complement reads as needed in the contigs")
+    parser.add_argument('--profile', metavar='REPORT',
+                        help="write the time and peak memory of every stage and the pipeline counters to REPORT, as "
+                             "JSON")
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help="log the progress of the stages to stderr; twice to also dump the contained reads, the "
+                             "layout and the assembly")
+    parser.add_argument('--mode', choices=ASSEMBLY_MODES, default='overlap',
+                        help="overlap-layout over read pairs, or a de Bruijn graph of k-mers for high-coverage short "
+                             "reads (default: %(default)s)")
+    parser.add_argument('--kmer', type=int, default=DEFAULT_K,
+                        help="k-mer length of the de-bruijn mode (default: %(default)s)")
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT,
+                        help="drop k-mers seen fewer times in the de-bruijn mode (default: %(default)s)")
+    args = parser.parse_args(argv)
+    fasta = args.format == 'fasta' or args.format is None and args.output is not None and is_fasta(args.output)
+    if fasta and args.output is None:
+        parser.error("FASTA output needs an output file")
+    if args.line_width < 1:
+        parser.error("--line-width must be positive")
+    if args.both_strands and (args.incremental or args.mode != 'overlap'):
+        parser.error("--both-strands needs --mode overlap and cannot be used with --incremental")
+    engine = args.engine
+    if args.error_rate is not None:
+        if engine != MyersEngine.name:
+            parser.error("--error-rate needs --engine {}".format(MyersEngine.name))
+        try:
+            engine = MyersEngine(args.error_rate)
+        except ValueError as error:
+            parser.error(str(error))
+    logging.basicConfig(format='%(name)s: %(message)s',
+                        level=(logging.WARNING, logging.INFO, logging.DEBUG)[min(args.verbose, 2)])
+
+    if args.input is None:
+        import DNA_assembler_gui
+        DNA_assembler_gui.main()
+        return 0
+
+    profiler = Profiler()
+    try:
+        with profiler.stage('read_load'):
+            reads = load_reads(args.input)
+    except (OSError, ValueError) as error:
+        print("Error: incorrect file format or file does not exist ({})".format(error), file=sys.stderr)
+        return 1
 
-            sequence.insert(END, assembled_reads[0:strands])
-            sequence.config(state=DISABLED)
-            sequence.bind("<1>", lambda event: sequence.focus_set())
+    try:
+        if args.incremental:
+            contigs = run_incremental(reads, args.incremental, min_overlap=args.min_overlap, engine=engine,
+                                      profiler=profiler)
+        else:
+            contigs = run_assembly(reads, min_overlap=args.min_overlap, engine=engine,
+                                   workers=args.workers or None, mode=args.mode, k=args.kmer,
+                                   min_count=args.min_count, cache=args.cache, profiler=profiler,
+                                   both_strands=args.both_strands)
+        if fasta:
+            with profiler.stage('write_output'):
+                write_output(args.output, contigs, True, args.line_width, args.compression)
+        elif args.output:
+            write_output(args.output, contigs, False)
+        else:
+            print("\n".join(contigs))
+        if args.profile:
+            profiler.write(args.profile)
+    except (OSError, ValueError) as error:
+        print("Error: {}".format(error), file=sys.stderr)
+        return 1
+    return 0
 
-        elif strands > len(assembled_reads):
-            messagebox.showerror("Error Message", "Input is greater than nucleotide count")
 
-        else:
-            messagebox.showerror("Error Message", "Input is negative")
-
-    assemblypage.B1 = Button(assemblypage, text="Display", command=display)
-    assemblypage.B1.pack(side=BOTTOM)
-
-
-class NGSHomeScreen:
-    def __init__(self, master):
-        """
-            Handles all functionality for the GUI.
-
-            Args:
-                NONE
-          
-            Returns:
-                NONE
-
-            Raises:
-                KeyError: Raises an exception.
-            """
-
-        master.geometry('405x200+200+200')
-        menu = Menu(master)
-        master.config(menu=menu)
-        filemenu = Menu(master)
-        importmenu = Menu(master)
-
-        menu.add_cascade(label="File", menu=filemenu)
-        filemenu.add_cascade(label="Import", menu=importmenu)
-        filemenu.add_cascade(label="Save Sequence As...", command=save_sequence)
-        importmenu.add_command(label="DNA Strands",  command=lambda: read_and_display_filename())
-
-        def read_and_display_filename():
-            """
-              Reads the user inputted file and displays the filename on GUI.
-              
-              Args:
-                  NONE
-            
-              Returns:
-                  This is a description of what is returned.
-            
-              Raises:
-                  KeyError: Raises an exception.
-              """
-            read_data()
-            global filename
-            self.infile_name_display.configure(text="Input File: %s" % filename)
-
-        self.title = Label(master, text="DNA Sequence Assembler\n")
-        self.title.pack()
-
-        self.infile_name_display = Label(master, text="Input File: ")
-        self.infile_name_display.pack()
-
-        # def check_saved_file():
-        #     if issequencesaved == False:
-        #         messagebox.showerror("Warning", "Assembled sequence was not saved")
-        #     elif messagebox.askokcancel("Warning", "Do you want to exit?"):
-        #         quit()
-
-        # self.exit_button = Button(master, text="Exit", command=lambda: check_saved_file())
-        # self.exit_button.pack(side=BOTTOM)
-
-        self.about_button = Button(master, text="Instructions", command=instructions_page)
-        self.about_button.pack(side=BOTTOM)
-
-        self.display_button = Button(master, text="Display", command=lambda: display_pg())
-        self.display_button.pack(side=BOTTOM)
-
-        self.assemble_button = Button(master, text="Assemble", command=lambda: run_assembly())
-        self.assemble_button.pack(side=BOTTOM)
-
-NGSHomeScreen(root)
-
-
-def on_closing():
-    if issequencesaved == False:
-        messagebox.showerror("Warning", "Assembled sequence was not saved")
-    elif messagebox.askokcancel("Warning", "Do you want to exit?"):
-        quit()
-
-root.protocol("WM_DELETE_WINDOW", on_closing)
-root.mainloop()
+if __name__ == '__main__':
+    sys.exit(main())